@@ -0,0 +1,169 @@
+"""Timing and metering shared by the benchmarks.
+
+    percentile            - a linearly interpolated percentile of sorted timings
+    time_call             - times a call a number of times, in milliseconds
+    MeteredSQLiteBackend  - an in-memory SQLite backend counting the queries, rows returned, and SQLite
+                            virtual machine steps of everything run on its connections
+    measure               - times an operation on a MeteredSQLiteBackend, then counts the work it does
+"""
+
+import sqlite3
+import time
+from typing import Any, Callable, Dict, List
+
+from utilities.backends import SQLiteBackend
+
+_PERCENTILES = [50, 90, 95, 99]
+_WARMUP = 3  # untimed calls before each operation's samples
+_WORK_SAMPLES = 5  # calls counted on the rows scanned pass
+
+
+class Meter:
+    """Counts the queries, rows returned, and SQLite virtual machine steps of every metered connection"""
+
+    def __init__(self):
+        self.queries = self.rows = self.steps = 0
+        self._connections = []
+
+    def attach(self, raw: sqlite3.Connection) -> None:
+        self._connections.append(raw)
+
+    def count_steps(self, enabled: bool) -> None:
+        """Turns step counting on or off, it costs a Python call per step so it's off while timing"""
+        for raw in self._connections:
+            raw.set_progress_handler(self._step if enabled else None, 1)
+
+    def reset(self) -> None:
+        self.queries = self.rows = self.steps = 0
+
+    def _step(self) -> int:
+        self.steps += 1
+        return 0
+
+
+class _MeteredCursor:
+    """Wraps a cursor, counting statements sent and rows fetched"""
+
+    def __init__(self, cursor, meter: Meter):
+        self._cursor = cursor
+        self._meter = meter
+
+    def __enter__(self) -> "_MeteredCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._cursor.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._meter.rows += 1
+            yield row
+
+    def execute(self, sql: str, params=()) -> None:
+        self._meter.queries += 1
+        self._cursor.execute(sql, params)
+
+    def executemany(self, sql: str, seq_params) -> None:
+        self._meter.queries += 1
+        self._cursor.executemany(sql, seq_params)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._meter.rows += row is not None
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._meter.rows += len(rows)
+        return rows
+
+
+class _MeteredConnection:
+    """Wraps a connection so its cursors are metered"""
+
+    def __init__(self, db, meter: Meter):
+        self._db = db
+        self._meter = meter
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._db, name)
+
+    def cursor(self, **kwargs) -> _MeteredCursor:
+        return _MeteredCursor(self._db.cursor(**kwargs), self._meter)
+
+
+class MeteredSQLiteBackend(SQLiteBackend):
+    """In-memory SQLite backend whose connections report to a Meter"""
+
+    def __init__(self, seeds):
+        super().__init__(seeds=seeds)
+        self.meter = Meter()
+
+    def connect(self) -> Any:
+        db = super().connect()
+        self.meter.attach(db.raw)
+        return _MeteredConnection(db, self.meter)
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Linearly interpolated percentile of an already sorted list"""
+    k = (len(ordered) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def time_call(run: Callable[[], Any], samples: int) -> Dict[str, float]:
+    """Times a call, after a few untimed ones"""
+    for _ in range(10):
+        run()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {"p50_ms": percentile(timings, 50), "p99_ms": percentile(timings, 99), "mean_ms": sum(timings) / samples}
+
+
+def measure(meter: Meter, prepare, run, samples: int, max_seconds: float) -> Dict[str, float]:
+    """Times one operation, then counts the work it does on a separate pass.
+    Only the run call is timed and counted, whatever prepare does is left out
+    """
+    for _ in range(_WARMUP):
+        run(prepare())
+
+    timings = []
+    queries = rows = 0
+    deadline = time.perf_counter() + max_seconds
+    while len(timings) < samples and (len(timings) < _WORK_SAMPLES or time.perf_counter() < deadline):
+        arg = prepare()
+        meter.reset()
+        start = time.perf_counter()
+        run(arg)
+        timings.append((time.perf_counter() - start) * 1000)
+        queries += meter.queries
+        rows += meter.rows
+
+    steps = 0
+    for _ in range(_WORK_SAMPLES):
+        arg = prepare()
+        meter.reset()
+        meter.count_steps(True)
+        try:
+            run(arg)
+        finally:
+            meter.count_steps(False)
+        steps += meter.steps
+
+    timings.sort()
+    result = {"samples": len(timings), "mean_ms": sum(timings) / len(timings)}
+    result.update({f"p{p}_ms": percentile(timings, p) for p in _PERCENTILES})
+    result["max_ms"] = timings[-1]
+    result["queries_per_op"] = queries / len(timings)
+    result["rows_returned_per_op"] = rows / len(timings)
+    result["rows_scanned_per_op"] = steps / _WORK_SAMPLES
+    return result
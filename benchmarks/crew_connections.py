@@ -0,0 +1,128 @@
+"""Measures the crew connection queries at up to a million credits.
+
+For every --credits size the credits of a synthetic catalog are generated by generate_credits() in
+benchmarks/synthetic.py, --prolific included, and loaded into a CrewGraph and an in-memory SQLite copy.
+These are measured:
+    build                  - loading every credit into the arrays, what the first query pays
+    collaborators          - the 10 people who worked on the most movies with a random crew member, and
+                             (prolific collaborators) with one of the prolific crew, who have far more movies.
+                             Run the way utils.top_collaborators does, Crew_Movie joined with itself, on an
+                             in-memory SQLite copy with the app's indexes. SQLite runs in the process, a
+                             MySQL server adds a round trip to every query
+    graph collaborators    - the same top 10s from CrewGraph.top_collaborators, which only pulls ahead for
+                             the prolific crew at around a million credits
+    shortest_path          - how two random crew members are connected, a bidirectional BFS. The share of
+                             pairs connected within MAX_HOPS movies and their mean distance are reported too
+    add_movie              - adding a new movie's credits, the mean includes the merges every MERGE_THRESHOLD adds
+
+Run from the root of the project:
+    python -m benchmarks.crew_connections [--credits 100000 1000000] [--prolific 0.1] [--samples 500] [--out results.json]
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import time
+from typing import Any, Dict
+
+import utilities.prepared as prepared
+import utilities.utils  # registers the prepared statements, the collaborators one included
+from benchmarks.common import time_call
+from benchmarks.synthetic import PROLIFIC_POOL, SPARSE_CREW, catalog_size, generate_credits
+from utilities.crew_graph import CrewGraph
+
+
+def run_size(credits: int, prolific: float, samples: int, seed: int) -> Dict[str, Any]:
+    """Builds one graph and measures the queries on it"""
+    seed_credits = catalog_size(1, SPARSE_CREW)["credits_per_movie"] * catalog_size()["movies"]
+    rows = generate_credits(credits / seed_credits, prolific, seed)
+    start = time.perf_counter()
+    graph = CrewGraph(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    num_movies = len(graph)
+    rng = random.Random(seed)
+    crew_ids = sorted({crew_id for _, crew_id in rows})
+    prolific_ids = [crew_id for crew_id in crew_ids if crew_id <= PROLIFIC_POOL]
+    per_movie = max(1, round(len(rows) / num_movies))
+    next_id = max(movie_id for movie_id, _ in rows)
+    pairs = [(rng.choice(crew_ids), rng.choice(crew_ids)) for _ in range(samples)]
+    paths = [graph.shortest_path(a, b) for a, b in pairs]
+    connected = [len(path) // 2 for path in paths if path]
+    i = 0
+
+    def _path() -> None:
+        nonlocal i
+        i += 1
+        graph.shortest_path(*pairs[i % len(pairs)])
+
+    def _add() -> None:
+        nonlocal next_id
+        next_id += 1
+        graph.add_movie(next_id, rng.sample(crew_ids, per_movie))
+
+    db = sqlite3.connect(":memory:")
+    db.executescript(
+        """CREATE TABLE Crew (crew_ID INTEGER PRIMARY KEY, crew_name VARCHAR(128));
+           CREATE TABLE Crew_Movie (crew_ID INT, movie_ID INT, PRIMARY KEY (crew_ID, movie_ID));
+           CREATE INDEX idx_crew_movie_movie ON Crew_Movie (movie_ID, crew_ID);"""
+    )
+    db.executemany("INSERT INTO Crew VALUES (?, ?)", [(crew_id, f"crew {crew_id}") for crew_id in crew_ids])
+    db.executemany("INSERT OR IGNORE INTO Crew_Movie VALUES (?, ?)", [(crew_id, movie_id) for movie_id, crew_id in rows])
+    sql = prepared.sql_for("collaborators").replace("%s", "?")
+
+    def _sql(crew_id: int) -> None:
+        db.execute(sql, (crew_id, crew_id, 10)).fetchall()
+
+    results = {
+        "collaborators": time_call(lambda: _sql(rng.choice(crew_ids)), samples),
+        "prolific collaborators": time_call(lambda: _sql(rng.choice(prolific_ids)), samples),
+        "graph collaborators": time_call(lambda: graph.top_collaborators(rng.choice(crew_ids), 10), samples),
+        "graph prolific collaborators": time_call(lambda: graph.top_collaborators(rng.choice(prolific_ids), 10), samples),
+        "shortest_path": time_call(_path, samples),
+    }
+    db.close()
+    # last, the other queries run on the graph as it was built
+    results["add_movie"] = time_call(_add, samples)
+    return {
+        "credits": len(rows),
+        "movies": num_movies,
+        "crew": len(crew_ids),
+        "build_ms": build_ms,
+        "connected": len(connected) / len(pairs),
+        "mean_hops": sum(connected) / len(connected) if connected else None,
+        "operations": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the crew connection queries")
+    parser.add_argument("--credits", type=int, nargs="+", default=[100000, 1000000], help="credits in the catalog")
+    parser.add_argument("--prolific", type=float, default=0.1, help="share of credits given to a pool of 1000 crew members")
+    parser.add_argument("--samples", type=int, default=500, help="timed calls per operation")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the catalog and the crew looked up")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = []
+    for credits in args.credits:
+        run = run_size(credits, args.prolific, args.samples, args.seed)
+        runs.append(run)
+        hops = "-" if run["mean_hops"] is None else f"{run['mean_hops']:.1f}"
+        print(
+            f"\n{run['credits']} credits, {run['movies']} movies, {run['crew']} crew, built in {run['build_ms']:.0f} ms."
+            f" {run['connected']:.0%} of pairs connected, {hops} movies apart on average"
+        )
+        print(f"{'operation':<28} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        for name, r in run["operations"].items():
+            print(f"{name:<28} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['mean_ms']:>8.3f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "crew_connections", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
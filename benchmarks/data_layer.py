@@ -0,0 +1,203 @@
+"""Measures how the data layer in utilities/utils.py scales with the size of the catalog.
+
+Each run builds a synthetic catalog (see benchmarks/synthetic.py) into an in-memory SQLite database,
+sets the app up on it, and times the operations below. SQLite stands in for MySQL so the suite needs
+no server and every run starts from the exact same data.
+    search_for_movie_by_id     - cold (movie cache cleared first) and cached
+    search_by_*_inexact        - title, crew, and score searches through the trigram index, and through
+                                 the LIKE fallback used when the index isn't built
+    search_page                - the first page of each search, what the CLI actually loads
+    user_exists                - an account lookup, grows with --accounts
+    add_log / add_movie        - the two writes, add_log alone only queues the log in the write-behind
+                                 buffer and add_log + flush also writes it on its own
+For every operation it reports latency percentiles, queries sent per operation, rows returned per
+operation, and rows scanned per operation. SQLite doesn't expose rows examined the way MySQL's
+Handler_read_* counters do, so rows scanned is the number of virtual machine steps SQLite ran, which
+grows with every row it visits. Steps are counted on a separate pass so counting them never skews latency.
+
+Each of --movies, --crew, --songs, and --accounts takes one or more multiples of the seed data, and
+every combination is run. Results are written as JSON so runs can be compared across releases.
+
+Run from the root of the project:
+    python -m benchmarks.data_layer [--movies 1 10 100] [--crew 1] [--songs 1] [--accounts 1] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import platform
+import random
+import sqlite3
+import time
+from typing import Any, Callable, Dict, Tuple
+
+import utilities.utils as utils
+from benchmarks.common import MeteredSQLiteBackend, measure
+from benchmarks.synthetic import catalog_size, generate_catalog
+from utilities.movie import Movie
+
+SCHEMA_VERSION = 1  # bump when the layout of the JSON output changes
+
+
+def _operations(seeds, rng: random.Random) -> Dict[str, Tuple[Callable[[], Any], Callable[[Any], Any]]]:
+    """Builds every benchmarked operation as a (prepare, run) pair.
+    prepare picks the next argument and resets any state outside of the timed call, run is what gets timed
+    """
+    by_table = {seed.table: seed for seed in seeds}
+    movie_ids = [row[0] for row in by_table["Movie"].rows]
+    accounts = [row[0] for row in by_table["Account"].rows]
+    crew_names = [row[1] for row in by_table["Crew"].rows]
+
+    # search terms are words that really occur, so every search has some hits
+    def _terms(rows, col):
+        words = sorted({w.lower() for row in rows for w in str(row[col]).split() if len(w) >= 4})
+        return rng.sample(words, min(10, len(words)))
+
+    terms = {
+        "title": _terms(by_table["Movie"].rows, 1),
+        "crew": _terms(by_table["Crew"].rows, 1),
+        "score": _terms(by_table["Score_Songs"].rows, 0),
+    }
+    searches = {
+        "title": utils.search_by_title_inexact,
+        "crew": utils.search_by_crew_inexact,
+        "score": utils.search_by_score_inexact,
+    }
+
+    def _cached_id():
+        movie_id = rng.choice(movie_ids)
+        utils.search_for_movie_by_id(movie_id)
+        return movie_id
+
+    def _cold_id():
+        utils.clear_movie_cache()
+        return rng.choice(movie_ids)
+
+    def _new_movie():
+        mov = Movie(None, f"benchmark movie {rng.random()}", "01:30:00", 0, 0, None)
+        # a mix of existing crew, who only get a credit, and new crew, who get a row and a job too
+        crew = {name: ["Actor"] for name in rng.sample(crew_names, min(5, len(crew_names)))}
+        crew.update({f"new crew {rng.random()}": ["Actor"] for _ in range(5)})
+        crew[f"new composer {rng.random()}"] = ["Composer"]
+        mov.set_crew(crew)
+        mov.set_score(None, [f"track {i}" for i in range(10)])
+        return mov
+
+    operations = {
+        "search_for_movie_by_id": (_cold_id, utils.search_for_movie_by_id),
+        "search_for_movie_by_id (cached)": (_cached_id, utils.search_for_movie_by_id),
+    }
+    for kind, search in searches.items():
+
+        def _cold_term(kind=kind):
+            utils.clear_movie_cache()
+            return rng.choice(terms[kind])
+
+        operations[f"search_by_{kind}_inexact"] = (_cold_term, search)
+        operations[f"search_by_{kind}_inexact (LIKE)"] = (_cold_term, _without_index(search))
+        operations[f"search_page {kind}"] = (_cold_term, lambda term, kind=kind: utils.search_page(kind, term))
+    operations["user_exists"] = (lambda: rng.choice(accounts), utils.user_exists)
+    operations["add_log"] = (lambda: (rng.choice(movie_ids), rng.randint(1, 10) / 2), lambda args: utils.add_log(*args))
+    operations["add_log + flush"] = (
+        lambda: (rng.choice(movie_ids), rng.randint(1, 10) / 2),
+        lambda args: (utils.add_log(*args), utils.flush_watch_log()),
+    )
+    operations["add_movie_to_database"] = (_new_movie, utils.add_movie_to_database)
+    return operations
+
+
+def _without_index(search: Callable[[str], Any]) -> Callable[[str], Any]:
+    """Runs a search with the trigram index switched off, so it takes the LIKE fallback"""
+
+    def _run(term: str) -> Any:
+        with utils.search_index_disabled():
+            return search(term)
+
+    return _run
+
+
+def run_suite(scale: Dict[str, float], samples: int = 200, max_seconds: float = 10, seed: int = 0) -> Dict[str, Any]:
+    """Builds one catalog and benchmarks every operation against it
+
+    Args:
+        scale - a dictionary with the movies, crew, songs, and accounts multiples of the seed data
+        samples - an int representing the most timed calls per operation
+        max_seconds - a float representing how long an operation is sampled for before moving on
+        seed - an int seeding the catalog and the arguments each operation is called with
+
+    Returns:
+        a dictionary with the scale, catalog size, setup time, and the results of every operation
+    """
+    start = time.perf_counter()
+    seeds = generate_catalog(seed=seed, **scale)
+    backend = MeteredSQLiteBackend(seeds)
+    # set_up_database talks to the user, keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(backend=backend)
+    setup_seconds = time.perf_counter() - start
+
+    results = {}
+    try:
+        for name, (prepare, run) in _operations(seeds, random.Random(seed)).items():
+            results[name] = measure(backend.meter, prepare, run, samples, max_seconds)
+            print(
+                f"{name:<34} {results[name]['p50_ms']:>9.3f} {results[name]['p99_ms']:>9.3f}"
+                f" {results[name]['queries_per_op']:>8.1f} {results[name]['rows_returned_per_op']:>10.1f}"
+                f" {results[name]['rows_scanned_per_op']:>12.0f}"
+            )
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+    return {
+        "scale": scale,
+        "catalog": {seed.table: len(seed.rows) for seed in seeds},
+        "setup_seconds": setup_seconds,
+        "operations": results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Betterboxd data layer on synthetic catalogs")
+    for factor in ("movies", "crew", "songs", "accounts"):
+        parser.add_argument(f"--{factor}", type=float, nargs="+", default=[1], help=f"multiples of the seed data's {factor}")
+    parser.add_argument("--samples", type=int, default=200, help="most timed calls per operation")
+    parser.add_argument("--max-seconds", type=float, default=10, help="time spent sampling one operation")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the catalog and the arguments")
+    parser.add_argument("--out", default="data_layer_results.json", help="where to write the JSON results")
+    args = parser.parse_args()
+
+    runs = []
+    for movies, crew, songs, accounts in itertools.product(args.movies, args.crew, args.songs, args.accounts):
+        scale = {"movies": movies, "crew": crew, "songs": songs, "accounts": accounts}
+        size = catalog_size(**scale)
+        print(f"|-- movies {movies:g}x crew {crew:g}x songs {songs:g}x accounts {accounts:g}x --|")
+        print(
+            f"{size['movies']} movies, {size['credits_per_movie']} credits per movie, "
+            f"{size['songs_per_score']} songs per score, {size['accounts']} accounts"
+        )
+        print(f"{'operation':<34} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8} {'rows out':>10} {'rows scanned':>12}")
+        runs.append(run_suite(scale, args.samples, args.max_seconds, args.seed))
+        print()
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "benchmark": "data_layer",
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+        },
+        "settings": {"samples": args.samples, "max_seconds": args.max_seconds, "seed": args.seed},
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measures logging in the old way, three lookups of the same Account row, against utils.authenticate.
+
+For every --accounts multiple a synthetic catalog (see benchmarks/synthetic.py) is loaded into an
+in-memory SQLite database and these are measured the same way benchmarks/data_layer.py does:
+    3 lookups               - user_exists, password_correct, then get_user, what logging in used to run
+    authenticate            - checking the password and loading the account in one query
+    authenticate (wrong)    - the same with a wrong password, which should cost exactly as much
+SQLite runs in the process, so a query costs no network round trip here. Against a MySQL server every
+query also pays one, the last column adds --rtt-ms per query to the median to estimate that.
+
+Run from the root of the project:
+    python -m benchmarks.login [--accounts 1 100 1000] [--rtt-ms 0.5] [--samples 500] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+from typing import Any, Dict
+
+import utilities.utils as utils
+from benchmarks.common import MeteredSQLiteBackend, measure
+from benchmarks.synthetic import generate_catalog
+
+
+def _three_lookups(username: str, password: str) -> Any:
+    """Logs in like the CLI and service did before utils.authenticate"""
+    if utils.user_exists(username) and utils.password_correct(username, password):
+        return utils.get_user(username)
+    return None
+
+
+def run_size(accounts: float, samples: int, max_seconds: float, seed: int) -> Dict[str, Any]:
+    """Builds one catalog and measures both ways of logging in on it"""
+    seeds = generate_catalog(movies=1, accounts=accounts, seed=seed)
+    backend = MeteredSQLiteBackend(seeds)
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(backend=backend)
+    rng = random.Random(seed)
+    logins = [(row[0], row[3]) for row in next(s for s in seeds if s.table == "Account").rows]
+    operations = {
+        "3 lookups": (lambda: rng.choice(logins), lambda args: _three_lookups(*args)),
+        "authenticate": (lambda: rng.choice(logins), lambda args: utils.authenticate(*args)),
+        "authenticate (wrong)": (lambda: (rng.choice(logins)[0], "0" * 64), lambda args: utils.authenticate(*args)),
+    }
+    results = {}
+    try:
+        for name, (prepare, run) in operations.items():
+            results[name] = measure(backend.meter, prepare, run, samples, max_seconds)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+    return {"accounts": len(logins), "operations": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark logging in")
+    parser.add_argument("--accounts", type=float, nargs="+", default=[1, 100, 1000], help="multiples of the seed data's accounts")
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="network round trip to a MySQL server, for the estimate")
+    parser.add_argument("--samples", type=int, default=500, help="most timed calls per operation")
+    parser.add_argument("--max-seconds", type=float, default=5, help="how long an operation is sampled for")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the catalog and the accounts logged in as")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = []
+    print(f"{'accounts':>8} {'operation':<22} {'p50 ms':>8} {'p99 ms':>8} {'queries':>8} {f'p50 + {args.rtt_ms:g} ms RTT':>18}")
+    for accounts in args.accounts:
+        run = run_size(accounts, args.samples, args.max_seconds, args.seed)
+        runs.append(run)
+        for name, r in run["operations"].items():
+            estimate = r["p50_ms"] + r["queries_per_op"] * args.rtt_ms
+            print(
+                f"{run['accounts']:>8} {name:<22} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f}"
+                f" {r['queries_per_op']:>8.1f} {estimate:>18.3f}"
+            )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "login", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Measures how much memory and how many queries a large search result costs, fully loaded and as summaries.
+
+A synthetic catalog (see benchmarks/synthetic.py) is loaded into an in-memory SQLite database, then the
+most common word in its titles is searched for through utils.iter_search, once hydrating every movie
+and once as summaries (summary=True) that leave out the crew and score. For each it reports:
+    queries   - statements sent to the database, from the instrumentation counters
+    retained  - bytes still held by the result once the search is done
+    peak      - the most bytes allocated at once while searching
+    ms        - how long the whole search took
+The movie cache is turned off so it doesn't hold on to anything. Memory comes from tracemalloc, which
+only sees Python allocations, so it's a fair comparison between the two but not the process's RSS.
+
+It also compares one Movie and one User against a copy of the class without __slots__.
+
+Run from the root of the project:
+    python -m benchmarks.movie_memory [--movies 40] [--out results.json]
+"""
+
+import argparse
+import collections
+import contextlib
+import gc
+import io
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import utilities.utils as utils
+from benchmarks.synthetic import generate_catalog
+from utilities.backends import SQLiteBackend
+from utilities.movie import Movie
+from utilities.user import User
+
+_OBJECTS = 10000  # objects allocated when measuring per-object size
+
+
+class _DictMovie:
+    """The attributes of a summary Movie kept in an instance __dict__, like Movie before __slots__"""
+
+    def __init__(self, id, title, runtime, avg_rating, num_ratings, score_id):
+        self._id = id
+        self._title = title
+        self._runtime = runtime
+        self._avg_rating = avg_rating
+        self._num_ratings = num_ratings
+        self._crew = None
+        self._score = None
+        self._score_id = score_id
+
+
+class _DictUser:
+    """The attributes of a User kept in an instance __dict__, like User before __slots__"""
+
+    def __init__(self, id, username, password, fav_movie_id):
+        self._id = id
+        self._username = username
+        self._password = password
+        self._fav_movie_id = fav_movie_id
+
+
+def _measure(search: Callable[[], list]) -> Dict[str, Any]:
+    """Runs a search under tracemalloc and the query counters"""
+    gc.collect()
+    utils.reset_query_stats()
+    tracemalloc.start()
+    start = time.perf_counter()
+    movies = search()
+    ms = (time.perf_counter() - start) * 1000
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "movies": len(movies),
+        "queries": sum(s["queries"] for s in utils.query_stats().values()),
+        "retained_bytes": retained,
+        "peak_bytes": peak,
+        "ms": ms,
+    }
+
+
+def _bytes_per_object(make: Callable[[int], Any]) -> float:
+    """Allocates _OBJECTS objects and returns how many bytes each one costs, strings they share excluded"""
+    gc.collect()
+    tracemalloc.start()
+    objects = [make(i) for i in range(_OBJECTS)]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return size / _OBJECTS
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the memory and queries of large search results")
+    parser.add_argument("--movies", type=float, default=40, help="multiples of the seed data's movies")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    seeds = generate_catalog(movies=args.movies)
+    titles = next(seed for seed in seeds if seed.table == "Movie").rows
+    words = collections.Counter(w.lower() for row in titles for w in set(row[1].split()) if len(w) >= 4)
+    term = words.most_common(1)[0][0]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(backend=SQLiteBackend(seeds=seeds))
+    utils.configure_movie_cache(0)
+    try:
+        page = utils.HYDRATE_CHUNK_SIZE
+        results = {
+            "full": _measure(lambda: [m for p in utils.iter_search("title", term, page) for m in p]),
+            "summary": _measure(lambda: [m for p in utils.iter_search("title", term, page, summary=True) for m in p]),
+        }
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+
+    print(f"{len(titles)} movies, searching titles for {term!r}")
+    print(f"{'':<8} {'movies':>7} {'queries':>8} {'retained KiB':>13} {'peak KiB':>9} {'ms':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<8} {r['movies']:>7} {r['queries']:>8} {r['retained_bytes'] / 1024:>13.1f}"
+            f" {r['peak_bytes'] / 1024:>9.1f} {r['ms']:>8.2f}"
+        )
+
+    objects = {
+        "Movie": _bytes_per_object(lambda i: Movie.summary(i, "title", 120, 3.5, 10, i)),
+        "Movie without __slots__": _bytes_per_object(lambda i: _DictMovie(i, "title", 120, 3.5, 10, i)),
+        "User": _bytes_per_object(lambda i: User("username", "password", i)),
+        "User without __slots__": _bytes_per_object(lambda i: _DictUser(i, "username", "password", i)),
+    }
+    print("\nbytes per object")
+    for name, size in objects.items():
+        print(f"{name:<24} {size:>8.0f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(
+                {"benchmark": "movie_memory", "settings": vars(args), "term": term, "search": results, "bytes_per_object": objects},
+                f,
+                indent=2,
+            )
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Measures what preparing the hot statements once per connection saves on every run of them.
+
+Every statement in the utilities/prepared.py registry is run over and over in two ways:
+    text      - a fresh cursor and the statement's SQL text every time, the way utils.py used to send it,
+                so the database parses and plans it on every run
+    prepared  - prepared.fetchall(), the connection's prepared cursor for the statement
+Statements that look up a list of IDs are run with --ids IDs at a time.
+
+By default a synthetic catalog (see benchmarks/synthetic.py) is loaded into an in-memory SQLite
+database. sqlite3 caches compiled statements by their text, so the text runs use a second connection
+with that cache turned off, which is what sending text to a MySQL server amounts to. Pass --mysql-host
+to measure against a MySQL server that has the Betterboxd database set up instead, both ways then run
+on the same connection and the difference is the server's parsing and planning. The prepared runs go
+through the app's query instrumentation and the text runs don't, so the savings are if anything understated.
+
+Run from the root of the project:
+    python -m benchmarks.prepared_statements [--movies 10] [--ids 1 10 100] [--samples 2000] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+import utilities.prepared as prepared
+import utilities.utils as utils
+from benchmarks.common import percentile
+from benchmarks.synthetic import generate_catalog
+from utilities.backends import MySQLBackend, SQLiteBackend
+
+
+def _time(run: Callable[[], Any], samples: int) -> Dict[str, float]:
+    """Times a call, after a few untimed ones"""
+    for _ in range(10):
+        run()
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1e6)
+    timings.sort()
+    return {"p50_us": percentile(timings, 50), "p99_us": percentile(timings, 99), "mean_us": sum(timings) / samples}
+
+
+def _text(db, sql: str, params: tuple) -> List[tuple]:
+    """Runs a statement the way utils.py did before the registry"""
+    with db.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall() if cursor.description is not None else []
+
+
+def _prepared(db, name: str, params: tuple) -> List[tuple]:
+    """Runs a registered statement on the connection's prepared cursor"""
+    cursor = prepared.execute(db, name, params)
+    return cursor.fetchall() if cursor.description is not None else []
+
+
+def _cases(db, ids: List[int], rng: random.Random) -> List[Dict[str, Any]]:
+    """Builds the statements to run, each with a function picking its next parameters"""
+    with db.cursor() as cursor:
+        cursor.execute("SELECT movie_ID FROM Movie;")
+        movie_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT score_ID FROM Score;")
+        score_ids = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT account_name FROM Account;")
+        accounts = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT movie_title FROM Movie;")
+        titles = [row[0] for row in cursor.fetchall()]
+        cursor.execute("SELECT crew_name FROM Crew;")
+        names = [row[0] for row in cursor.fetchall()]
+
+    id_lists = {"movies by id": movie_ids, "songs by score": score_ids, "crew by movie": movie_ids, "histogram by movie": movie_ids}
+    cases = []
+    for name in prepared.statements():
+        if name in id_lists:
+            for n in ids:
+                pool = id_lists[name]
+                cases.append({"statement": name, "ids": n, "pick": lambda pool=pool, n=n: rng.sample(pool, min(n, len(pool)))})
+        elif name == "account by name":
+            cases.append({"statement": name, "ids": None, "pick": lambda: (rng.choice(accounts),)})
+        elif name == "movie by title":
+            cases.append({"statement": name, "ids": None, "pick": lambda: (rng.choice(titles),)})
+        elif name == "crew by name":
+            cases.append({"statement": name, "ids": None, "pick": lambda: (rng.choice(names),)})
+        elif name == "top rated":
+            cases.append({"statement": name, "ids": None, "pick": lambda: (utils.TOP_RATED_SIZE,)})
+        elif name == "watch history":
+            cases.append({"statement": name, "ids": None, "pick": lambda: (rng.choice(accounts), utils.PAGE_SIZE)})
+        elif name == "rate movie":
+            # adds nothing, so the catalog stays the same however many times it runs
+            cases.append({"statement": name, "ids": None, "pick": lambda: (0.0, 0, 0.0, 0, rng.choice(movie_ids))})
+    return cases
+
+
+def _measure(case: Dict[str, Any], text_db, prepared_db, samples: int) -> Dict[str, Any]:
+    """Times one statement both ways with the same parameters"""
+    name = case["statement"]
+    params = [case["pick"]() for _ in range(64)]
+    i = 0
+
+    def _next():
+        nonlocal i
+        i += 1
+        return params[i % len(params)]
+
+    if case["ids"] is None:
+        sql = prepared.sql_for(name)
+        text = _time(lambda: _text(text_db, sql, _next()), samples)
+        fast = _time(lambda: _prepared(prepared_db, name, _next()), samples)
+    else:
+        raw = prepared.statements()[name]
+
+        def _text_ids():
+            chunk = _next()
+            sql = raw.replace("{ids}", ", ".join(["%s"] * len(chunk)))
+            return _text(text_db, sql, tuple(chunk) * raw.count("{ids}"))
+
+        text = _time(_text_ids, samples)
+        fast = _time(lambda: prepared.fetchall(prepared_db, name, ids=_next()), samples)
+    return {"statement": name, "ids": case["ids"], "text": text, "prepared": fast}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark prepared statements against sending SQL text")
+    parser.add_argument("--movies", type=float, default=10, help="multiples of the seed data's movies, SQLite only")
+    parser.add_argument("--ids", type=int, nargs="+", default=[1, 10, 100], help="IDs looked up at a time")
+    parser.add_argument("--samples", type=int, default=2000, help="timed runs per statement and way")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the catalog and the parameters")
+    parser.add_argument("--mysql-host", help="measure against this MySQL server instead of SQLite")
+    parser.add_argument("--mysql-user", default="root")
+    parser.add_argument("--mysql-password", default="")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    if args.mysql_host:
+        backend = MySQLBackend(args.mysql_host, args.mysql_user, args.mysql_password)
+    else:
+        backend = SQLiteBackend(seeds=generate_catalog(movies=args.movies, seed=args.seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(backend=backend)
+    rng = random.Random(args.seed)
+    results = []
+    try:
+        with utils.connection() as db:
+            if args.mysql_host:
+                text_db = db
+            else:
+                # the same database, on a connection that compiles every statement it's sent
+                text_db = backend.connect(cached_statements=0)
+            for case in _cases(db, args.ids, rng):
+                results.append(_measure(case, text_db, db, args.samples))
+            if text_db is not db:
+                text_db.close()
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+
+    print(f"{backend.dialect}, median microseconds per run")
+    print(f"{'statement':<20} {'ids':>5} {'text':>9} {'prepared':>9} {'saved':>7}")
+    for r in results:
+        text, fast = r["text"]["p50_us"], r["prepared"]["p50_us"]
+        print(f"{r['statement']:<20} {r['ids'] or '':>5} {text:>9.1f} {fast:>9.1f} {(text - fast) / text:>7.0%}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "prepared_statements", "settings": vars(args), "results": results}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
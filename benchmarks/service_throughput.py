@@ -0,0 +1,156 @@
+"""Measures how many requests per second the JSON API (utilities/service.py) serves.
+
+A synthetic catalog (see benchmarks/synthetic.py) is loaded into a SQLite database file in a temp
+folder, so the connection pool really has several connections, and the service is started on a free
+local port. Each simulated client logs in as its own account, then sends a mix of requests over one
+keep-alive connection for a fixed time:
+    50% GET /movies/<id>   25% GET /search   15% GET /profile   10% POST /movies/<id>/logs
+The run is repeated for every --clients count, reporting requests per second and latency percentiles.
+
+Run from the root of the project:
+    python -m benchmarks.service_throughput [--clients 1 4 16] [--seconds 5] [--movies 10] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import utilities.utils as utils
+from benchmarks.common import percentile
+from benchmarks.synthetic import generate_catalog
+from utilities.backends import SQLiteBackend
+from utilities.service import BetterboxdServer
+
+_MIX = [("movie", 50), ("search", 25), ("profile", 15), ("log", 10)]
+
+
+def _client(port: int, username: str, password: str, movie_ids: List[int], terms: List[str], seed: int, stop: float):
+    """Logs in, then sends requests until stop, returning (endpoint, ms, status) for each one"""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    results = []
+
+    def _request(method: str, path: str, body: Dict[str, Any] = None, token: str = None) -> Dict[str, Any]:
+        headers = {"Content-Type": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        conn.request(method, path, json.dumps(body) if body is not None else None, headers)
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        return response.status, payload
+
+    status, payload = _request("POST", "/login", {"username": username, "password": password})
+    if status != 200:
+        raise RuntimeError(f"couldn't log in as {username}: {payload}")
+    token = payload["token"]
+
+    kinds, weights = zip(*_MIX)
+    while time.perf_counter() < stop:
+        kind = rng.choices(kinds, weights)[0]
+        start = time.perf_counter()
+        if kind == "movie":
+            status, _ = _request("GET", f"/movies/{rng.choice(movie_ids)}")
+        elif kind == "search":
+            status, _ = _request("GET", f"/search?kind={rng.choice(['title', 'crew', 'score'])}&term={rng.choice(terms)}")
+        elif kind == "profile":
+            status, _ = _request("GET", "/profile", token=token)
+        else:
+            status, _ = _request("POST", f"/movies/{rng.choice(movie_ids)}/logs", {"rating": rng.randint(0, 10) / 2}, token)
+        results.append((kind, (time.perf_counter() - start) * 1000, status))
+    conn.close()
+    return results
+
+
+def _summarize(timings: List[float]) -> Dict[str, float]:
+    timings = sorted(timings)
+    if not timings:
+        return {"requests": 0, "p50_ms": 0.0, "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "requests": len(timings),
+        "p50_ms": percentile(timings, 50),
+        "p90_ms": percentile(timings, 90),
+        "p99_ms": percentile(timings, 99),
+        "max_ms": timings[-1],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Betterboxd JSON API")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16], help="concurrent clients to try")
+    parser.add_argument("--seconds", type=float, default=5, help="how long each client count runs")
+    parser.add_argument("--workers", type=int, default=16, help="request worker threads")
+    parser.add_argument("--pool-size", type=int, default=utils.POOL_SIZE, help="database connections")
+    parser.add_argument("--movies", type=float, default=10, help="multiples of the seed data's movies")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    seeds = {seed.table: seed for seed in generate_catalog(movies=args.movies, accounts=max(args.clients) / 20 + 1)}
+    movie_ids = [row[0] for row in seeds["Movie"].rows]
+    accounts = [row[0] for row in seeds["Account"].rows]
+    terms = sorted({w.lower() for row in seeds["Movie"].rows for w in row[1].split() if len(w) >= 4})[:20]
+
+    folder = tempfile.mkdtemp(prefix="betterboxd-bench-")
+    backend = SQLiteBackend(os.path.join(folder, "betterboxd.db"), seeds=list(seeds.values()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(pool_size=args.pool_size, backend=backend)
+    server = BetterboxdServer(("127.0.0.1", 0), args.workers)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    print(f"{len(movie_ids)} movies, {args.workers} workers, {args.pool_size} database connections")
+    print(f"{'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}   p50 ms by endpoint")
+
+    runs = []
+    try:
+        for clients in args.clients:
+            stop = time.perf_counter() + args.seconds
+            results: List[list] = [None] * clients
+
+            def _run(i: int) -> None:
+                # synthetic account i has the password "password<i>"
+                results[i] = _client(port, accounts[i], f"password{i}", movie_ids, terms, i, stop)
+
+            threads = [threading.Thread(target=_run, args=(i,)) for i in range(clients)]
+            began = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - began
+
+            flat = [r for client in results for r in client]
+            by_endpoint = {kind: _summarize([ms for k, ms, _ in flat if k == kind]) for kind, _ in _MIX}
+            run = {
+                "clients": clients,
+                "requests_per_second": len(flat) / elapsed,
+                "errors": sum(1 for _, _, status in flat if status >= 400),
+                "overall": _summarize([ms for _, ms, _ in flat]),
+                "endpoints": by_endpoint,
+            }
+            runs.append(run)
+            print(
+                f"{clients:>7} {run['requests_per_second']:>9.0f} {run['overall']['p50_ms']:>8.2f}"
+                f" {run['overall']['p99_ms']:>8.2f} {run['errors']:>7}   "
+                + "  ".join(f"{kind} {s['p50_ms']:.2f}" for kind, s in by_endpoint.items())
+            )
+    finally:
+        server.shutdown()
+        server.server_close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "service_throughput", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Measures "More like this" on the movie x crew graph as the catalog grows to 100k movies.
+
+For every --movies multiple the credits of a synthetic catalog (see benchmarks/synthetic.py) are
+loaded straight into a CrewGraph, no database involved, and these are measured:
+    build          - loading every credit into the arrays, what the first similar_movies call pays
+    similar top 5  - ranking the movies sharing crew with a random movie, what a movie's page shows
+    similar top 25
+    add_movie      - adding a new movie's credits. Every MERGE_THRESHOLD adds rebuild the arrays,
+                     the mean includes that, the p50 doesn't
+Synthetic crew members are in about two movies each, which makes for few neighbors. --prolific moves
+that share of the credits to a pool of 1000 people, who end up on over a hundred movies each at 100k
+movies, so a lookup has hundreds of neighbors to score, like a real catalog's busiest character actors.
+
+Run from the root of the project:
+    python -m benchmarks.similar_movies [--movies 40 400 4000] [--prolific 0.1] [--samples 2000] [--out results.json]
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict
+
+from benchmarks.common import time_call
+from benchmarks.synthetic import generate_credits
+from utilities.crew_graph import CrewGraph
+
+
+def run_size(movies: float, prolific: float, samples: int, seed: int) -> Dict[str, Any]:
+    """Builds one index and measures lookups and adds on it"""
+    credits = generate_credits(movies, prolific, seed)
+    start = time.perf_counter()
+    index = CrewGraph(credits)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(seed)
+    movie_ids = sorted({movie_id for movie_id, _ in credits})
+    max_crew = max(crew_id for _, crew_id in credits)
+    per_movie = max(1, len(credits) // len(movie_ids))
+    next_id = movie_ids[-1]
+
+    def _add() -> None:
+        nonlocal next_id
+        next_id += 1
+        index.add_movie(next_id, rng.sample(range(1, max_crew + 1), per_movie))
+
+    results = {
+        "similar top 5": time_call(lambda: index.similar_movies(rng.choice(movie_ids), 5), samples),
+        "similar top 25": time_call(lambda: index.similar_movies(rng.choice(movie_ids), 25), samples),
+        "add_movie": time_call(_add, samples),
+    }
+    return {"movies": len(movie_ids), "credits": len(credits), "build_ms": build_ms, "operations": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark similar movies on the crew graph")
+    parser.add_argument("--movies", type=float, nargs="+", default=[40, 400, 4000], help="multiples of the seed data's movies")
+    parser.add_argument("--prolific", type=float, default=0.1, help="share of credits given to a pool of 1000 crew members")
+    parser.add_argument("--samples", type=int, default=2000, help="timed calls per operation")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the catalog and the movies looked up")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = []
+    print(f"{'movies':>7} {'credits':>9} {'build ms':>9}  {'operation':<15} {'p50 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+    for movies in args.movies:
+        run = run_size(movies, args.prolific, args.samples, args.seed)
+        runs.append(run)
+        for i, (name, r) in enumerate(run["operations"].items()):
+            size = f"{run['movies']:>7} {run['credits']:>9} {run['build_ms']:>9.1f}" if i == 0 else " " * 27
+            print(f"{size}  {name:<15} {r['p50_ms']:>8.3f} {r['p99_ms']:>8.3f} {r['mean_ms']:>8.3f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "similar_movies", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
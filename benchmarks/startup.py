@@ -0,0 +1,106 @@
+"""Measures how long Betterboxd takes to start, from launching the process to the first menu.
+
+Each run starts `python main.py` in a fresh process and reads its output until the Sign Up / Log In
+menu appears, then kills it. Two things are reported:
+    imports        - the time Python spends importing main.py's modules, from -X importtime
+    to first menu  - wall time from launch to the menu, which includes the interpreter starting,
+                     connecting, checking the schema, and loading the search index
+By default it starts on a SQLite database file in a temp folder, created by an untimed first run, so
+the numbers don't include building the database. Pass --mysql to start on the MySQL server configured
+through the BETTERBOXD_DB_* environment variables or betterboxd.ini instead (see utilities/settings.py).
+
+Run from the root of the project:
+    python -m benchmarks.startup [--runs 10] [--mysql] [--out results.json]
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_MENU = "What would you like to do?"
+
+
+def _to_first_menu(args: List[str]) -> float:
+    """Starts the app and waits for its first menu
+
+    Returns:
+        a float representing the seconds from launch to the menu
+    """
+    env = dict(os.environ, PYTHONUNBUFFERED="1")
+    start = time.perf_counter()
+    app = subprocess.Popen(
+        [sys.executable, "main.py", *args],
+        cwd=_ROOT,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        output = []
+        for line in app.stdout:
+            if _MENU in line:
+                return time.perf_counter() - start
+            output.append(line)
+        raise RuntimeError("the app exited before showing its menu:\n" + "".join(output))
+    finally:
+        app.kill()
+        app.wait()
+
+
+def _import_ms() -> float:
+    """Gets the milliseconds spent importing main.py's modules, summed over the top-level imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # lines look like "import time:   self |   cumulative | name", top-level imports aren't indented
+    total = 0
+    for match in re.finditer(r"import time:\s+\d+ \|\s+(\d+) \| (\S.*)", result.stderr):
+        if not match.group(2).startswith(" "):
+            total += int(match.group(1))
+    return total / 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the time from launch to the first menu")
+    parser.add_argument("--runs", type=int, default=10, help="timed launches")
+    parser.add_argument("--mysql", action="store_true", help="start on the configured MySQL server instead of SQLite")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        app_args = [] if args.mysql else ["--sqlite", os.path.join(folder, "betterboxd.db")]
+        _to_first_menu(app_args)  # creates the database, and warms the OS file cache
+        launches = [_to_first_menu(app_args) * 1000 for _ in range(args.runs)]
+        imports = [_import_ms() for _ in range(args.runs)]
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, samples in (("imports", imports), ("to first menu", launches)):
+        results[name] = {"median_ms": statistics.median(samples), "min_ms": min(samples), "max_ms": max(samples)}
+
+    print(f"{'mysql' if args.mysql else 'sqlite'}, {args.runs} runs")
+    print(f"{'':<14} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<14} {r['median_ms']:>10.1f} {r['min_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "startup", "settings": vars(args), "results": results}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Deterministic synthetic catalogs for the benchmarks.
+
+generate_catalog() builds rows for every table in the same shape load_seed_data() returns, so a
+SQLiteBackend (or the bootstrap tool) can load them as-is. Four things scale independently, each as
+a multiple of the shipped seed data:
+    movies   - how many movies (and scores) there are, 25 at 1x
+    crew     - how many crew members are credited on each movie, about 60 at 1x
+    songs    - how many songs are on each score, about 11 at 1x
+    accounts - how many accounts there are, 20 at 1x
+The crew pool grows with movies * crew so people keep showing up in about two movies each.
+Titles, names, and songs are stitched together from words in the seed data, so searches see a
+realistic spread of matches. The same arguments always give the same rows.
+generate_credits() builds just the credits, for benchmarks of the crew graph that need no database.
+"""
+
+import functools
+import hashlib
+import random
+from typing import Dict, List, Tuple
+
+from utilities.seed import MAX_USERNAME_LENGTH, SeedFile, load_seed_data
+
+_COMPOSER = "Composer"
+PROLIFIC_POOL = 1000  # crew members the prolific share of generate_credits() is spread over
+SPARSE_CREW = 0.2  # generate_credits()'s multiple of the seed data's credits per movie, about 12
+
+
+@functools.lru_cache(maxsize=None)
+def _seed_shape() -> Dict[str, object]:
+    """Measures the seed data, which is what a scale of 1 reproduces"""
+    seeds = {seed.table: seed for seed in load_seed_data()}
+    words = lambda rows, col: sorted({w for row in rows for w in str(row[col]).split() if w.isalpha()})
+    crew_names = [row[1].split() for row in seeds["Crew"].rows if len(row[1].split()) >= 2]
+    return {
+        "movies": len(seeds["Movie"].rows),
+        "credits": len(seeds["Crew_Movie"].rows) / len(seeds["Movie"].rows),
+        "songs": len(seeds["Score_Songs"].rows) / len(seeds["Score"].rows),
+        "accounts": len(seeds["Account"].rows),
+        "jobs": sorted(row[0] for row in seeds["Crew_Job"].rows if row[0] != _COMPOSER),
+        "title_words": words(seeds["Movie"].rows, 1),
+        "song_words": words(seeds["Score_Songs"].rows, 0),
+        "first_names": sorted({name[0] for name in crew_names}),
+        "last_names": sorted({name[-1] for name in crew_names}),
+    }
+
+
+def catalog_size(movies: float = 1, crew: float = 1, songs: float = 1, accounts: float = 1) -> Dict[str, int]:
+    """Works out how big a generated catalog will be without building it
+
+    Returns:
+        a dictionary with the number of movies, credits per movie, songs per score, accounts, and crew
+    """
+    shape = _seed_shape()
+    n_movies = max(1, round(shape["movies"] * movies))
+    credits = max(1, round(shape["credits"] * crew))
+    return {
+        "movies": n_movies,
+        "credits_per_movie": credits,
+        "songs_per_score": max(1, round(shape["songs"] * songs)),
+        "accounts": max(1, round(shape["accounts"] * accounts)),
+        # about two movies per person, plus a composer for every other movie
+        "crew": max(credits, n_movies * credits // 2) + max(1, n_movies // 2),
+    }
+
+
+def generate_catalog(
+    movies: float = 1, crew: float = 1, songs: float = 1, accounts: float = 1, seed: int = 0
+) -> List[SeedFile]:
+    """Builds a synthetic catalog
+
+    Args:
+        movies - a float representing how many times the seed data's number of movies to generate
+        crew - a float representing how many times the seed data's credits per movie to generate
+        songs - a float representing how many times the seed data's songs per score to generate
+        accounts - a float representing how many times the seed data's number of accounts to generate
+        seed - an int seeding the random generator, the same seed always gives the same catalog
+
+    Returns:
+        a list of SeedFiles in load order, with explicit IDs everywhere
+    """
+    shape = _seed_shape()
+    size = catalog_size(movies, crew, songs, accounts)
+    rng = random.Random(seed)
+    n_composers = max(1, size["movies"] // 2)
+    n_crew = size["crew"]
+
+    # crew 1..n_composers are composers, everyone else gets a job drawn like the seed data's
+    crew_rows, job_rows, seen = [], [], set()
+    for crew_id in range(1, n_crew + 1):
+        name = f"{rng.choice(shape['first_names'])} {rng.choice(shape['last_names'])}"
+        if name in seen:
+            name = f"{name} {crew_id}"
+        seen.add(name)
+        crew_rows.append((crew_id, name))
+        job_rows.append((_COMPOSER if crew_id <= n_composers else rng.choice(shape["jobs"]), crew_id))
+
+    movie_rows, score_rows, song_rows, credit_rows = [], [], [], []
+    for movie_id in range(1, size["movies"] + 1):
+        title = " ".join(rng.choice(shape["title_words"]) for _ in range(rng.randint(1, 4)))
+        num_ratings = rng.randint(0, 500)
+        rating = round(rng.uniform(1, 5), 2) if num_ratings else 0
+        runtime = f"{rng.randint(1, 3):02d}:{rng.randint(0, 59):02d}:00"
+        # score_ID matches movie_ID, the way add_movie_to_database numbers them
+        movie_rows.append((movie_id, title, rating, num_ratings, runtime, movie_id))
+        score_rows.append((movie_id, rng.randint(1, n_composers)))
+        for track in range(1, size["songs_per_score"] + 1):
+            song = " ".join(rng.choice(shape["song_words"]) for _ in range(rng.randint(1, 5)))
+            song_rows.append((song, movie_id, str(track)))
+        for crew_id in rng.sample(range(n_composers + 1, n_crew + 1), min(size["credits_per_movie"], n_crew - n_composers)):
+            credit_rows.append((crew_id, movie_id))
+
+    account_rows = []
+    for i in range(size["accounts"]):
+        name = f"{rng.choice(shape['first_names']).lower()}{i}"[-MAX_USERNAME_LENGTH:]
+        passphrase = hashlib.sha256(f"password{i}".encode()).hexdigest()
+        account_rows.append((name, rng.randint(1, size["movies"]), rng.randint(0, 2000), passphrase))
+
+    return [
+        SeedFile("<synthetic>", "Crew", ["crew_ID", "crew_name"], crew_rows),
+        SeedFile("<synthetic>", "Crew_Job", ["job", "crew_ID"], job_rows),
+        SeedFile("<synthetic>", "Score", ["score_ID", "crew_ID"], score_rows),
+        SeedFile("<synthetic>", "Score_Songs", ["song", "score_ID", "track_number"], song_rows),
+        SeedFile(
+            "<synthetic>",
+            "Movie",
+            ["movie_ID", "movie_title", "average_rating", "num_ratings", "run_time", "score_ID"],
+            movie_rows,
+        ),
+        SeedFile("<synthetic>", "Account", ["account_name", "favorite_movie", "watch_count", "passphrase"], account_rows),
+        SeedFile("<synthetic>", "Crew_Movie", ["crew_ID", "movie_ID"], credit_rows),
+    ]
+
+
+def generate_credits(movies: float = 1, prolific: float = 0, seed: int = 0) -> List[Tuple[int, int]]:
+    """Builds just the credits of a synthetic catalog with SPARSE_CREW credits per movie, for the crew graph
+
+    Args:
+        movies - a float representing how many times the seed data's number of movies to generate
+        prolific - a float representing the share of credits moved to a pool of PROLIFIC_POOL crew members
+        seed - an int seeding the random generator, the same seed always gives the same credits
+
+    Returns:
+        a list of (movie_ID, crew_ID) tuples
+    """
+    catalog = {s.table: s for s in generate_catalog(movies=movies, crew=SPARSE_CREW, songs=0.1, accounts=0.05, seed=seed)}
+    rng = random.Random(seed)
+    credits = []
+    for crew_id, movie_id in catalog["Crew_Movie"].rows:
+        if rng.random() < prolific:
+            crew_id = rng.randint(1, PROLIFIC_POOL)
+        credits.append((movie_id, crew_id))
+    return credits
@@ -0,0 +1,95 @@
+"""Shows that keeping the Top-Rated ranking up to date costs O(log n) per rating, not a rescan.
+
+For every --movies multiple a synthetic catalog (see benchmarks/synthetic.py) is loaded into an
+in-memory SQLite database and these are measured the same way benchmarks/data_layer.py does:
+    add_log            - one rating flushed on its own, which also moves the movie in the top_score index
+    top_rated_movies   - the top 25, read off the index
+    naive top 25       - the top 25 computed with ORDER BY over the weighted score, what the index replaces
+    rebuild_top_rated  - rescoring every movie, what add_log would cost if the ranking were recomputed
+Rows scanned is SQLite's virtual machine steps, as in data_layer.py. A B-tree seek is a single step
+however deep the tree is, so the O(log n) operations stay flat in steps and grow slowly in time,
+while the O(n) ones grow with the catalog. Crew and songs are kept small since the ranking only reads Movie.
+
+Run from the root of the project:
+    python -m benchmarks.top_rated [--movies 1 10 100 1000] [--samples 200] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import random
+from typing import Any, Dict
+
+import utilities.utils as utils
+from benchmarks.common import MeteredSQLiteBackend, measure
+from benchmarks.synthetic import generate_catalog
+
+_NAIVE_TOP = f"""SELECT movie_ID
+    FROM Movie
+    ORDER BY {utils.TOP_SCORE.format(rating_sum="Movie.rating_sum", num_ratings="Movie.num_ratings")} DESC, movie_ID
+    LIMIT 25;"""
+
+
+def _naive_top() -> list:
+    with utils.connection() as db, db.cursor() as cursor:
+        cursor.execute(_NAIVE_TOP)
+        return cursor.fetchall()
+
+
+def run_size(movies: float, samples: int, max_seconds: float, seed: int) -> Dict[str, Any]:
+    """Builds one catalog and measures the ranking operations on it"""
+    seeds = generate_catalog(movies=movies, crew=0.05, songs=0.1, seed=seed)
+    backend = MeteredSQLiteBackend(seeds)
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(backend=backend)
+    rng = random.Random(seed)
+    movie_ids = [row[0] for row in next(s for s in seeds if s.table == "Movie").rows]
+    operations = {
+        "add_log": (
+            lambda: (rng.choice(movie_ids), rng.randint(1, 10) / 2),
+            lambda args: (utils.add_log(*args), utils.flush_watch_log()),
+        ),
+        "top_rated_movies": (lambda: None, lambda _: utils.top_rated_movies(25)),
+        "naive top 25": (lambda: None, lambda _: _naive_top()),
+        "rebuild_top_rated": (lambda: None, lambda _: utils.rebuild_top_rated()),
+    }
+    results = {}
+    try:
+        for name, (prepare, run) in operations.items():
+            results[name] = measure(backend.meter, prepare, run, samples, max_seconds)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+    return {"movies": len(movie_ids), "operations": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Top-Rated ranking")
+    parser.add_argument("--movies", type=float, nargs="+", default=[1, 10, 100, 1000], help="multiples of the seed data's movies")
+    parser.add_argument("--samples", type=int, default=200, help="most timed calls per operation")
+    parser.add_argument("--max-seconds", type=float, default=5, help="how long an operation is sampled for")
+    parser.add_argument("--seed", type=int, default=0, help="seeds the catalog and the logged movies")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    runs = []
+    print(f"{'movies':>8} {'operation':<20} {'p50 ms':>9} {'p99 ms':>9} {'rows scanned':>13} {'ms / log2 n':>12}")
+    for movies in args.movies:
+        run = run_size(movies, args.samples, args.max_seconds, args.seed)
+        runs.append(run)
+        for name, r in run["operations"].items():
+            print(
+                f"{run['movies']:>8} {name:<20} {r['p50_ms']:>9.3f} {r['p99_ms']:>9.3f}"
+                f" {r['rows_scanned_per_op']:>13.0f} {r['p50_ms'] / math.log2(run['movies']):>12.4f}"
+            )
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "top_rated", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
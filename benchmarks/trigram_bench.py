@@ -0,0 +1,117 @@
+"""Compares the trigram search index against the LIKE '%term%' scans it replaced.
+
+The seed titles, crew names, and songs from sql_files/ are replicated 10x and 100x into an
+in-memory SQLite database, and the same terms are run through both paths. SQLite stands in for
+MySQL so the benchmark needs no server; both engines have to full-scan for a leading wildcard.
+"index ms" is a search the index hasn't cached yet, "page ms" a page of 25 from the middle of the
+cached result, what every page after the first costs.
+
+Run from the root of the project:
+    python -m benchmarks.trigram_bench
+"""
+
+import os
+import re
+import sqlite3
+import time
+from typing import Callable, Dict, List, Tuple
+
+from utilities.seed import SQL_DIR, read_seed_file
+from utilities.trigram import CatalogIndex
+from utilities.utils import LIKE_SEARCHES
+
+_SCALES = [10, 100]
+_TERMS = ["the", "an", "love", "kurosawa", "symphony", "zzzz", "e"]
+_REPEATS = 5
+
+
+def _build(scale: int) -> Tuple[sqlite3.Connection, CatalogIndex]:
+    """Loads the seed text columns scale times over into SQLite and into a CatalogIndex"""
+    titles = [r[0] for r in read_seed_file(os.path.join(SQL_DIR, "5_movies_data.sql")).rows]
+    crew = [r[1] for r in read_seed_file(os.path.join(SQL_DIR, "1_crew_data.sql")).rows]
+    songs = [r[0] for r in read_seed_file(os.path.join(SQL_DIR, "4_score_songs_data.sql")).rows]
+
+    db = sqlite3.connect(":memory:")
+    db.executescript(
+        """CREATE TABLE Movie (movie_ID INTEGER PRIMARY KEY, movie_title TEXT, score_ID INT);
+           CREATE TABLE Crew (crew_ID INTEGER PRIMARY KEY, crew_name TEXT);
+           CREATE TABLE Crew_Movie (crew_ID INT, movie_ID INT, PRIMARY KEY (crew_ID, movie_ID));
+           CREATE TABLE Score_Songs (song TEXT, score_ID INT, track_number INT);"""
+    )
+    index = CatalogIndex()
+    movies, crew_rows, credits, song_rows = [], [], [], []
+    for copy in range(scale):
+        for i, title in enumerate(titles):
+            movie_id = copy * len(titles) + i + 1
+            movies.append((movie_id, f"{title} {copy}", movie_id))
+        for i, name in enumerate(crew):
+            crew_id = copy * len(crew) + i + 1
+            crew_rows.append((crew_id, f"{name} {copy}"))
+            credits.append((crew_id, copy * len(titles) + i % len(titles) + 1))
+        for i, song in enumerate(songs):
+            song_rows.append((f"{song} {copy}", copy * len(titles) + i % len(titles) + 1, i))
+
+    db.executemany("INSERT INTO Movie VALUES (?, ?, ?)", movies)
+    db.executemany("INSERT INTO Crew VALUES (?, ?)", crew_rows)
+    db.executemany("INSERT INTO Crew_Movie VALUES (?, ?)", credits)
+    db.executemany("INSERT INTO Score_Songs VALUES (?, ?, ?)", song_rows)
+
+    for movie_id, title, score_id in movies:
+        index.add_movie(movie_id, title, score_id)
+    for crew_id, name in crew_rows:
+        index.add_crew(crew_id, name)
+    by_movie: Dict[int, List[int]] = {}
+    for crew_id, movie_id in credits:
+        by_movie.setdefault(movie_id, []).append(crew_id)
+    for movie_id, crew_ids in by_movie.items():
+        index.add_credits(movie_id, crew_ids)
+    by_score: Dict[int, List[str]] = {}
+    for song, score_id, _ in song_rows:
+        by_score.setdefault(score_id, []).append(song)
+    for score_id, tracks in by_score.items():
+        index.add_songs(score_id, tracks)
+    return db, index
+
+
+def _time(fn: Callable[[], object]) -> float:
+    """Best-of-_REPEATS wall time of fn in milliseconds"""
+    best = float("inf")
+    for _ in range(_REPEATS):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main() -> None:
+    for scale in _SCALES:
+        db, index = _build(scale)
+        searches = {
+            "title": index.search_titles,
+            "crew": index.search_crew,
+            "score": index.search_songs,
+        }
+        num_movies = db.execute("SELECT COUNT(*) FROM Movie").fetchone()[0]
+        print(f"|-- {scale}x seed data --|")
+        print(f"{'kind':<6} {'term':<10} {'hits':>6} {'LIKE ms':>9} {'index ms':>9} {'speedup':>8} {'page ms':>8}")
+        for kind, search in searches.items():
+            sql = re.sub(r"%\((\w+)\)s", r":\1", LIKE_SEARCHES[kind])
+            for term in _TERMS:
+                params = {"term": f"%{term.lower()}%", "after_id": 0, "limit": num_movies}
+                like_hits = {r[0] for r in db.execute(sql, params)}
+                index_hits = set(search(term))
+                assert like_hits == index_hits, f"{kind} search for {term!r} disagrees with LIKE"
+                like_ms = _time(lambda: db.execute(sql, params).fetchall())
+                index_ms = _time(lambda: (index.clear_cache(), search(term)))
+                middle = sorted(index_hits)[len(index_hits) // 2] if index_hits else 0
+                page_ms = _time(lambda: index.search_page(kind, term, middle, 25))
+                print(
+                    f"{kind:<6} {term:<10} {len(index_hits):>6} {like_ms:>9.3f} {index_ms:>9.3f}"
+                    f" {like_ms / max(index_ms, 1e-6):>7.1f}x {page_ms:>8.3f}"
+                )
+        print()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
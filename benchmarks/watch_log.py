@@ -0,0 +1,105 @@
+"""Compares logging movies through the write-behind buffer against committing every log on its own.
+
+A synthetic catalog (see benchmarks/synthetic.py) is loaded into a SQLite database file in a temp
+folder, so every commit really goes to disk. Each run has --threads threads log --logs movies between
+them as synthetic accounts, in two ways:
+    per-log commit  - add_log then flush_watch_log() every time, one transaction per log like add_log used to be
+    write-behind    - add_log only, the buffer groups the logs into a few transactions, flushed once at the end
+Both write the same rows, so the difference is what group commit saves. The time includes the last flush.
+
+Run from the root of the project:
+    python -m benchmarks.watch_log [--threads 1 8] [--logs 2000] [--out results.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List
+
+import utilities.utils as utils
+from benchmarks.synthetic import generate_catalog
+from utilities.backends import SQLiteBackend
+
+
+def _run(threads: int, logs: int, flush_each: bool, movie_ids: List[int], accounts: List[str]) -> Dict[str, Any]:
+    """Logs movies from several threads and waits until every log is written"""
+    before = utils.watch_log_stats()
+    start = threading.Barrier(threads + 1)
+
+    def _log(i: int) -> None:
+        rng = random.Random(i)
+        start.wait()
+        for _ in range(logs // threads):
+            utils.add_log(rng.choice(movie_ids), rng.randint(0, 10) / 2, accounts[i % len(accounts)])
+            if flush_each:
+                utils.flush_watch_log()
+
+    workers = [threading.Thread(target=_log, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    start.wait()
+    began = time.perf_counter()
+    for t in workers:
+        t.join()
+    utils.flush_watch_log()
+    elapsed = time.perf_counter() - began
+
+    after = utils.watch_log_stats()
+    written = after["flushed"] - before["flushed"]
+    transactions = after["flushes"] - before["flushes"]
+    return {
+        "threads": threads,
+        "mode": "per-log commit" if flush_each else "write-behind",
+        "logs": written,
+        "logs_per_second": written / elapsed,
+        "transactions": transactions,
+        "logs_per_transaction": written / max(1, transactions),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the write-behind watch log")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="logging threads to try")
+    parser.add_argument("--logs", type=int, default=2000, help="logs per run, split between the threads")
+    parser.add_argument("--movies", type=float, default=10, help="multiples of the seed data's movies")
+    parser.add_argument("--out", help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    seeds = {seed.table: seed for seed in generate_catalog(movies=args.movies, crew=0.1, songs=0.1)}
+    movie_ids = [row[0] for row in seeds["Movie"].rows]
+    accounts = [row[0] for row in seeds["Account"].rows]
+
+    folder = tempfile.mkdtemp(prefix="betterboxd-bench-")
+    backend = SQLiteBackend(os.path.join(folder, "betterboxd.db"), seeds=list(seeds.values()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        utils.set_up_database(pool_size=max(args.threads) + 1, backend=backend)
+
+    runs = []
+    print(f"{'threads':>7} {'mode':<15} {'logs/s':>9} {'transactions':>13} {'logs/transaction':>17}")
+    try:
+        for threads in args.threads:
+            for flush_each in (True, False):
+                run = _run(threads, args.logs, flush_each, movie_ids, accounts)
+                runs.append(run)
+                print(
+                    f"{threads:>7} {run['mode']:<15} {run['logs_per_second']:>9.0f} {run['transactions']:>13}"
+                    f" {run['logs_per_transaction']:>17.1f}"
+                )
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            utils.disconnect_database()
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "watch_log", "settings": vars(args), "runs": runs}, f, indent=2)
+        print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,60 @@
+import argparse
+import sys
 from pages.homepage import home_page
 from pages.startup import start_up
-from utilities.utils import disconnect_database
+from utilities.backends import SQLiteBackend
+import utilities.instrumentation as instrumentation
+import utilities.settings as settings
+from utilities.utils import disconnect_database, set_up_database
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Betterboxd, a movie logging app")
+    parser.add_argument(
+        "--sqlite",
+        metavar="PATH",
+        help='use an embedded SQLite database at PATH instead of MySQL, ":memory:" for a throwaway one',
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="PORT",
+        type=int,
+        help="serve the JSON API on PORT instead of running the interactive app",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="address the JSON API listens on")
+    parser.add_argument(
+        "--config",
+        metavar="PATH",
+        help=f"read the database settings from this file instead of {settings.CONFIG_FILE}, see utilities/settings.py",
+    )
+    parser.add_argument(
+        "--slow-query-ms",
+        type=float,
+        default=instrumentation.SLOW_QUERY_MS,
+        help="log queries slower than this many milliseconds",
+    )
+    parser.add_argument("--slow-query-log", metavar="PATH", help="append slow queries to this file")
+    parser.add_argument(
+        "--query-stats", action="store_true", help="print per-function query counts when logging out"
+    )
+    args = parser.parse_args()
+    instrumentation.configure(args.slow_query_ms, args.slow_query_log, args.query_stats)
+    settings.configure(args.config)
+
+    backend = SQLiteBackend(args.sqlite) if args.sqlite else None
+    if args.serve is not None:
+        # http.server and its dependencies are half the app's imports, only load them to serve
+        from utilities.service import serve
+
+        try:
+            set_up_database(backend=backend)
+            serve(args.host, args.serve)
+        except KeyboardInterrupt:
+            disconnect_database()
+        sys.exit(0)
+
     print("|-- Welcome to Betterboxd! --|")
     try:
-        start_up()
+        start_up(backend)
         home_page()
     except KeyboardInterrupt:
         disconnect_database()
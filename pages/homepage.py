@@ -12,6 +12,8 @@ def home_page() -> None:
         {"Log a movie": log_movie},
         {"Add a movie to the database": add_movie},
         {"Search the catalog": search},
+        {"Top movies": top_movies},
+        {"Crew connections": crew_connections},
         {"View and edit profile": view_and_edit},
         {"Log out": log_out},
     ]
@@ -24,7 +26,16 @@ def home_page() -> None:
         utils.clear_terminal()
         print("|-- Betterboxd Home Page --|")
         print("What would you like to do?")
-        utils.take_cli_input_with_options(options)()
+        utils.take_cli_input_with_options(options, hidden={"stats": query_stats})()
+
+
+def query_stats() -> None:
+    """Hidden page, type "stats" on the home page to see what every function has sent to the database"""
+    utils.clear_terminal()
+    print("|-- Query Stats --|")
+    print(utils.query_report())
+    if input("\nReset the counters? (y/n): ").strip().lower() == "y":
+        utils.reset_query_stats()
 
 
 def log_movie() -> None:
@@ -54,7 +65,7 @@ def log_movie() -> None:
                 print("Unrecognized input, please try again")
 
         utils.add_log(movie_id, rating)
-        print(f"you've successfully logged {utils.search_for_movie_by_id(movie_id).get_title()}")
+        print(f"you've successfully logged {utils.summarize_movies([movie_id])[0].get_title()}")
         input("Press enter to return to homepage: ")
 
     utils.clear_terminal()
@@ -125,7 +136,7 @@ def add_movie(name: str = None) -> Movie:
 
     hours = runtime // 60
     minutes = runtime % 60
-    runtime = ((hours * 100) + minutes) * 100
+    runtime = f"{hours:02d}:{minutes:02d}:00"
 
     # Get the crew
     print("|-- Crew Entry --|")
@@ -176,49 +187,82 @@ def add_movie(name: str = None) -> Movie:
 def search() -> None:
     """Allows the user to set a filter and search within that category"""
 
+    def _show_pages(kind: str, header: str, term: str, not_found: str) -> None:
+        """Shows search results a page at a time, only fetching the page on screen
+
+        Args:
+            kind - a string, one of "title", "crew", or "score"
+            header - a string containing the page header
+            term - a string we are filtering by
+            not_found - a string containing the message shown when nothing matched
+        """
+        # after_id of every page we've been to, so we can go back
+        pages = [0]
+        while 1:
+            movies, next_after_id = utils.search_page(kind, term, pages[-1])
+            utils.clear_terminal()
+            print(header)
+            if not movies:
+                print(not_found)
+                input("Type anything to return to search menu: ")
+                return
+
+            print(f"Page {len(pages)}\n")
+            for m in movies:
+                m.display_movie()
+                print()
+
+            choices = ["a movie's ID to see more like it"]
+            if next_after_id is not None:
+                choices.append("n for the next page")
+            if len(pages) > 1:
+                choices.append("p for the previous page")
+            choice = input(f"Type {', '.join(choices + ['anything else to return to search menu'])}: ").strip().lower()
+            shown = {m.get_id(): m for m in movies}
+            if choice.isdigit() and int(choice) in shown:
+                more_like_this(shown[int(choice)])
+            elif choice == "n" and next_after_id is not None:
+                pages.append(next_after_id)
+            elif choice == "p" and len(pages) > 1:
+                pages.pop()
+            else:
+                return
+
     def _sort_title() -> None:
         """Searches by title"""
         utils.clear_terminal()
         print("|-- Seach Movie by Title --|")
         term = input("Enter your search term: ")
-        movies = utils.search_by_title_inexact(term)
-        if movies:
-            for m in movies:
-                m.display_movie()
-                print()
-        else:
-            print(f'Sorry, could not find any movies with "{term}" in the title')
-        input("Type anything to return to search menu: ")
+        _show_pages(
+            "title",
+            "|-- Seach Movie by Title --|",
+            term,
+            f'Sorry, could not find any movies with "{term}" in the title',
+        )
 
     def _sort_crew() -> None:
         """Searches by crew members"""
         utils.clear_terminal()
         print("|-- Seach Movie by Crew --|")
         term = input("Enter your search term: ")
-        movies = utils.search_by_crew_inexact(term)
-        if movies:
-            for m in movies:
-                m.display_movie()
-                print()
-        else:
-            print(f'Sorry, could not find any movies where the crew included the "{term}"')
-        input("Type anything to return to search menu: ")
+        _show_pages(
+            "crew",
+            "|-- Seach Movie by Crew --|",
+            term,
+            f'Sorry, could not find any movies where the crew included the "{term}"',
+        )
 
     def _sort_score() -> None:
         """Searches by songs"""
         utils.clear_terminal()
         print("|-- Seach Movie by Score --|")
         term = input("Enter your search term: ")
-        movies = utils.search_by_score_inexact(term)
-        if movies:
-            for m in movies:
-                m.display_movie()
-                print()
-        else:
-            print(
-                f'Sorry, could not find any movies where the score included songs with "{term}" in the title'
-            )
-        input("Type anything to return to search menu: ")
+        _show_pages(
+            "score",
+            "|-- Seach Movie by Score --|",
+            term,
+            f'Sorry, could not find any movies where the score included songs with "{term}" in the title',
+        )
 
     def _go_back() -> None:
         """Raises GoBackException so the function knows to return to the homepage menu"""
@@ -241,6 +285,109 @@ def search() -> None:
             return
 
 
+def top_movies() -> None:
+    """Shows the highest rated movies. Scores are weighted towards the average rating of every movie,
+    so a movie needs plenty of good ratings to make the list, not just one
+    """
+    utils.clear_terminal()
+    print("|-- Top Movies --|")
+    ranking = utils.top_rated_movies()
+    if not ranking:
+        print("No movies have been rated yet")
+    for i, (mov, score) in enumerate(ranking):
+        print(f"{i + 1:>3}. {mov.get_title()} - {round(score, 2)} ({round(mov.get_avg_rating(), 2)} stars from {mov.get_num_rating()} ratings)")
+    input("\nType anything to return to the homepage: ")
+
+
+def more_like_this(mov: Movie) -> None:
+    """Shows the movies that share the most crew with a movie, where a shared director counts for more
+    than someone who worked on hundreds of movies
+
+    Args:
+        mov - a Movie to find similar movies for
+    """
+    utils.clear_terminal()
+    print(f"|-- More Like {mov.get_title()} --|")
+    similar = utils.similar_movies(mov.get_id())
+    if not similar:
+        print("No other movies share crew with this one")
+    for i, (other, score) in enumerate(similar):
+        print(f"{i + 1:>3}. {other.get_title()} - {round(score, 2)} shared crew score ({round(other.get_avg_rating(), 2)} stars from {other.get_num_rating()} ratings)")
+    input("\nType anything to go back: ")
+
+
+def crew_connections() -> None:
+    """Shows who a crew member works with most, and how any two crew members are connected through movies"""
+
+    def _input_crew(prompt: str) -> int:
+        """Asks for a crew member by name until one is found
+
+        Returns:
+            an int representing the crew member's ID, or None if the user gives up
+        """
+        while 1:
+            name = input(prompt)
+            if not name:
+                return None
+            if (crew_id := utils.search_for_crew_by_name_exact(name)) is not None:
+                return crew_id
+            print(f'Sorry, we could not find anyone named "{name}", try again or press enter to go back')
+
+    def _collaborators() -> None:
+        """Lists a crew member's most frequent collaborators"""
+        utils.clear_terminal()
+        print("|-- Frequent Collaborators --|")
+        crew_id = _input_crew("Enter the name of a crew member: ")
+        if crew_id is None:
+            return
+        ranking = utils.top_collaborators(crew_id)
+        if not ranking:
+            print("They haven't worked with anyone else yet")
+        for i, (_, name, together) in enumerate(ranking):
+            print(f"{i + 1:>3}. {name} - {together} movie{'s' if together != 1 else ''} together")
+        input("\nType anything to go back: ")
+
+    def _connection() -> None:
+        """Shows the fewest movies connecting two crew members"""
+        utils.clear_terminal()
+        print("|-- How Are They Connected? --|")
+        from_crew = _input_crew("Enter the name of the first crew member: ")
+        if from_crew is None:
+            return
+        to_crew = _input_crew("Enter the name of the second crew member: ")
+        if to_crew is None:
+            return
+        links = utils.crew_connection(from_crew, to_crew)
+        if links is None:
+            print("They aren't connected through any movies we know of")
+        elif not links:
+            print("That's the same person!")
+        else:
+            print(f"{len(links)} movie{'s' if len(links) != 1 else ''} apart:")
+        for name, mov, next_name in links or []:
+            print(f"\t{name} worked on {mov.get_title()} with {next_name}")
+        input("\nType anything to go back: ")
+
+    def _go_back() -> None:
+        """Raises GoBackException so the function knows to return to the homepage menu"""
+        raise utils.GoBackException
+
+    options = [
+        {"Frequent collaborators": _collaborators},
+        {"How are two people connected": _connection},
+        {"Go back": _go_back},
+    ]
+
+    while 1:
+        utils.clear_terminal()
+        print("|-- Crew Connections --|")
+        print("What would you like to find?")
+        try:
+            utils.take_cli_input_with_options(options)()
+        except utils.GoBackException:
+            return
+
+
 def view_and_edit() -> None:
     """Displays info about the user profile, allows you to change it"""
 
@@ -255,7 +402,15 @@ def view_and_edit() -> None:
         if user.get_fav_movie_id() is None:
             print("Has not been chosen yet")
         else:
-            print(f"{utils.search_for_movie_by_id(user.get_fav_movie_id()).get_title()}")
+            print(f"{utils.summarize_movies([user.get_fav_movie_id()])[0].get_title()}")
+        print("Recently Logged:")
+        # logs from this session may still be waiting in the write-behind buffer
+        utils.flush_watch_log()
+        history = utils.get_watch_history(user.get_username())
+        if not history:
+            print("\tNothing yet")
+        for mov, rating, logged_at in history:
+            print(f"\t{logged_at[:16]}  {mov.get_title()} - {rating} stars")
         print()
         input("Type anthing to return to the account page: ")
         return
@@ -1,48 +1,43 @@
 import utilities.utils as utils
+from utilities.backends import Backend
+from utilities.user import User
 import hashlib
 
 
-def start_up():
+def start_up(backend: Backend = None):
     """Startup function for Betterboxd
     Acts as the entry point into the app, according to the flowchart,
     takes user input and handles unrecognized errors
+
+    Args:
+        backend - the Backend to store everything in, defaults to asking for a MySQL server
     """
     options = [
         {"Sign Up": sign_up},
         {"Log In": log_in},
     ]
 
-    utils.set_up_database()
+    utils.set_up_database(backend=backend)
     utils.clear_terminal()
     print("What would you like to do?")
-    user = utils.take_cli_input_with_options(options)().lower()
+    user = utils.take_cli_input_with_options(options)()
     utils.set_current_user(user)
 
 
-def sign_up() -> str:
+def sign_up() -> User:
     """Sign up function for Betterboxd
     Safely adds a new person to the database, handling user input
 
     Returns:
-        a string representing the currently logged in user
+        the User that was just created, who is now logged in
     """
-    username = password = ""
+    password = ""
 
     utils.clear_terminal()
     print("|-- Sign Up for Betterboxd --|")
 
     # get username
-    while 1:
-        username = input(
-            f"Enter your username (max {utils.MAX_USERNAME_LENGTH} characters): "
-        ).lower()
-        if len(username) <= utils.MAX_USERNAME_LENGTH:
-
-            if not utils.user_exists(username):
-                break
-            print("Sorry, a user with that name already exists, please choose another one")
-        else:
-            print("Sorry, that username is too long, please try again")
+    username = _input_username()
 
     # get password
     while 1:
@@ -54,16 +49,35 @@ def sign_up() -> str:
     # hash password
     hashed_password = hashlib.sha256(password.encode()).hexdigest()
 
-    utils.add_to_users(username, hashed_password)
-    return username
+    # the insert itself tells us if the name is taken, so keep the password and ask for another name
+    user = utils.add_to_users(username, hashed_password)
+    while user is None:
+        print("Sorry, a user with that name already exists, please choose another one")
+        user = utils.add_to_users(_input_username(), hashed_password)
+    return user
+
+
+def _input_username() -> str:
+    """Asks for a new username until one is short enough
+
+    Returns:
+        a string representing the lowercase username
+    """
+    while 1:
+        username = input(
+            f"Enter your username (max {utils.MAX_USERNAME_LENGTH} characters): "
+        ).lower()
+        if len(username) <= utils.MAX_USERNAME_LENGTH:
+            return username
+        print("Sorry, that username is too long, please try again")
 
 
-def log_in() -> str:
+def log_in() -> User:
     """Log in function for Betterboxd
     Safely checks if a user is in the database
 
     Returns:
-        a string representing the currently logged in user
+        the User that just logged in
     """
     username = password = ""
     failed_attempts = 0
@@ -72,43 +86,26 @@ def log_in() -> str:
     utils.clear_terminal()
     print("|-- Log In To Betterboxd --|")
 
-    # get the username
+    # get the username and password, then check both with one query
     while 1:
         username = input("Enter your username: ")
-        if len(username) <= utils.MAX_USERNAME_LENGTH and utils.user_exists(username):
-            break
-
-        print("User not found, try again")
-        failed_attempts += 1
-
-        # if they fail too many times let them go back
-        if failed_attempts == max_failed_attempts:
-            print(
-                f"Username lookup failed {failed_attempts} times, would you like to create an account instead?"
-            )
-            if input("Type 1 for yes, anything else to keep trying: ") == "1":
-                return sign_up()
-            failed_attempts = 0
-    failed_attempts = 0
-
-    # get the password
-    while 1:
         password = input("Enter your password: ")
         hashed_password = hashlib.sha256(password.encode()).hexdigest()
-        if utils.password_correct(username, hashed_password):
+        user = utils.authenticate(username, hashed_password)
+        if user is not None:
             break
 
-        print("Incorrect password, try again")
+        print("Wrong username or password, try again")
         failed_attempts += 1
 
         # if they fail too many times let them go back
         if failed_attempts == max_failed_attempts:
             print(
-                f"Username lookup failed {failed_attempts} times, would you like to create an account instead?"
+                f"Log in failed {failed_attempts} times, would you like to create an account instead?"
             )
             if input("Type 1 for yes, anything else to keep trying: ") == "1":
                 return sign_up()
             failed_attempts = 0
 
     # treat them as logged in
-    return username
+    return user
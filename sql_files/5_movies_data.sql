@@ -1,6 +1,6 @@
 INSERT INTO Movie (movie_title, average_rating, num_ratings, run_time, score_ID)
 VALUES ('Harakiri', 4.68, 100,'02:15:00', 1),
-       ('Come and See', 72, 4.64, '02:22:00', 2),
+       ('Come and See', 4.64, 72, '02:22:00', 2),
        ('12 Angry Men', 4.62, 5, '01:37:00', 3),
        ('Seven Samurai', 4.60, 77, '03:27:00', 4),
        ('The Godfather: Part II', 4.59, 1000, '03:22:00', 5),
@@ -0,0 +1,18 @@
+-- Secondary indexes for the lookups in utilities/utils.py.
+-- InnoDB only adds implicit single-column indexes for foreign keys, these replace them with
+-- composite ones that also cover the columns each query reads or sorts by.
+
+-- exact title search, search_for_movie_by_title_exact
+CREATE INDEX idx_movie_title ON Movie (movie_title);
+
+-- crew lookup by name when adding a movie
+CREATE INDEX idx_crew_name ON Crew (crew_name);
+
+-- songs of a score in track order, movie hydration
+CREATE INDEX idx_score_songs_score ON Score_Songs (score_ID, track_number);
+
+-- every job of a crew member, movie hydration
+CREATE INDEX idx_crew_job_crew ON Crew_Job (crew_ID, job);
+
+-- crew of a movie, the primary key only covers crew_ID leading lookups
+CREATE INDEX idx_crew_movie_movie ON Crew_Movie (movie_ID, crew_ID);
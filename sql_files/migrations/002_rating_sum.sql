@@ -0,0 +1,10 @@
+-- Store ratings as an exact running sum and count so add_log can update them atomically in one
+-- statement. The average is derived on read as rating_sum / num_ratings.
+
+ALTER TABLE Movie ADD COLUMN rating_sum DOUBLE NOT NULL DEFAULT 0;
+
+UPDATE Movie SET num_ratings = 0 WHERE num_ratings IS NULL;
+
+UPDATE Movie SET rating_sum = COALESCE(average_rating, 0) * num_ratings;
+
+ALTER TABLE Movie DROP COLUMN average_rating;
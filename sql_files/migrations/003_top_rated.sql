@@ -0,0 +1,27 @@
+-- Materialized Top-Rated ranking. Every movie keeps a Bayesian-weighted score, its ratings blended
+-- with prior_weight imaginary ratings of prior_mean, so a movie with one 5 star rating doesn't
+-- outrank one with hundreds of 4.8s. add_log updates a movie's score along with its ratings, and
+-- the index answers top-N without scanning Movie.
+-- The prior is the mean of every rating and the mean number of ratings per movie, it stays fixed
+-- until utils.rebuild_top_rated() recomputes it.
+
+CREATE TABLE Rating_Prior (
+    prior_ID     INT,
+    prior_mean   DOUBLE NOT NULL,
+    prior_weight DOUBLE NOT NULL,
+    PRIMARY KEY (prior_ID)
+);
+
+INSERT INTO Rating_Prior(prior_ID, prior_mean, prior_weight)
+SELECT 1, COALESCE(SUM(rating_sum) / NULLIF(SUM(num_ratings), 0), 0), COALESCE(AVG(num_ratings), 0)
+FROM Movie;
+
+ALTER TABLE Movie ADD COLUMN top_score DOUBLE NOT NULL DEFAULT 0;
+
+UPDATE Movie
+SET top_score = COALESCE(
+    (SELECT (p.prior_weight * p.prior_mean + Movie.rating_sum) / NULLIF(p.prior_weight + Movie.num_ratings, 0)
+     FROM Rating_Prior p
+     WHERE p.prior_ID = 1), 0);
+
+CREATE INDEX idx_movie_top_score ON Movie (top_score DESC, movie_ID);
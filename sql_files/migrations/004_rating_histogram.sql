@@ -0,0 +1,12 @@
+-- Per-movie rating distribution in half-star buckets, bucket is the rating times two (0 is 0.0 stars,
+-- 10 is 5.0 stars). Every movie has all 11 rows, so add_log only ever bumps a counter in place.
+-- Movies that already exist are filled in by utils.backfill_rating_histograms(), which runs whenever
+-- the app sets the database up and can be run on its own with `python -m utilities.histogram`.
+
+CREATE TABLE Rating_Histogram (
+    movie_ID    INT,
+    bucket      INT,
+    num_ratings INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (movie_ID, bucket),
+    FOREIGN KEY (movie_ID) REFERENCES Movie (movie_ID)
+);
@@ -0,0 +1,16 @@
+-- Append-only history of every log, written in batches by the write-behind buffer in utils.add_log.
+-- account_name is NULL for logs made without an account, like the benchmarks'.
+
+CREATE TABLE Watch_Log (
+    log_ID       INT AUTO_INCREMENT,
+    account_name VARCHAR(32),
+    movie_ID     INT NOT NULL,
+    rating       DOUBLE NOT NULL,
+    logged_at    DATETIME(6) NOT NULL,
+    PRIMARY KEY (log_ID),
+    FOREIGN KEY (account_name) REFERENCES Account (account_name),
+    FOREIGN KEY (movie_ID) REFERENCES Movie (movie_ID)
+);
+
+-- a user's history, newest first
+CREATE INDEX idx_watch_log_account ON Watch_Log (account_name, logged_at);
@@ -0,0 +1,14 @@
+-- SQLite version of 005_watch_log.sql, AUTO_INCREMENT keys have to be rowid aliases and text compares
+-- case-insensitively like MySQL's default collation.
+
+CREATE TABLE Watch_Log (
+    log_ID       INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_name VARCHAR(32) COLLATE NOCASE,
+    movie_ID     INT NOT NULL,
+    rating       DOUBLE NOT NULL,
+    logged_at    DATETIME NOT NULL,
+    FOREIGN KEY (account_name) REFERENCES Account (account_name),
+    FOREIGN KEY (movie_ID) REFERENCES Movie (movie_ID)
+);
+
+CREATE INDEX idx_watch_log_account ON Watch_Log (account_name, logged_at);
@@ -0,0 +1,32 @@
+-- Databases loaded from 5_movies_data.sql before it was fixed have 'Come and See', seeded as movie 2, with its
+-- average rating and number of ratings swapped: 5 ratings averaging 72 stars, num_ratings is an INT so 4.64
+-- was rounded. 002 turned that into a rating_sum of 360. Replace the seed's share with the right 72 ratings
+-- averaging 4.64, keeping every log added since.
+-- A log adds at most 5 stars, so the movie averages over 5 stars for as long as the bad seed row is in it.
+-- Once it's fixed, or in a database loaded from the fixed seed file, it never matches.
+-- Copies of the movie in a database scaled up by the bootstrap tool are left alone, rebuild those.
+
+-- its histogram was backfilled from the 72 star average, utils.backfill_rating_histograms() rebuilds it
+-- from the corrected one the next time the app starts
+DELETE FROM Rating_Histogram
+WHERE movie_ID IN (
+    SELECT movie_ID
+    FROM Movie
+    WHERE movie_ID = 2 AND movie_title = 'Come and See' AND rating_sum > 5 * num_ratings);
+
+UPDATE Movie
+SET rating_sum = rating_sum - 360 + 4.64 * 72, num_ratings = num_ratings - 5 + 72
+WHERE movie_ID = 2 AND movie_title = 'Come and See' AND rating_sum > 5 * num_ratings;
+
+-- the Top-Rated prior was computed with the 72 star average in it, refresh it and rescore every movie
+-- the same way utils.rebuild_top_rated() does
+UPDATE Rating_Prior
+SET prior_mean = (SELECT COALESCE(SUM(rating_sum) / NULLIF(SUM(num_ratings), 0), 0) FROM Movie),
+    prior_weight = (SELECT COALESCE(AVG(num_ratings), 0) FROM Movie)
+WHERE prior_ID = 1;
+
+UPDATE Movie
+SET top_score = COALESCE(
+    (SELECT (p.prior_weight * p.prior_mean + Movie.rating_sum) / NULLIF(p.prior_weight + Movie.num_ratings, 0)
+     FROM Rating_Prior p
+     WHERE p.prior_ID = 1), 0);
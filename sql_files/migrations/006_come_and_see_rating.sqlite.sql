@@ -0,0 +1,28 @@
+-- SQLite version of 006_come_and_see_rating.sql. SQLite keeps 4.64 in an INT column as it is instead
+-- of rounding it, so the seed's share is 4.64 ratings. Their rating_sum, 72 * 4.64, is already right.
+-- num_ratings is rounded back to a whole number, 4.64 - 4.64 isn't exactly 0 in floating point.
+
+-- its histogram was backfilled from the 72 star average, utils.backfill_rating_histograms() rebuilds it
+-- from the corrected one the next time the app starts
+DELETE FROM Rating_Histogram
+WHERE movie_ID IN (
+    SELECT movie_ID
+    FROM Movie
+    WHERE movie_ID = 2 AND movie_title = 'Come and See' AND rating_sum > 5 * num_ratings);
+
+UPDATE Movie
+SET num_ratings = CAST(ROUND(num_ratings - 4.64 + 72) AS INTEGER)
+WHERE movie_ID = 2 AND movie_title = 'Come and See' AND rating_sum > 5 * num_ratings;
+
+-- the Top-Rated prior was computed with the 72 star average in it, refresh it and rescore every movie
+-- the same way utils.rebuild_top_rated() does
+UPDATE Rating_Prior
+SET prior_mean = (SELECT COALESCE(SUM(rating_sum) / NULLIF(SUM(num_ratings), 0), 0) FROM Movie),
+    prior_weight = (SELECT COALESCE(AVG(num_ratings), 0) FROM Movie)
+WHERE prior_ID = 1;
+
+UPDATE Movie
+SET top_score = COALESCE(
+    (SELECT (p.prior_weight * p.prior_mean + Movie.rating_sum) / NULLIF(p.prior_weight + Movie.num_ratings, 0)
+     FROM Rating_Prior p
+     WHERE p.prior_ID = 1), 0);
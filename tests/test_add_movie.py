@@ -0,0 +1,102 @@
+"""Adds movies whose crew are named almost like existing crew and checks who gets credited.
+
+MySQL's default collation ignores case and accents, so looking up "Tetsuro Tamba" also finds "Tetsurō Tamba".
+The names are only the same person when they match ignoring case, like the app has always treated them.
+Runs on a throwaway SQLite file whose text columns compare the way MySQL's do, no MySQL server needed.
+
+Run from the root of the project:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unicodedata
+import unittest
+
+import utilities.utils as utils
+from utilities.backends import SQLiteBackend
+from utilities.movie import Movie
+
+
+def _fold(text: str) -> str:
+    """Drops accents and case, close enough to MySQL's utf8mb4_0900_ai_ci for the names used here"""
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)).casefold()
+
+
+def _compare_ignoring_accents(a: str, b: str) -> int:
+    a, b = _fold(a), _fold(b)
+    return (a > b) - (a < b)
+
+
+class _AccentInsensitiveSQLiteBackend(SQLiteBackend):
+    """SQLite with the NOCASE collation every text column uses swapped for one that also ignores accents.
+    Every connection has to use it, including the one that builds the database and its indexes
+    """
+
+    def connect(self):
+        db = super().connect()
+        db.raw.create_collation("NOCASE", _compare_ignoring_accents)
+        return db
+
+
+def _quietly(function, *args, **kwargs):
+    """Calls a function without letting it print"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def _add_movie(title: str, crew: dict) -> Movie:
+    return utils.add_movie_to_database(Movie(-1, title, "01:40:00", 0, 0, -1, crew, ["Main Title"]))
+
+
+class AddMovieCrewTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        backend = _AccentInsensitiveSQLiteBackend(os.path.join(directory.name, "test.db"))
+        _quietly(utils.set_up_database, backend=backend)
+        self.addCleanup(_quietly, utils.disconnect_database)
+
+    def _crew_ids(self, name: str) -> list:
+        """Gets the IDs of every crew member named exactly name"""
+        with utils.connection() as db, db.cursor() as cursor:
+            cursor.execute("SELECT crew_ID, crew_name FROM Crew WHERE crew_name = %s;", (name,))
+            return [crew_id for crew_id, crew_name in cursor.fetchall() if crew_name == name]
+
+    def _credited(self, movie_id: int) -> set:
+        """Gets the names of everyone credited on a movie"""
+        with utils.connection() as db, db.cursor() as cursor:
+            cursor.execute(
+                """SELECT c.crew_name
+                   FROM Crew_Movie cm
+                   JOIN Crew c ON c.crew_ID = cm.crew_ID
+                   WHERE cm.movie_ID = %s;""",
+                (movie_id,),
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_name_that_only_differs_by_an_accent_is_someone_else(self):
+        first = _add_movie("Harakiri Again", {"Tetsurō Tamba": ["Actor"], "Toru Takemitsu": ["Composer"]})
+        second = _add_movie("Hara-Kiri Again", {"Tetsuro Tamba": ["Actor"], "Toru Takemitsu": ["Composer"]})
+
+        self.assertEqual(len(self._crew_ids("Tetsurō Tamba")), 1)
+        self.assertEqual(len(self._crew_ids("Tetsuro Tamba")), 1)
+        self.assertEqual(self._credited(first.get_id()), {"Tetsurō Tamba", "Toru Takemitsu"})
+        self.assertEqual(self._credited(second.get_id()), {"Tetsuro Tamba", "Toru Takemitsu"})
+        self.assertEqual(second.get_crew(), {"Tetsuro Tamba": ["Actor"], "Toru Takemitsu": ["Composer"]})
+
+    def test_name_that_only_differs_by_case_is_the_same_person(self):
+        first = _add_movie("Harakiri Again", {"Tetsurō Tamba": ["Actor"], "Toru Takemitsu": ["Composer"]})
+        second = _add_movie("Hara-Kiri Again", {"TETSURŌ TAMBA": ["Writer"], "Toru Takemitsu": ["Composer"]})
+
+        crew_ids = self._crew_ids("Tetsurō Tamba")
+        self.assertEqual(len(crew_ids), 1)
+        self.assertEqual(self._crew_ids("TETSURŌ TAMBA"), [])
+        self.assertEqual(self._credited(first.get_id()), self._credited(second.get_id()))
+        self.assertEqual(sorted(second.get_crew()["Tetsurō Tamba"]), ["Actor", "Writer"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""Logs one movie from several processes at once and checks that no rating is lost.
+
+Every process calls add_log for the same movie and flushes its write-behind buffer after every few logs.
+A buffer flushes one batch at a time, so it takes several processes for the batched atomic UPDATEs to
+really run at once. With the old read-modify-write add_log concurrent loggers overwrote each other; the
+UPDATEs have to account for every log. The movie's rating_sum, num_ratings, top_score, rating histogram,
+and the test's Watch_Log rows are put back afterwards.
+
+MySQLRatingConcurrencyTest is the one that matters, it needs a set up MySQL database so it only runs when
+BETTERBOXD_TEST_DB_HOST is set (with BETTERBOXD_TEST_DB_USER and BETTERBOXD_TEST_DB_PASSWORD if they aren't
+root and empty). SQLiteRatingConcurrencyTest always runs on a throwaway file, but SQLite lets one connection
+write at a time, so there it only checks that flushes wait for the write lock instead of failing.
+Run from the root of the project:
+    BETTERBOXD_TEST_DB_HOST=localhost python -m unittest discover tests
+"""
+
+import contextlib
+import functools
+import io
+import multiprocessing
+import os
+import tempfile
+import unittest
+from typing import Callable
+
+try:
+    import mysql.connector
+except ImportError:
+    mysql = None
+
+import utilities.utils as utils
+from utilities.backends import Backend, MySQLBackend, SQLiteBackend
+from utilities.histogram import bucket_of
+
+_HOST = os.environ.get("BETTERBOXD_TEST_DB_HOST", "")
+_USER = os.environ.get("BETTERBOXD_TEST_DB_USER", "root")
+_PASSWORD = os.environ.get("BETTERBOXD_TEST_DB_PASSWORD", "")
+
+_MOVIE_ID = utils.DEFAULT_MOVIE_ID
+_PROCESSES = 4
+_FLUSHES_PER_PROCESS = 10
+_LOGS_PER_FLUSH = 20
+_RATING = 3.5
+
+
+def _quietly(function, *args, **kwargs):
+    """Calls a function without letting it print"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def _log_from_own_process(make_backend: Callable[[], Backend]) -> None:
+    """Runs in a process of its own: sets up the database, logs the movie under test, and flushes as it goes"""
+    _quietly(utils.set_up_database, backend=make_backend())
+    try:
+        for _ in range(_FLUSHES_PER_PROCESS):
+            for _ in range(_LOGS_PER_FLUSH):
+                utils.add_log(_MOVIE_ID, _RATING)
+            utils.flush_watch_log()
+    finally:
+        _quietly(utils.disconnect_database)
+
+
+class _RatingConcurrency:
+    """The test itself, the TestCases below run it against each backend"""
+
+    def make_backend(self) -> Backend:
+        """Makes the backend under test, has to be picklable so the logging processes can make their own"""
+        raise NotImplementedError
+
+    def setUp(self):
+        # sets up a new database before the logging processes race to
+        _quietly(utils.set_up_database, backend=self.make_backend())
+        _quietly(utils.disconnect_database)
+        # the test checks and repairs the movie over a connection of its own
+        self.db = self.make_backend().connect()
+        self.addCleanup(self.db.close)
+
+    def _totals(self) -> tuple:
+        """Reads the raw rating_sum, num_ratings, top_score, and histogram bucket count of the movie under test"""
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                """SELECT m.rating_sum, m.num_ratings, m.top_score,
+                          (SELECT COALESCE(SUM(h.num_ratings), 0)
+                           FROM Rating_Histogram h
+                           WHERE h.movie_ID = m.movie_ID AND h.bucket = %(bucket)s)
+                   FROM Movie m
+                   WHERE m.movie_ID = %(movie_id)s;""",
+                {"movie_id": _MOVIE_ID, "bucket": bucket_of(_RATING)},
+            )
+            return cursor.fetchone()
+
+    def _last_log_id(self) -> int:
+        with self.db.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(MAX(log_ID), 0) FROM Watch_Log;")
+            return cursor.fetchone()[0]
+
+    def _put_back(self, before: tuple, last_log_id: int) -> None:
+        """Puts the movie back the way the test found it and deletes the test's logs"""
+        with self.db.cursor() as cursor:
+            cursor.execute(
+                """UPDATE Movie
+                   SET rating_sum = %(sum)s, num_ratings = %(count)s, top_score = %(score)s
+                   WHERE movie_ID = %(movie_id)s;""",
+                {"sum": before[0], "count": before[1], "score": before[2], "movie_id": _MOVIE_ID},
+            )
+            cursor.execute(
+                """UPDATE Rating_Histogram
+                   SET num_ratings = %(count)s
+                   WHERE movie_ID = %(movie_id)s AND bucket = %(bucket)s;""",
+                {"count": before[3], "movie_id": _MOVIE_ID, "bucket": bucket_of(_RATING)},
+            )
+            cursor.execute(
+                """DELETE FROM Watch_Log
+                   WHERE log_ID > %(last_log_id)s AND movie_ID = %(movie_id)s AND account_name IS NULL;""",
+                {"last_log_id": last_log_id, "movie_id": _MOVIE_ID},
+            )
+
+    def test_concurrent_logs_lose_no_ratings(self):
+        before_sum, before_count, _, before_bucket = before = self._totals()
+        last_log_id = self._last_log_id()
+        try:
+            # spawned, not forked, so no process inherits the test's connection
+            with multiprocessing.get_context("spawn").Pool(_PROCESSES) as pool:
+                pool.starmap(_log_from_own_process, [(self.make_backend,)] * _PROCESSES)
+            after_sum, after_count, _, after_bucket = self._totals()
+        finally:
+            self._put_back(before, last_log_id)
+
+        expected = _PROCESSES * _FLUSHES_PER_PROCESS * _LOGS_PER_FLUSH
+        self.assertEqual(after_count - before_count, expected)
+        self.assertAlmostEqual(float(after_sum - before_sum), expected * _RATING)
+        self.assertEqual(after_bucket - before_bucket, expected)
+
+
+@unittest.skipUnless(_HOST, "set BETTERBOXD_TEST_DB_HOST to run against a MySQL server")
+@unittest.skipIf(mysql is None, "mysql-connector-python isn't installed")
+class MySQLRatingConcurrencyTest(_RatingConcurrency, unittest.TestCase):
+    make_backend = staticmethod(functools.partial(MySQLBackend, _HOST, _USER, _PASSWORD))
+
+
+class SQLiteRatingConcurrencyTest(_RatingConcurrency, unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.make_backend = functools.partial(SQLiteBackend, os.path.join(directory.name, "test.db"))
+        super().setUp()
+
+
+if __name__ == "__main__":
+    unittest.main()
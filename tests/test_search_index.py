@@ -0,0 +1,72 @@
+"""Adds a movie the way another process would, straight into the database, and checks the searches find it.
+
+index_movie only indexes movies this process adds, so before every search the index reads the movies with
+IDs above the highest one it has seen. Runs on a throwaway SQLite file, no MySQL server needed.
+
+Run from the root of the project:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import utilities.utils as utils
+from utilities.backends import SQLiteBackend
+
+
+def _quietly(function, *args, **kwargs):
+    """Calls a function without letting it print"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+class SearchIndexSyncTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = SQLiteBackend(os.path.join(directory.name, "test.db"))
+        _quietly(utils.set_up_database, backend=self.backend)
+        self.addCleanup(_quietly, utils.disconnect_database)
+
+    def _add_movie_elsewhere(self) -> int:
+        """Writes a movie with one crew member and one song on a connection of its own, skipping index_movie"""
+        db = self.backend.connect()
+        try:
+            db.start_transaction()
+            with db.cursor() as cursor:
+                cursor.execute("INSERT INTO Crew(crew_name) VALUES (%s);", ("Quillon Vantablack",))
+                crew_id = cursor.lastrowid
+                cursor.execute("SELECT COALESCE(MAX(score_ID), 0) + 1 FROM Score;")
+                score_id = cursor.fetchone()[0]
+                cursor.execute("INSERT INTO Score(score_ID, crew_ID) VALUES (%s, %s);", (score_id, crew_id))
+                cursor.execute(
+                    "INSERT INTO Score_Songs(song, score_ID, track_number) VALUES (%s, %s, %s);",
+                    ("Xylophone Overture", score_id, "1"),
+                )
+                cursor.execute(
+                    """INSERT INTO Movie(run_time, num_ratings, movie_title, score_ID)
+                       VALUES (%s, %s, %s, %s);""",
+                    ("01:30:00", 0, "Zyzzyva Nights", score_id),
+                )
+                movie_id = cursor.lastrowid
+                cursor.execute("INSERT INTO Crew_Movie(crew_ID, movie_ID) VALUES (%s, %s);", (crew_id, movie_id))
+            db.commit()
+        finally:
+            db.close()
+        return movie_id
+
+    def test_searches_find_a_movie_added_by_another_process(self):
+        self.assertEqual(utils.search_ids_page("title", "zyzzyva")[0], [])
+
+        movie_id = self._add_movie_elsewhere()
+
+        self.assertEqual(utils.search_ids_page("title", "zyzzyva")[0], [movie_id])
+        self.assertEqual(utils.search_ids_page("crew", "vantablack")[0], [movie_id])
+        self.assertEqual(utils.search_ids_page("score", "xylophone")[0], [movie_id])
+
+
+if __name__ == "__main__":
+    unittest.main()
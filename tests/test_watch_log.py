@@ -0,0 +1,57 @@
+"""Flushes a batch of logs where one log is for a movie that doesn't exist and checks only that one is dropped.
+
+The Watch_Log insert fails the foreign key to Movie, which MySQL always enforces and SQLite only does because
+SQLiteBackend turns it on for every connection. Runs on a throwaway SQLite file, no MySQL server needed.
+
+Run from the root of the project:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import utilities.utils as utils
+from utilities.backends import SQLiteBackend
+
+_MISSING_MOVIE_ID = 10**9
+
+
+def _quietly(function, *args, **kwargs):
+    """Calls a function without letting it print"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+class WatchLogDeadLetterTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        _quietly(utils.set_up_database, backend=SQLiteBackend(os.path.join(directory.name, "test.db")))
+        self.addCleanup(_quietly, utils.disconnect_database)
+
+    def _num_ratings(self, movie_id: int) -> int:
+        with utils.connection() as db, db.cursor() as cursor:
+            cursor.execute("SELECT num_ratings FROM Movie WHERE movie_ID = %s;", (movie_id,))
+            return cursor.fetchone()[0]
+
+    def test_log_for_missing_movie_is_dropped_and_the_rest_are_written(self):
+        before = self._num_ratings(utils.DEFAULT_MOVIE_ID)
+
+        utils.add_log(utils.DEFAULT_MOVIE_ID, 4.0)
+        utils.add_log(_MISSING_MOVIE_ID, 3.0)
+        utils.add_log(utils.DEFAULT_MOVIE_ID, 5.0)
+        with self.assertLogs("betterboxd.write_behind", "ERROR"):
+            self.assertEqual(utils.flush_watch_log(), 2)
+
+        self.assertEqual(self._num_ratings(utils.DEFAULT_MOVIE_ID), before + 2)
+        self.assertEqual(utils.watch_log_stats()["dead_lettered"], 1)
+        with utils.connection() as db, db.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM Watch_Log WHERE movie_ID = %s;", (_MISSING_MOVIE_ID,))
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,243 @@
+"""asyncio counterpart of the data layer in utils.py.
+
+Every function here runs its utils.py twin on a bounded thread pool with one worker per pooled
+connection, so many lookups can be awaited at once without ever waiting on the connection pool:
+    movie, taken, user = await asyncio.gather(
+        aio.search_for_movie_by_id(1), aio.user_exists("new_user"), aio.authenticate(name, hashed)
+    )
+The database still has to be set up with utils.set_up_database() first. utils.disconnect_database()
+shuts the thread pool down, the next call after reconnecting sizes a new one to the new connection pool.
+"""
+
+import asyncio
+import functools
+import itertools
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Tuple
+
+import utilities.utils as utils
+from utilities.movie import Movie
+from utilities.user import User
+
+# shared by every coroutine, sized to the connection pool when first used and dropped with it
+_EXECUTOR = None
+_WORKERS = 0
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _executor() -> Tuple[ThreadPoolExecutor, int]:
+    """Gets the worker pool and its number of workers, creating it to match the connection pool on first use"""
+    global _EXECUTOR
+    global _WORKERS
+
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            size = utils.pool_stats().get("size")
+            if size is None:
+                raise RuntimeError("The database has not been set up, call set_up_database() first")
+            _EXECUTOR = ThreadPoolExecutor(max_workers=size, thread_name_prefix="betterboxd-db")
+            _WORKERS = size
+        return _EXECUTOR, _WORKERS
+
+
+def close() -> None:
+    """Shuts the worker pool down, waiting for running calls to finish. Safe to call more than once.
+    utils.disconnect_database() calls it
+    """
+    global _EXECUTOR
+    global _WORKERS
+
+    with _EXECUTOR_LOCK:
+        executor, _EXECUTOR = _EXECUTOR, None
+        _WORKERS = 0
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def run(fn: Callable, *args, **kwargs):
+    """Runs any blocking data layer function on the worker pool
+
+    Args:
+        fn - the function to run
+        args, kwargs - the arguments to call it with
+
+    Returns:
+        whatever fn returns
+    """
+    return await asyncio.get_running_loop().run_in_executor(_executor()[0], functools.partial(fn, *args, **kwargs))
+
+
+async def search_for_movie_by_id(id: int) -> Movie:
+    """Return a movie given its id
+
+    Args:
+        id - an int representing the id of a movie in the database
+
+    Returns:
+        a Movie object if the movie was found, else None
+    """
+    return await run(utils.search_for_movie_by_id, id)
+
+
+async def hydrate_movies(ids: List[int]) -> List[Movie]:
+    """Loads any number of movies, splitting them across the worker pool so the chunks load concurrently.
+    Each chunk still costs a constant number of queries, see utils.hydrate_movies
+
+    Args:
+        ids - a list of ints representing the ids of movies in the database
+
+    Returns:
+        a list of Movie objects in the same order as ids, with None where a movie wasn't found
+    """
+    unique = list(dict.fromkeys(ids))
+    if not unique:
+        return []
+    _, workers = _executor()
+    size = min(utils.HYDRATE_CHUNK_SIZE, math.ceil(len(unique) / workers))
+    chunks = await asyncio.gather(
+        *(run(utils.hydrate_movies, unique[i : i + size]) for i in range(0, len(unique), size))
+    )
+    # every chunk comes back in the order it was asked for, so the results line up with unique
+    movies = dict(zip(unique, itertools.chain.from_iterable(chunks)))
+    return [movies[id] for id in ids]
+
+
+async def summarize_movies(ids: List[int]) -> List[Movie]:
+    """Loads movies without their crew and score, see utils.summarize_movies.
+    Don't touch a summary's crew or score from a coroutine, that loads them on the event loop, use load_movie_details
+
+    Args:
+        ids - a list of ints representing the ids of movies in the database
+
+    Returns:
+        a list of Movie objects in the same order as ids, with None where a movie wasn't found
+    """
+    return await run(utils.summarize_movies, ids)
+
+
+async def load_movie_details(movies: List[Movie]) -> None:
+    """Loads the crew and score of every summary movie given, see utils.load_movie_details
+
+    Args:
+        movies - a list of Movie objects, usually from summarize_movies
+    """
+    await run(utils.load_movie_details, movies)
+
+
+async def search_page(
+    kind: str, term: str, after_id: int = 0, page_size: int = utils.PAGE_SIZE, summary: bool = False
+) -> Tuple[List[Movie], int]:
+    """Returns one page of search results, with the movies on the page hydrated concurrently
+
+    Args:
+        kind - a string, one of "title", "crew", or "score"
+        term - a string we are filtering by
+        after_id - an int representing the last movie ID of the previous page, 0 for the first page
+        page_size - an int representing the max number of movies on the page
+        summary - a bool representing if the movies are summaries, loaded with a single query
+
+    Returns:
+        a tuple of (list of Movie objects in ID order, after_id of the next page or None if this is the last page)
+    """
+    ids, next_after_id = await run(utils.search_ids_page, kind, term, after_id, page_size)
+    load = summarize_movies if summary else hydrate_movies
+    return [m for m in await load(ids) if m is not None], next_after_id
+
+
+async def iter_search(
+    kind: str, term: str, page_size: int = utils.PAGE_SIZE, summary: bool = False
+) -> AsyncIterator[List[Movie]]:
+    """Lazily pages through every search result, fetching the next page only when it's asked for
+
+    Args:
+        kind - a string, one of "title", "crew", or "score"
+        term - a string we are filtering by
+        page_size - an int representing the max number of movies per page
+        summary - a bool representing if the movies are summaries, see summarize_movies
+
+    Yields:
+        lists of Movie objects in ID order, one page at a time
+    """
+    after_id = 0
+    while after_id is not None:
+        movies, after_id = await search_page(kind, term, after_id, page_size, summary)
+        if movies:
+            yield movies
+
+
+async def search_by_title_inexact(term: str) -> List[Movie]:
+    """Returns every movie with the term in the title"""
+    return [m async for page in iter_search("title", term, utils.HYDRATE_CHUNK_SIZE) for m in page]
+
+
+async def search_by_crew_inexact(term: str) -> List[Movie]:
+    """Returns every movie with the term in a crew member's name"""
+    return [m async for page in iter_search("crew", term, utils.HYDRATE_CHUNK_SIZE) for m in page]
+
+
+async def search_by_score_inexact(term: str) -> List[Movie]:
+    """Returns every movie with the term in a song on its score"""
+    return [m async for page in iter_search("score", term, utils.HYDRATE_CHUNK_SIZE) for m in page]
+
+
+async def search_for_movie_by_title_exact(title: str) -> int:
+    """Query if a given movie title is in the database (exact match)
+
+    Returns:
+        an int indicating the movie ID if a matching title was found, else an empty list
+    """
+    return await run(utils.search_for_movie_by_title_exact, title)
+
+
+async def add_log(movie_id: int, rating: float, username: str = None) -> None:
+    """Logs a movie for a user, it's written behind like utils.add_log
+
+    Args:
+        movie_id - an int representing the id of the movie we want
+        rating - a float representing the rating given
+        username - a string representing who logged it, defaults to the current user
+    """
+    await run(utils.add_log, movie_id, rating, username)
+
+
+async def flush_watch_log() -> int:
+    """Writes every queued log now, see utils.flush_watch_log
+
+    Returns:
+        an int representing how many logs were written
+    """
+    return await run(utils.flush_watch_log)
+
+
+async def authenticate(username: str, password: str) -> User:
+    """Checks a username and password and loads the account in one query, see utils.authenticate
+
+    Args:
+        username - a string representing the entered username
+        password - a string representing the entered (hashed) password
+
+    Returns:
+        the User, or None if the username or password is wrong
+    """
+    return await run(utils.authenticate, username, password)
+
+
+async def user_exists(username: str) -> bool:
+    """Query if user is already in database
+
+    Args:
+        username - a string representing the queried username
+    """
+    return await run(utils.user_exists, username)
+
+
+async def password_correct(username: str, password: str) -> bool:
+    """Query if password is correct for the given username, does not check if the username exists
+
+    Args:
+        username - a string representing the queried username
+        password - a string representing the entered (hashed) password
+    """
+    return await run(utils.password_correct, username, password)
@@ -0,0 +1,367 @@
+"""Storage backends for the data layer.
+
+Every query in utils.py is written once, in the MySQL dialect with %s / %(name)s parameters. A
+backend knows how to open connections that accept those queries, and handles the few things that
+can't be written portably (listing tables, reading query plans). Two backends ship:
+    MySQLBackend  - the MySQL server the app was built on
+    SQLiteBackend - an embedded SQLite database, in a file or in memory, created and loaded from
+                    the same sql_files/ seed data on first use. Needs no server, so it's what
+                    CI and the benchmarks run against
+"""
+
+import functools
+import itertools
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Set
+
+import utilities.migrations as migrations
+from utilities.seed import SCHEMA_FILE, SeedFile, load_seed_data
+
+MEMORY = ":memory:"
+
+
+class Backend:
+    """Interface every storage backend implements"""
+
+    # name used to pick dialect-specific migration files, <version>_<name>.<dialect>.sql
+    dialect = ""
+
+    # the most connections the backend can usefully have open at once, None for no limit
+    max_connections = None
+
+    def connect(self) -> Any:
+        """Opens a new connection.
+        Connections autocommit, support start_transaction(), commit(), rollback(), and close(),
+        and hand out cursors that work as context managers and take MySQL-style parameters
+        """
+        raise NotImplementedError
+
+    def set_up(self) -> None:
+        """Prepares the backend before the first connection, does nothing by default"""
+
+    def list_tables(self, db) -> List[str]:
+        """Gets the names of every table in the database
+
+        Args:
+            db - an open connection from this backend
+        """
+        raise NotImplementedError
+
+    def describe_schema(self, db) -> Dict[str, Dict[str, Set[str]]]:
+        """Reads every table's columns and indexes in a single query
+
+        Args:
+            db - an open connection from this backend
+
+        Returns:
+            a dictionary of table : {"columns": column names, "indexes": index names}, all lowercase
+        """
+        raise NotImplementedError
+
+    def full_scans(self, db, sql: str, params: tuple) -> List[str]:
+        """Reads the query plan of a statement and finds the tables it scans with no usable index
+
+        Args:
+            db - an open connection from this backend
+            sql - a string containing the statement
+            params - a tuple of sample parameters for it
+
+        Returns:
+            a list of table names (or aliases), empty if every table is read through an index
+        """
+        raise NotImplementedError
+
+    def is_integrity_error(self, error: Exception) -> bool:
+        """Checks if an exception raised by this backend is a constraint violation"""
+        raise NotImplementedError
+
+    def is_data_error(self, error: Exception) -> bool:
+        """Checks if an exception raised by this backend is caused by the data written, so retrying can't help.
+        Constraint violations, out of range or mistyped values, not a lost connection or a deadlock
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Releases anything the backend holds on to besides pooled connections"""
+
+
+class MySQLBackend(Backend):
+    """MySQL server backend, mysql.connector is only imported once a connection is opened"""
+
+    dialect = "mysql"
+
+    def __init__(self, host: str = "localhost", user: str = "root", password: str = "", database: str = "Betterboxd"):
+        self._host = host
+        self._user = user
+        self._password = password
+        self._database = database
+
+    def connect(self) -> Any:
+        import mysql.connector
+
+        return mysql.connector.connect(
+            host=self._host,
+            user=self._user,
+            password=self._password,
+            database=self._database,
+            autocommit=True,
+        )
+
+    def list_tables(self, db) -> List[str]:
+        with db.cursor() as cursor:
+            cursor.execute("SHOW TABLES")
+            return [row[0] for row in cursor]
+
+    def describe_schema(self, db) -> Dict[str, Dict[str, Set[str]]]:
+        # lowercased, table names are only case-insensitive where the filesystem is
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT LOWER(TABLE_NAME), 'columns', LOWER(COLUMN_NAME)
+                   FROM information_schema.COLUMNS
+                   WHERE TABLE_SCHEMA = DATABASE()
+                   UNION ALL
+                   SELECT LOWER(TABLE_NAME), 'indexes', LOWER(INDEX_NAME)
+                   FROM information_schema.STATISTICS
+                   WHERE TABLE_SCHEMA = DATABASE();"""
+            )
+            return _group_schema(cursor.fetchall())
+
+    def full_scans(self, db, sql: str, params: tuple) -> List[str]:
+        with db.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            columns = [d[0].lower() for d in cursor.description]
+            plan = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        return [
+            row["table"]
+            for row in plan
+            # <derived2>, <union2,3> and the like are temporary tables built by the query itself
+            if row["type"] == "ALL"
+            and not row["possible_keys"]
+            and row["table"]
+            and not row["table"].startswith("<")
+        ]
+
+    def is_integrity_error(self, error: Exception) -> bool:
+        import mysql.connector
+
+        return isinstance(error, mysql.connector.errors.IntegrityError)
+
+    def is_data_error(self, error: Exception) -> bool:
+        import mysql.connector
+
+        return isinstance(error, (mysql.connector.errors.IntegrityError, mysql.connector.errors.DataError))
+
+
+class SQLiteBackend(Backend):
+    """Embedded SQLite backend.
+    A new database gets the schema from 0_tables.sql (translated to SQLite), the seed data, and every migration
+    """
+
+    dialect = "sqlite"
+
+    _memory_ids = itertools.count()
+
+    def __init__(self, path: str = MEMORY, scale: int = 1, seeds: List[SeedFile] = None):
+        """
+        Args:
+            path - a string containing the database file, or ":memory:" for a private in-memory database
+            scale - an int representing how many copies of the seed data a new database gets
+            seeds - a list of SeedFiles to load a new database with instead of the seed data
+        """
+        self._scale = scale
+        self._seeds = seeds
+        self._keeper = None
+        if path == MEMORY:
+            # a named shared-cache database lives as long as one connection to it stays open
+            self._uri = f"file:betterboxd-{os.getpid()}-{next(self._memory_ids)}?mode=memory&cache=shared"
+            # shared-cache connections lock whole tables instead of waiting, so stick to one
+            self.max_connections = 1
+        else:
+            self._uri = f"file:{os.path.abspath(path)}"
+
+    def connect(self, cached_statements: int = 128) -> Any:
+        """
+        Args:
+            cached_statements - an int representing how many compiled statements the connection keeps,
+                                0 compiles every statement it's sent
+        """
+        raw = sqlite3.connect(
+            self._uri,
+            uri=True,
+            isolation_level=None,
+            check_same_thread=False,
+            timeout=30,
+            cached_statements=cached_statements,
+        )
+        raw.execute("PRAGMA busy_timeout = 30000")
+        # SQLite only enforces foreign keys when asked to, on every connection
+        raw.execute("PRAGMA foreign_keys = ON")
+        if self.max_connections is None:
+            raw.execute("PRAGMA journal_mode = WAL")
+        return _SQLiteConnection(raw)
+
+    def set_up(self) -> None:
+        if self._keeper is None:
+            self._keeper = self.connect()
+        if "movie" in self.list_tables(self._keeper):
+            return
+
+        # brand new database, build it the way the MySQL setup would
+        db = self._keeper
+        db.start_transaction()
+        with open(SCHEMA_FILE, encoding="utf-8") as f:
+            for statement in migrations.split_statements(_sqlite_schema(f.read())):
+                db.raw.execute(statement)
+        for seed in self._seeds if self._seeds is not None else load_seed_data(self._scale):
+            db.raw.executemany(
+                f"INSERT INTO {seed.table}({', '.join(seed.columns)}) VALUES ({', '.join(['?'] * len(seed.columns))})",
+                seed.rows,
+            )
+        db.commit()
+        migrations.apply_pending(db, self.dialect)
+
+    def list_tables(self, db) -> List[str]:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+            # SQLite table names are case-insensitive, report them the way MySQL on Windows does
+            return [row[0].lower() for row in cursor]
+
+    def describe_schema(self, db) -> Dict[str, Dict[str, Set[str]]]:
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT LOWER(m.name), 'columns', LOWER(c.name)
+                   FROM sqlite_master m, pragma_table_info(m.name) c
+                   WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'
+                   UNION ALL
+                   SELECT LOWER(tbl_name), 'indexes', LOWER(name)
+                   FROM sqlite_master
+                   WHERE type = 'index';"""
+            )
+            return _group_schema(cursor.fetchall())
+
+    def full_scans(self, db, sql: str, params: tuple) -> List[str]:
+        with db.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            plan = [row[3] for row in cursor.fetchall()]
+        # subqueries show up as MATERIALIZE mc / CO-ROUTINE mc, scanning those is reading the query's own result
+        derived = {detail.split()[1] for detail in plan if detail.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        # "SCAN c" reads every row, "SCAN c USING COVERING INDEX ..." walks an index instead
+        return [
+            detail.split()[1]
+            for detail in plan
+            if detail.startswith("SCAN ") and " USING " not in detail and detail.split()[1] not in derived
+        ]
+
+    def is_integrity_error(self, error: Exception) -> bool:
+        return isinstance(error, sqlite3.IntegrityError)
+
+    def is_data_error(self, error: Exception) -> bool:
+        # a value sqlite3 can't bind is an InterfaceError
+        return isinstance(error, (sqlite3.IntegrityError, sqlite3.DataError, sqlite3.InterfaceError))
+
+    def close(self) -> None:
+        if self._keeper is not None:
+            self._keeper.close()
+            self._keeper = None
+
+
+class _SQLiteConnection:
+    """Wraps a sqlite3 connection so it behaves like a mysql.connector one with autocommit on"""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self.raw = raw
+
+    def cursor(self, **kwargs) -> "_SQLiteCursor":
+        return _SQLiteCursor(self.raw.cursor())
+
+    def start_transaction(self) -> None:
+        # take the write lock up front, the closest thing SQLite has to SELECT ... FOR UPDATE
+        self.raw.execute("BEGIN IMMEDIATE")
+
+    def commit(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("COMMIT")
+
+    def rollback(self) -> None:
+        if self.raw.in_transaction:
+            self.raw.execute("ROLLBACK")
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+class _SQLiteCursor:
+    """Wraps a sqlite3 cursor, translating MySQL-style queries on the way in"""
+
+    def __init__(self, raw: sqlite3.Cursor):
+        self.raw = raw
+
+    def __enter__(self) -> "_SQLiteCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.raw.close()
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    @property
+    def description(self):
+        return self.raw.description
+
+    @property
+    def lastrowid(self) -> int:
+        return self.raw.lastrowid
+
+    @property
+    def rowcount(self) -> int:
+        return self.raw.rowcount
+
+    def execute(self, sql: str, params=()) -> None:
+        self.raw.execute(_translate(sql), params)
+
+    def executemany(self, sql: str, seq_params) -> None:
+        self.raw.executemany(_translate(sql), seq_params)
+
+    def fetchone(self):
+        return self.raw.fetchone()
+
+    def fetchall(self):
+        return self.raw.fetchall()
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+def _group_schema(rows: List[tuple]) -> Dict[str, Dict[str, Set[str]]]:
+    """Groups (table, "columns" or "indexes", name) rows into the dictionary describe_schema() returns"""
+    schema = {}
+    for table, kind, name in rows:
+        schema.setdefault(table, {"columns": set(), "indexes": set()})[kind].add(name)
+    return schema
+
+
+@functools.lru_cache(maxsize=512)
+def _translate(sql: str) -> str:
+    """Rewrites a MySQL-dialect query for SQLite, cached since the same queries run over and over"""
+    sql = re.sub(r"%\((\w+)\)s", r":\1", sql)
+    sql = sql.replace("%s", "?")
+    sql = sql.replace("AS UNSIGNED)", "AS INTEGER)")
+    return re.sub(r"\s+FOR UPDATE\b", "", sql)
+
+
+def _sqlite_schema(sql: str) -> str:
+    """Rewrites 0_tables.sql for SQLite.
+    Drops the database statements, turns AUTO_INCREMENT keys into rowid aliases, gives text
+    columns MySQL's default case-insensitive comparisons, and drops the foreign keys to Score
+    """
+    sql = re.sub(r"(CREATE DATABASE|USE)\s+\w+\s*;", "", sql)
+    # Score's key is (score_ID, crew_ID), InnoDB accepts a foreign key to the score_ID prefix of it but
+    # SQLite wants a unique parent key and would fail every write to Movie and Score_Songs
+    sql = re.sub(r",\s*FOREIGN KEY \(score_ID\) REFERENCES Score \(score_ID\)", "", sql)
+    for column in re.findall(r"(\w+)\s+INT\s+AUTO_INCREMENT", sql):
+        sql = re.sub(rf"{column}\s+INT\s+AUTO_INCREMENT", f"{column} INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+        sql = re.sub(rf",\s*PRIMARY KEY \({column}\)", "", sql)
+    return re.sub(r"VARCHAR\((\d+)\)", r"VARCHAR(\1) COLLATE NOCASE", sql)
@@ -0,0 +1,151 @@
+"""Creates the Betterboxd database from sql_files/ in one command, instead of sourcing each file by hand.
+
+The schema comes from 0_tables.sql. The seed files are then loaded concurrently, one connection per
+table, with foreign key checks and autocommit off, and every table's row count is checked against
+the file. Pending migrations run last. With --scale N the seed data is replicated N times, with
+shifted IDs and suffixed names, to build a bigger database for load testing.
+
+Run from the root of the project:
+    python -m utilities.bootstrap [--host localhost] [--user root] [--drop] [--scale 10]
+"""
+
+import argparse
+import getpass
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import utilities.migrations as migrations
+from utilities.backends import MySQLBackend
+from utilities.seed import SCHEMA_FILE, SeedFile, load_seed_data
+
+DATABASE = "Betterboxd"
+BATCH_ROWS = 5000  # rows per multi-row INSERT
+
+
+def create_schema(connect: Callable[..., object], drop: bool = False) -> None:
+    """Creates the database and its tables from 0_tables.sql
+
+    Args:
+        connect - a function that opens a connection to the server, taking an optional database keyword
+        drop - a bool representing if an existing Betterboxd database should be dropped first
+    """
+    db = connect()
+    try:
+        with db.cursor() as cursor:
+            if drop:
+                cursor.execute(f"DROP DATABASE IF EXISTS {DATABASE};")
+            with open(SCHEMA_FILE, encoding="utf-8") as f:
+                for statement in migrations.split_statements(f.read()):
+                    cursor.execute(statement)
+        db.commit()
+    finally:
+        db.close()
+
+
+def load_table(connect: Callable[..., object], seed: SeedFile) -> float:
+    """Loads one table over its own connection with checks and autocommit off
+
+    Args:
+        connect - a function that opens a connection to the server, taking an optional database keyword
+        seed - the SeedFile to load
+
+    Returns:
+        a float representing how many seconds the load took
+    """
+    start = time.perf_counter()
+    db = connect(database=DATABASE)
+    try:
+        db.autocommit = False
+        with db.cursor() as cursor:
+            cursor.execute("SET SESSION foreign_key_checks = 0;")
+            cursor.execute("SET SESSION unique_checks = 0;")
+            sql = (
+                f"INSERT INTO {seed.table}({', '.join(seed.columns)}) "
+                f"VALUES ({', '.join(['%s'] * len(seed.columns))});"
+            )
+            for i in range(0, len(seed.rows), BATCH_ROWS):
+                cursor.executemany(sql, seed.rows[i : i + BATCH_ROWS])
+        db.commit()
+    finally:
+        db.close()
+    return time.perf_counter() - start
+
+
+def validate_counts(db, seeds: List[SeedFile]) -> List[str]:
+    """Compares every table's row count to the number of rows that were loaded into it
+
+    Returns:
+        a list of mismatch messages, empty if every table matches
+    """
+    problems = []
+    for seed in seeds:
+        with db.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {seed.table};")
+            count = cursor.fetchone()[0]
+        if count != len(seed.rows):
+            problems.append(f"{seed.table} has {count} rows, expected {len(seed.rows)}")
+    return problems
+
+
+def bootstrap(connect: Callable[..., object], scale: int = 1, drop: bool = False, workers: int = 4) -> bool:
+    """Creates, loads, validates, and migrates the database, printing progress along the way
+
+    Args:
+        connect - a function that opens a connection to the server, taking an optional database keyword
+        scale - an int representing how many copies of the seed data to load
+        drop - a bool representing if an existing Betterboxd database should be dropped first
+        workers - an int representing how many tables load at once
+
+    Returns:
+        a bool representing if every table loaded with the expected number of rows
+    """
+    start = time.perf_counter()
+    seeds = load_seed_data(scale)
+    create_schema(connect, drop)
+    print(f"Created schema from {SCHEMA_FILE}")
+
+    # with foreign key checks off no table depends on another, so they all load at once
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        timings = pool.map(lambda seed: (seed, load_table(connect, seed)), seeds)
+        for seed, seconds in timings:
+            print(f"Loaded {len(seed.rows):>8} rows into {seed.table:<12} in {seconds:.2f}s")
+
+    db = connect(database=DATABASE)
+    try:
+        problems = validate_counts(db, seeds)
+        for name in migrations.apply_pending(db, MySQLBackend.dialect):
+            print(f"Applied database migration {name}")
+    finally:
+        db.close()
+
+    for problem in problems:
+        print(f"Error: {problem}")
+    total = sum(len(seed.rows) for seed in seeds)
+    print(f"Bootstrapped {total} rows in {time.perf_counter() - start:.2f}s")
+    return not problems
+
+
+if __name__ == "__main__":
+    import mysql.connector
+
+    parser = argparse.ArgumentParser(description="Create and load the Betterboxd database")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--user", default="root")
+    parser.add_argument("--password", help="prompted for if not given")
+    parser.add_argument("--drop", action="store_true", help="drop an existing Betterboxd database first")
+    parser.add_argument("--scale", type=int, default=1, help="load N copies of the seed data")
+    parser.add_argument("--workers", type=int, default=4, help="tables loaded at once")
+    args = parser.parse_args()
+    password = args.password if args.password is not None else getpass.getpass("Password: ")
+
+    def _connect(**kwargs):
+        return mysql.connector.connect(host=args.host, user=args.user, password=password, **kwargs)
+
+    try:
+        ok = bootstrap(_connect, args.scale, args.drop, args.workers)
+    except mysql.connector.errors.Error as e:
+        print(f"Ran into an error: {e}.")
+        ok = False
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,345 @@
+"""The movie x crew graph of Crew_Movie in memory, behind "More like this" and crew connections.
+
+The graph is held as two sets of CSR arrays, one going from each movie to its crew and its transpose
+going from each crew member to their movies, so a movie's or a person's neighbors are an array slice
+and a whole frontier's are one vectorized gather. Everything is answered from those arrays:
+    similar_movies     - other movies ranked by the crew they share with a movie. Every shared crew
+                         member counts their inverse document frequency, log(movies / movies they
+                         worked on), so a director with a few films counts for far more than an extra
+                         who is in hundreds
+    top_collaborators  - the people who worked on the most movies with someone. utils answers this with SQL
+                         instead, which is as fast for all but the most prolific people
+    shortest_path      - how two people are connected, person, movie, person, movie, ..., person, found
+                         by a breadth-first search from both ends that always grows the smaller side
+People aren't linked to each other directly. A crew x crew adjacency would need an edge for every pair
+credited on the same movie, thousands per movie, where going through the movies needs one per credit.
+
+Movies added after the graph is built go into small pending dictionaries that queries read alongside
+the arrays, and are folded into the arrays once MERGE_THRESHOLD of them have piled up.
+
+Needs numpy, which utils only imports the first time the graph is used.
+"""
+
+import itertools
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+MERGE_THRESHOLD = 1024  # movies added since the arrays were built before they're rebuilt with them
+MAX_HOPS = 6  # most movies between two people shortest_path looks through, in the spirit of Six Degrees
+
+
+def _csr(rows: np.ndarray, cols: np.ndarray, num_rows: int, num_cols: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Builds the CSR arrays of a 0/1 matrix from its nonzero entries, an entry listed twice counts once
+
+    Args:
+        rows - an int array of the row of every entry
+        cols - an int array of the column of every entry, the same length as rows
+        num_rows - an int, rows run from 0 to num_rows - 1
+        num_cols - an int, columns run from 0 to num_cols - 1
+
+    Returns:
+        a (ptr, cols) tuple, the columns of row r are cols[ptr[r]:ptr[r + 1]] in ascending order
+    """
+    # sorting one int64 key per entry orders by row then column, several times faster than np.lexsort
+    keys = np.sort(rows * num_cols + cols)
+    keys = keys[np.concatenate([[True], keys[1:] != keys[:-1]])] if keys.size else keys
+    ptr = np.zeros(num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // num_cols, minlength=num_rows), out=ptr[1:])
+    return ptr, keys % num_cols
+
+
+def _gather(ptr: np.ndarray, cols: np.ndarray, pending: Dict[int, List[int]], rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Reads several rows of a CSR matrix, and the entries added to them since it was built, at once
+
+    Args:
+        ptr, cols - the CSR arrays from _csr()
+        pending - a dictionary of row : list of columns added since
+        rows - an int array of the rows to read
+
+    Returns:
+        a (cols, rows) tuple of int arrays, every entry's column and the row it came from
+    """
+    merged = rows[(rows >= 0) & (rows < len(ptr) - 1)]
+    starts = ptr[merged]
+    lengths = ptr[merged + 1] - starts
+    # the position of every entry in cols, without a Python loop over the rows
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    found = [cols[offsets + np.arange(int(lengths.sum()))]]
+    sources = [np.repeat(merged, lengths)]
+    if pending:
+        keys = np.fromiter(pending, dtype=np.int64, count=len(pending))
+        for row in keys[np.isin(keys, rows)].tolist():
+            found.append(np.array(pending[row], dtype=np.int64))
+            sources.append(np.full(len(pending[row]), row, dtype=np.int64))
+    return np.concatenate(found), np.concatenate(sources)
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Checks which values are in a sorted int array, a binary search each instead of np.isin's sort of both
+
+    Returns:
+        a bool array, True where the value is in sorted_values
+    """
+    if not sorted_values.size:
+        return np.zeros(values.size, dtype=bool)
+    i = np.minimum(np.searchsorted(sorted_values, values), sorted_values.size - 1)
+    return sorted_values[i] == values
+
+
+def _first_of_each(values: np.ndarray, other: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorts an int array, keeping one of each value along with the matching entry of a second array
+
+    Returns:
+        a (values, other) tuple with the values distinct and ascending
+    """
+    order = np.argsort(values, kind="stable")
+    values, other = values[order], other[order]
+    first = np.concatenate([[True], values[1:] != values[:-1]]) if values.size else np.ones(0, dtype=bool)
+    return values[first], other[first]
+
+
+def _top(ids: np.ndarray, weights: np.ndarray, exclude: int, limit: int) -> List[Tuple[int, float]]:
+    """Adds up weights by ID and picks the highest totals, ties in ID order.
+    Works on the sorted IDs instead of a np.bincount, so it costs as much as the IDs given, not the largest ID
+
+    Args:
+        ids - an int array of IDs, repeated once per weight
+        weights - a float array of the weight of each entry of ids, None to count every entry as 1
+        exclude - an int representing an ID to leave out
+        limit - an int representing the max number of IDs to return
+
+    Returns:
+        a list of (ID, total) tuples for the positive totals, highest first
+    """
+    order = np.argsort(ids, kind="stable")
+    ids = ids[order]
+    starts = np.flatnonzero(np.concatenate([[True], ids[1:] != ids[:-1]]))
+    if weights is None:
+        totals = np.diff(np.append(starts, ids.size)).astype(float)
+    else:
+        totals = np.add.reduceat(weights[order], starts)
+    candidates = ids[starts]
+    keep = (totals > 0) & (candidates != exclude)
+    candidates, totals = candidates[keep], totals[keep]
+    if candidates.size > limit:
+        # everything above the limit-th best total, then as many of the IDs tied with it as fit, in order
+        cutoff = np.partition(totals, candidates.size - limit)[candidates.size - limit]
+        above = np.flatnonzero(totals > cutoff)
+        tied = np.flatnonzero(totals == cutoff)[: limit - above.size]
+        keep = np.concatenate([above, tied])
+        candidates, totals = candidates[keep], totals[keep]
+    order = np.lexsort((candidates, -totals))
+    return [(int(candidates[i]), float(totals[i])) for i in order]
+
+
+class _Search:
+    """One end of a bidirectional breadth-first search, alternating between people and movies.
+    Keeps only what it has reached, so a search costs as much as the part of the graph it explores
+    """
+
+    def __init__(self, crew_id: int):
+        # a (nodes, the node each was reached from) pair of arrays per step, sorted by node.
+        # Steps alternate people and movies, starting with the person at step 0
+        self.steps = [(np.array([crew_id], dtype=np.int64), np.array([-1], dtype=np.int64))]
+
+    @property
+    def level(self) -> int:
+        return len(self.steps) - 1
+
+    @property
+    def frontier(self) -> np.ndarray:
+        return self.steps[-1][0]
+
+    @property
+    def on_crew(self) -> bool:
+        """If the frontier is people, else movies"""
+        return self.level % 2 == 0
+
+    def add_step(self, nodes: np.ndarray, via: np.ndarray) -> np.ndarray:
+        """Records the nodes reached by the next step, dropping the ones reached before
+
+        Args:
+            nodes - an int array of the nodes the frontier leads to
+            via - an int array of the frontier node each one was reached from
+
+        Returns:
+            an int array of the newly reached nodes, the new frontier
+        """
+        new = self.depth_of(nodes, not self.on_crew) < 0
+        # a node reached from several places keeps one of them, any is as short as the others
+        nodes, via = _first_of_each(nodes[new], via[new])
+        self.steps.append((nodes, via))
+        return nodes
+
+    def depth_of(self, nodes: np.ndarray, on_crew: bool) -> np.ndarray:
+        """Gets how many steps from the start some nodes are
+
+        Returns:
+            an int array, -1 for the nodes not reached yet
+        """
+        depth = np.full(nodes.size, -1)
+        for level in range(0 if on_crew else 1, len(self.steps), 2):
+            depth[(depth < 0) & _contains(self.steps[level][0], nodes)] = level
+        return depth
+
+    def trace(self, node: int, level: int) -> List[int]:
+        """Walks back from a node reached at a step to the start
+
+        Returns:
+            a list of alternating IDs from the node to the start
+        """
+        path = [node]
+        for step in range(level, 0, -1):
+            nodes, via = self.steps[step]
+            node = int(via[np.searchsorted(nodes, node)])
+            path.append(node)
+        return path
+
+
+class CrewGraph:
+    """Sparse movie x crew matrix in memory, for recommendations and crew connection queries.
+    Movie and crew IDs are used as row and column numbers, they're AUTO_INCREMENT so there are few gaps
+    """
+
+    def __init__(self, credits: Iterable[Tuple[int, int]] = ()):
+        """
+        Args:
+            credits - (movie_ID, crew_ID) pairs, one per row of Crew_Movie
+        """
+        self._lock = threading.Lock()
+        pairs = np.fromiter(itertools.chain.from_iterable(credits), dtype=np.int64).reshape(-1, 2)
+        self._build(pairs[:, 0], pairs[:, 1])
+
+    def __len__(self) -> int:
+        return self._num_movies
+
+    def _build(self, movies: np.ndarray, crew: np.ndarray) -> None:
+        """Rebuilds the arrays from every credit, clearing what was pending"""
+        num_movies = int(movies.max()) + 1 if movies.size else 1
+        num_crew = int(crew.max()) + 1 if crew.size else 1
+        self._movie_ptr, self._movie_crew = _csr(movies, crew, num_movies, num_crew)
+        self._crew_ptr, self._crew_movies = _csr(crew, movies, num_crew, num_movies)
+        # how many movies each crew member is credited on, the document frequency of the IDF
+        self._df = np.diff(self._crew_ptr)
+        self._num_movies = int(np.count_nonzero(np.diff(self._movie_ptr)))
+        self._pending_movies: Dict[int, List[int]] = {}
+        self._pending_crew: Dict[int, List[int]] = {}
+
+    def _merge(self) -> None:
+        """Folds the pending movies into the arrays"""
+        movies = np.repeat(np.arange(len(self._movie_ptr) - 1), np.diff(self._movie_ptr))
+        crew = self._movie_crew
+        if self._pending_movies:
+            pending = [(movie_id, crew_id) for movie_id, crew_ids in self._pending_movies.items() for crew_id in crew_ids]
+            pending = np.array(pending, dtype=np.int64)
+            movies = np.concatenate([movies, pending[:, 0]])
+            crew = np.concatenate([crew, pending[:, 1]])
+        self._build(movies, crew)
+
+    def _crew_of(self, movie_id: int) -> np.ndarray:
+        """Gets the IDs of the crew credited on a movie, merged or pending"""
+        return _gather(self._movie_ptr, self._movie_crew, self._pending_movies, np.array([movie_id], dtype=np.int64))[0]
+
+    def _movies_of(self, crew_id: int) -> np.ndarray:
+        """Gets the IDs of the movies a crew member is credited on, merged or pending"""
+        return _gather(self._crew_ptr, self._crew_movies, self._pending_crew, np.array([crew_id], dtype=np.int64))[0]
+
+    def add_movie(self, movie_id: int, crew_ids: Iterable[int]) -> None:
+        """Adds a movie's credits, skipping any the graph already has
+
+        Args:
+            movie_id - an int representing the ID of the movie
+            crew_ids - the IDs of every crew member credited on the movie
+        """
+        with self._lock:
+            have = self._crew_of(movie_id)
+            new = np.setdiff1d(np.array(list(crew_ids), dtype=np.int64), have)
+            if not new.size:
+                return
+            if not have.size:
+                self._num_movies += 1
+            if int(new.max()) >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros(int(new.max()) + 1 - len(self._df), dtype=self._df.dtype)])
+            self._df[new] += 1
+            self._pending_movies.setdefault(movie_id, []).extend(new.tolist())
+            for crew_id in new.tolist():
+                self._pending_crew.setdefault(crew_id, []).append(movie_id)
+            if len(self._pending_movies) >= MERGE_THRESHOLD:
+                self._merge()
+
+    def similar_movies(self, movie_id: int, limit: int) -> List[Tuple[int, float]]:
+        """Ranks the other movies by how much crew they share with a movie
+
+        Args:
+            movie_id - an int representing the ID of the movie
+            limit - an int representing the max number of movies to return
+
+        Returns:
+            a list of (movie_ID, score) tuples, highest score first and ties in ID order.
+            A score is the sum of log(movies / movies they worked on) over the crew both movies share
+        """
+        with self._lock:
+            crew = self._crew_of(movie_id)
+            if not crew.size or limit < 1:
+                return []
+            neighbors, via = _gather(self._crew_ptr, self._crew_movies, self._pending_crew, crew)
+            # a crew member on every movie says nothing about similarity, and gets a weight of 0
+            weights = np.log(self._num_movies / self._df[via])
+        return _top(neighbors, weights, movie_id, limit)
+
+    def top_collaborators(self, crew_id: int, limit: int) -> List[Tuple[int, int]]:
+        """Ranks the people who worked on the most movies with a crew member
+
+        Args:
+            crew_id - an int representing the ID of the crew member
+            limit - an int representing the max number of people to return
+
+        Returns:
+            a list of (crew_ID, movies together) tuples, most movies first and ties in ID order
+        """
+        with self._lock:
+            movies = self._movies_of(crew_id)
+            if not movies.size or limit < 1:
+                return []
+            collaborators, _ = _gather(self._movie_ptr, self._movie_crew, self._pending_movies, movies)
+        return [(other, int(count)) for other, count in _top(collaborators, None, crew_id, limit)]
+
+    def shortest_path(self, from_crew: int, to_crew: int, max_hops: int = MAX_HOPS) -> List[int]:
+        """Finds the fewest movies connecting two crew members, one person worked with the next on each
+
+        Args:
+            from_crew - an int representing the ID of the crew member to start from
+            to_crew - an int representing the ID of the crew member to end at
+            max_hops - an int representing the most movies the path may go through
+
+        Returns:
+            a list of IDs alternating person, movie, person, ..., person from from_crew to to_crew,
+            [from_crew] if they're the same person, empty if they aren't connected within max_hops
+        """
+        with self._lock:
+            num_crew = len(self._df)
+            if not (0 <= from_crew < num_crew and 0 <= to_crew < num_crew):
+                return []
+            if from_crew == to_crew:
+                return [from_crew]
+            start, end = _Search(from_crew), _Search(to_crew)
+            # a path through max_hops movies is 2 * max_hops steps long
+            while start.level + end.level < 2 * max_hops and start.frontier.size and end.frontier.size:
+                side, other = (start, end) if start.frontier.size <= end.frontier.size else (end, start)
+                if side.on_crew:
+                    reached, via = _gather(self._crew_ptr, self._crew_movies, self._pending_crew, side.frontier)
+                else:
+                    reached, via = _gather(self._movie_ptr, self._movie_crew, self._pending_movies, side.frontier)
+                reached = side.add_step(reached, via)
+
+                depth = other.depth_of(reached, side.on_crew)
+                if (depth >= 0).any():
+                    # everything this step reached is as far from this side, so pick the closest to the other
+                    met = np.flatnonzero(depth >= 0)
+                    i = met[np.argmin(depth[met])]
+                    node = int(reached[i])
+                    start_level, end_level = (side.level, int(depth[i])) if side is start else (int(depth[i]), side.level)
+                    return start.trace(node, start_level)[::-1] + end.trace(node, end_level)[1:]
+        return []
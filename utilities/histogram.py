@@ -0,0 +1,126 @@
+"""Per-movie rating distributions, stored as half-star buckets in the Rating_Histogram table.
+
+add_log bumps one bucket in the same transaction that updates the movie's running sum and count, so
+the median and any percentile are read off 11 counters instead of scanning individual ratings.
+
+Movies rated before the table existed only have their average and count, run the backfill to give
+them a histogram with the same count and (to the nearest half star) the same average:
+    python -m utilities.histogram
+"""
+
+import math
+from typing import Dict, List
+
+BUCKETS = 11  # half stars from 0.0 to 5.0, bucket i holds ratings that round to i / 2 stars
+
+
+def bucket_of(rating: float) -> int:
+    """Finds the bucket a rating goes in
+
+    Args:
+        rating - a float representing a star rating from 0.0 to 5.0
+
+    Returns:
+        an int from 0 to 10, the rating rounded to the nearest half star times two
+    """
+    return min(BUCKETS - 1, max(0, int(rating * 2 + 0.5)))
+
+
+def backfill_counts(avg_rating: float, num_ratings: int) -> List[int]:
+    """Spreads a movie's ratings over the two buckets either side of its average, keeping the average
+
+    Args:
+        avg_rating - a float representing the movie's average star rating
+        num_ratings - an int representing how many ratings it has
+
+    Returns:
+        a list of BUCKETS ints that add up to num_ratings
+    """
+    counts = [0] * BUCKETS
+    if num_ratings <= 0:
+        return counts
+    position = min(max(avg_rating, 0.0), 5.0) * 2
+    low = min(int(position), BUCKETS - 1)
+    high_count = round(num_ratings * (position - low)) if low < BUCKETS - 1 else 0
+    counts[low] = num_ratings - high_count
+    if high_count:
+        counts[low + 1] = high_count
+    return counts
+
+
+class RatingHistogram:
+    """How many ratings a movie got in each half-star bucket"""
+
+    __slots__ = ("_counts",)
+
+    def __init__(self, counts: List[int] = None):
+        """
+        Args:
+            counts - a list of BUCKETS ints, bucket 0 is 0.0 stars and bucket 10 is 5.0 stars
+        """
+        self._counts = list(counts) if counts is not None else [0] * BUCKETS
+
+    def add(self, rating: float) -> None:
+        """Counts one more rating"""
+        self._counts[bucket_of(rating)] += 1
+
+    def get_counts(self) -> List[int]:
+        """Getter for the bucket counts"""
+        return list(self._counts)
+
+    def total(self) -> int:
+        """Gets the number of ratings counted"""
+        return sum(self._counts)
+
+    def percentile(self, p: float) -> float:
+        """Finds the rating p percent of ratings are at or below, walking the buckets instead of the ratings
+
+        Args:
+            p - a float from 0 to 100, 50 is the median
+
+        Returns:
+            a float representing a star rating to the half star, None if there are no ratings
+        """
+        total = self.total()
+        if total == 0:
+            return None
+        rank = max(1, math.ceil(total * p / 100))
+        seen = 0
+        for bucket, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                return bucket / 2
+        return (BUCKETS - 1) / 2
+
+    def median(self) -> float:
+        """Finds the median rating, None if there are no ratings"""
+        return self.percentile(50)
+
+    def to_dict(self) -> Dict[str, int]:
+        """Converts the histogram to star rating : count pairs, ready to be sent as JSON"""
+        return {f"{bucket / 2:.1f}": count for bucket, count in enumerate(self._counts)}
+
+    def display(self, width: int = 30) -> None:
+        """Prints the distribution as a bar chart, best ratings first, leaving out empty buckets
+
+        Args:
+            width - an int representing how many characters the longest bar gets
+        """
+        total = self.total()
+        if total == 0:
+            print("\tNo ratings yet")
+            return
+        print(f"\tMedian {self.median()}, 25th-75th percentile {self.percentile(25)}-{self.percentile(75)}")
+        most = max(self._counts)
+        for bucket in range(BUCKETS - 1, -1, -1):
+            if self._counts[bucket]:
+                bar = "#" * max(1, round(self._counts[bucket] / most * width))
+                print(f"\t{bucket / 2:.1f} | {bar} {self._counts[bucket]}")
+
+
+if __name__ == "__main__":
+    import utilities.utils as utils
+
+    utils.set_up_database()
+    print(f"Backfilled rating histograms for {utils.backfill_rating_histograms()} movies")
+    utils.disconnect_database()
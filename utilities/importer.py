@@ -0,0 +1,394 @@
+"""Bulk catalog import from CSV or JSONL files.
+
+Movies are streamed from the file, validated, and written in chunks. Each chunk is one transaction
+made of multi-row inserts, so the cost per movie stays small no matter how big the file is. Only the
+movies themselves are inserted one at a time, to read back their auto-increment IDs. Crew is
+deduplicated against the database and within the whole import. A row that fails validation or
+can't be written goes into the error report and doesn't stop the rest of the load.
+
+CSV files need a header row with the columns title, runtime, crew, and score:
+    crew  - crew members separated by ";", each one "Name:Job", multiple jobs separated by "/"
+    score - song titles in track order separated by "|"
+JSONL files hold one movie object per line:
+    {"title": "...", "runtime": 97, "crew": {"Name": ["Job", ...]}, "score": ["Song", ...]}
+In both formats runtime is either a whole number of minutes or "HH:MM:SS".
+
+Run from the root of the project:
+    python -m utilities.importer movies.csv [--chunk-size 1000] [--errors errors.csv]
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+import utilities.utils as utils
+from utilities.histogram import BUCKETS
+
+DEFAULT_CHUNK_SIZE = 1000  # movies written per transaction
+LOOKUP_BATCH_SIZE = 1000  # crew names sent in a single IN (...) list
+
+
+class ImportRecord:
+    """One movie read from an import file"""
+
+    def __init__(self, line: int, title: str, runtime: str, crew: Dict[str, List[str]], score: List[str]):
+        self.line = line
+        self.title = title
+        self.runtime = runtime
+        self.crew = crew
+        self.score = score
+
+
+class ImportReport:
+    """Counters and per-row errors from an import"""
+
+    def __init__(self):
+        self.imported = 0
+        self.failed = 0
+        self.elapsed = 0.0
+        self.errors: List[Tuple[int, str, str]] = []
+
+    def add_error(self, line: int, title: str, message: str) -> None:
+        """Records a row that was skipped
+
+        Args:
+            line - an int representing the line (or CSV row) the movie came from
+            title - a string containing the movie title, may be empty
+            message - a string describing what went wrong
+        """
+        self.failed += 1
+        self.errors.append((line, title, message))
+
+    def get_throughput(self) -> float:
+        """Getter for movies imported per second"""
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def write_errors(self, path: str) -> None:
+        """Writes the skipped rows to a CSV file with line, title, and error columns
+
+        Args:
+            path - a string containing the path of the report to write
+        """
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["line", "title", "error"])
+            writer.writerows(self.errors)
+
+    def pprint(self) -> None:
+        """Pretty print the report"""
+        print(f"Imported: {self.imported} movies in {self.elapsed:.2f}s ({self.get_throughput():.0f} movies/sec)")
+        print(f"Skipped: {self.failed} rows")
+        for line, title, message in self.errors[:20]:
+            print(f"\tline {line} ({title or 'no title'}): {message}")
+        if len(self.errors) > 20:
+            print(f"\t... and {len(self.errors) - 20} more")
+
+
+def read_records(path: str) -> Iterator[Union[ImportRecord, Tuple[int, str, str]]]:
+    """Streams movies out of a CSV or JSONL file, picked by the file extension
+
+    Args:
+        path - a string containing the path of the file to import
+
+    Yields:
+        an ImportRecord for every valid movie, or a (line, title, error) tuple for every invalid one
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if os.path.splitext(path)[1].lower() == ".csv":
+            reader = csv.DictReader(f)
+            rows = ((reader.line_num, row) for row in reader)
+        else:
+            rows = ((i + 1, line) for i, line in enumerate(f) if line.strip())
+
+        for line, row in rows:
+            title = ""
+            try:
+                if isinstance(row, str):
+                    row = json.loads(row)
+                    crew = row.get("crew") or {}
+                    score = row.get("score") or []
+                else:
+                    crew = _parse_csv_crew(row.get("crew") or "")
+                    score = [s.strip() for s in (row.get("score") or "").split("|") if s.strip()]
+                title = str(row.get("title") or "").strip()
+                yield _validate(line, title, row.get("runtime"), crew, score)
+            except (ValueError, TypeError, AttributeError) as e:
+                yield (line, title, str(e))
+
+
+class CatalogImporter:
+    """Writes ImportRecords to the database in chunked transactions.
+    Remembers every crew member it has resolved, so crew is only looked up once per import
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self._chunk_size = chunk_size
+        self._crew_ids: Dict[str, int] = {}  # lowercased name : crew_ID
+        self._crew_jobs: Dict[int, Set[str]] = {}  # crew_ID : lowercased jobs in the database
+        self._updated_existing_crew = False
+
+    def run(self, path: str, progress: bool = False) -> ImportReport:
+        """Imports every movie in a file
+
+        Args:
+            path - a string containing the path of a CSV or JSONL file
+            progress - a bool representing if a line should be printed after every chunk
+
+        Returns:
+            an ImportReport with the number of movies imported, throughput, and skipped rows
+        """
+        report = ImportReport()
+        start = time.perf_counter()
+        chunk = []
+        for record in read_records(path):
+            if isinstance(record, tuple):
+                report.add_error(*record)
+                continue
+            chunk.append(record)
+            if len(chunk) == self._chunk_size:
+                self._flush(chunk, report)
+                chunk = []
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"{report.imported} movies imported ({report.imported / elapsed:.0f} movies/sec)")
+        if chunk:
+            self._flush(chunk, report)
+        report.elapsed = time.perf_counter() - start
+
+        # cached movies of crew members who picked up new jobs are stale now
+        if self._updated_existing_crew:
+            utils.clear_movie_cache()
+        return report
+
+    def _flush(self, chunk: List[ImportRecord], report: ImportReport) -> None:
+        """Writes a chunk in one transaction. If it fails, retries each movie alone to find the bad rows"""
+        try:
+            with utils.connection() as db:
+                staged = self._write_chunk(db, chunk)
+        except Exception as e:
+            if len(chunk) == 1:
+                report.add_error(chunk[0].line, chunk[0].title, str(e))
+                return
+            for record in chunk:
+                self._flush([record], report)
+            return
+
+        # only remember crew once the transaction that created them has committed
+        crew_ids, crew_jobs, new_crew, movies = staged
+        self._crew_ids.update(crew_ids)
+        self._crew_jobs.update(crew_jobs)
+        for movie_id, record, movie_crew in movies:
+            utils.index_movie(
+                movie_id,
+                record.title,
+                movie_id,
+                {crew_id: name for crew_id, name in new_crew.items() if crew_id in movie_crew},
+                movie_crew,
+                record.score,
+            )
+        report.imported += len(chunk)
+
+    def _write_chunk(self, db, chunk: List[ImportRecord]) -> tuple:
+        """Writes a chunk of movies with a fixed number of statements
+
+        Returns:
+            the crew IDs, crew jobs, new crew, and movie IDs to remember once the transaction commits
+        """
+        db.start_transaction()
+        with db.cursor() as cursor:
+            # resolve crew this import hasn't seen yet, along with the jobs they already have
+            names = {}
+            for record in chunk:
+                for name in record.crew:
+                    if name.lower() not in self._crew_ids:
+                        names.setdefault(name.lower(), name)
+            unknown = list(names.values())
+            crew_ids = {}
+            crew_jobs = {}
+            for i in range(0, len(unknown), LOOKUP_BATCH_SIZE):
+                batch = unknown[i : i + LOOKUP_BATCH_SIZE]
+                cursor.execute(
+                    f"""SELECT c.crew_ID, c.crew_name, j.job
+                        FROM Crew c
+                        LEFT JOIN Crew_Job j ON j.crew_ID = c.crew_ID
+                        WHERE c.crew_name IN ({", ".join(["%s"] * len(batch))})
+                        ORDER BY c.crew_ID;""",
+                    tuple(batch),
+                )
+                for crew_id, name, job in cursor.fetchall():
+                    # an accent-insensitive collation also matches names that only differ by an accent, which
+                    # are someone else, so only take the names we asked for
+                    if name.lower() not in names:
+                        continue
+                    jobs = crew_jobs.setdefault(crew_id, set())
+                    if crew_ids.setdefault(name.lower(), crew_id) == crew_id and job is not None:
+                        jobs.add(job.lower())
+
+            # add crew members that don't exist anywhere yet
+            new_crew = {}
+            missing = [name for key, name in names.items() if key not in crew_ids]
+            for i in range(0, len(missing), LOOKUP_BATCH_SIZE):
+                batch = missing[i : i + LOOKUP_BATCH_SIZE]
+                cursor.executemany(
+                    """INSERT INTO Crew(crew_name)
+                       VALUES (%s);""",
+                    [(name,) for name in batch],
+                )
+                # IDs of a multi-row insert aren't guaranteed to be consecutive, so read them back. The collation
+                # can match existing crew whose names only differ by an accent too, none of these names existed
+                # when this transaction looked, so the ones that match ours exactly are the rows we just added
+                cursor.execute(
+                    f"""SELECT crew_ID, crew_name
+                        FROM Crew
+                        WHERE crew_name IN ({", ".join(["%s"] * len(batch))})
+                        ORDER BY crew_ID;""",
+                    tuple(batch),
+                )
+                added = {name.lower() for name in batch}
+                for crew_id, name in cursor.fetchall():
+                    key = name.lower()
+                    if key in added and key not in crew_ids:
+                        crew_ids[key] = crew_id
+                        crew_jobs[crew_id] = set()
+                        new_crew[crew_id] = name
+
+            # add the movies, one INSERT each since titles aren't unique and the IDs can't be read back.
+            # Imported movies have no ratings yet, so they all start with the same Top-Rated score
+            unrated_score = utils.TOP_SCORE.format(rating_sum="0", num_ratings="0")
+            movie_ids = []
+            for record in chunk:
+                cursor.execute(
+                    f"""INSERT INTO Movie(movie_title, run_time, rating_sum, num_ratings, top_score)
+                        VALUES (%s, %s, 0, 0, {unrated_score});""",
+                    (record.title, record.runtime),
+                )
+                movie_ids.append(cursor.lastrowid)
+
+            # build every row of the chunk
+            job_rows, score_rows, credit_rows, song_rows, movies = [], [], [], [], []
+            for movie_id, record in zip(movie_ids, chunk):
+                composer_id = None
+                movie_crew = []
+                for name, jobs in record.crew.items():
+                    crew_id = crew_ids.get(name.lower()) or self._crew_ids[name.lower()]
+                    have = crew_jobs.setdefault(crew_id, set(self._crew_jobs.get(crew_id, ())))
+                    for job in jobs:
+                        if job.lower() not in have:
+                            have.add(job.lower())
+                            job_rows.append((job, crew_id))
+                            self._updated_existing_crew |= crew_id not in new_crew
+                        if job.lower() == "composer" and composer_id is None:
+                            composer_id = crew_id
+                    if crew_id not in movie_crew:
+                        movie_crew.append(crew_id)
+                        credit_rows.append((crew_id, movie_id))
+
+                # a movie's score shares its ID
+                score_rows.append((movie_id, composer_id))
+                song_rows.extend((song, movie_id, i + 1) for i, song in enumerate(record.score))
+                movies.append((movie_id, record, movie_crew))
+
+            # parents before children so every foreign key already exists
+            if job_rows:
+                cursor.executemany("INSERT INTO Crew_Job(job, crew_ID) VALUES (%s, %s);", job_rows)
+            cursor.executemany("INSERT INTO Score(score_ID, crew_ID) VALUES (%s, %s);", score_rows)
+            for i in range(0, len(movie_ids), LOOKUP_BATCH_SIZE):
+                batch = movie_ids[i : i + LOOKUP_BATCH_SIZE]
+                cursor.execute(
+                    f"""UPDATE Movie
+                        SET score_ID = movie_ID
+                        WHERE movie_ID IN ({", ".join(["%s"] * len(batch))});""",
+                    tuple(batch),
+                )
+            cursor.executemany("INSERT INTO Crew_Movie(crew_ID, movie_ID) VALUES (%s, %s);", credit_rows)
+            cursor.executemany(
+                "INSERT INTO Rating_Histogram(movie_ID, bucket, num_ratings) VALUES (%s, %s, %s);",
+                [(movie_id, bucket, 0) for movie_id in movie_ids for bucket in range(BUCKETS)],
+            )
+            if song_rows:
+                cursor.executemany(
+                    "INSERT INTO Score_Songs(song, score_ID, track_number) VALUES (%s, %s, %s);",
+                    song_rows,
+                )
+        db.commit()
+        return crew_ids, crew_jobs, new_crew, movies
+
+
+def _parse_csv_crew(crew: str) -> Dict[str, List[str]]:
+    """Parses the crew column of a CSV row, "Name:Job/Job;Name:Job" """
+    parsed = {}
+    for member in crew.split(";"):
+        if not member.strip():
+            continue
+        if ":" not in member:
+            raise ValueError(f'crew member "{member.strip()}" has no job, expected "Name:Job"')
+        name, jobs = member.rsplit(":", 1)
+        parsed.setdefault(name.strip(), []).extend(j.strip() for j in jobs.split("/") if j.strip())
+    return parsed
+
+
+def _validate(line: int, title: str, runtime, crew: Dict[str, List[str]], score: List[str]) -> ImportRecord:
+    """Checks a movie against the schema limits and normalizes it
+
+    Returns:
+        an ImportRecord, with an Unknown Composer added if no one was credited as composer
+
+    Raises:
+        ValueError - if any field is missing or won't fit in the database
+    """
+    if not title:
+        raise ValueError("missing title")
+    if len(title) > utils.MAX_MOVIE_TITLE_LENGTH:
+        raise ValueError(f"title is longer than {utils.MAX_MOVIE_TITLE_LENGTH} characters")
+
+    # runtime is minutes or HH:MM:SS, stored as HH:MM:SS
+    if isinstance(runtime, str) and ":" in runtime:
+        hours, minutes, seconds = (int(part) for part in runtime.split(":"))
+        runtime = hours * 60 + minutes + seconds / 60
+    runtime = int(runtime)
+    if runtime < 0:
+        raise ValueError("runtime can't be negative")
+    runtime = f"{runtime // 60:02d}:{runtime % 60:02d}:00"
+
+    clean_crew = {}
+    for name, jobs in crew.items():
+        name = str(name).strip()
+        jobs = [jobs] if isinstance(jobs, str) else jobs
+        jobs = [str(job).strip() for job in jobs if str(job).strip()]
+        if not name or not jobs:
+            raise ValueError("every crew member needs a name and at least one job")
+        if len(name) > utils.MAX_CREW_NAME_LENGTH:
+            raise ValueError(f'crew name "{name[:32]}..." is longer than {utils.MAX_CREW_NAME_LENGTH} characters')
+        for job in jobs:
+            if len(job) > utils.MAX_JOB_LENGTH:
+                raise ValueError(f'job "{job}" is longer than {utils.MAX_JOB_LENGTH} characters')
+        clean_crew.setdefault(name, []).extend(jobs)
+    if not any(job.lower() == "composer" for jobs in clean_crew.values() for job in jobs):
+        clean_crew["Unknown Composer"] = ["Composer"]
+
+    score = [str(song).strip() for song in score]
+    for song in score:
+        if len(song) > utils.MAX_SONG_NAME_LENGTH:
+            raise ValueError(f'song "{song[:32]}..." is longer than {utils.MAX_SONG_NAME_LENGTH} characters')
+
+    return ImportRecord(line, title, runtime, clean_crew, score)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import movies into Betterboxd")
+    parser.add_argument("path", help="a .csv or .jsonl file of movies")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="movies per transaction")
+    parser.add_argument("--errors", help="write skipped rows to this CSV file")
+    args = parser.parse_args()
+
+    utils.set_up_database()
+    report = CatalogImporter(args.chunk_size).run(args.path, progress=True)
+    report.pprint()
+    if args.errors:
+        report.write_errors(args.errors)
+    utils.disconnect_database()
+    sys.exit(1 if report.failed else 0)
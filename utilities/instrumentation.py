@@ -0,0 +1,307 @@
+"""Counts what the data layer sends to the database.
+
+Every pooled connection is wrapped by instrument(), so each statement is attributed to the function
+that ran it (utils._hydrate_chunk, utils.add_log, migrations.apply_pending, ...). For every function
+we keep how many queries it ran, the total and slowest time they took, and how many rows came back.
+A function whose query count keeps climbing with the size of its result is an N+1 pattern.
+
+Statements slower than the slow query threshold also go to the slow query log, with their
+parameters replaced by their types so passwords and search terms never end up on disk.
+"""
+
+import collections
+import re
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, List
+
+SLOW_QUERY_MS = 100  # default slow query threshold in milliseconds
+SLOW_QUERY_HISTORY = 50  # slow queries kept in memory for report()
+
+# print report() when disconnect_database() runs
+DUMP_ON_DISCONNECT = False
+
+# modules that only run statements on behalf of the data layer, see _caller()
+_PASSTHROUGH_MODULES = {"utilities.prepared"}
+
+# the slow query logger, made by _logger() the first time it's needed so logging is only imported then
+_LOGGER = None
+
+
+class QueryStats:
+    """Thread-safe per-function query counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._functions: Dict[str, List[float]] = {}
+
+    def record(self, function: str, seconds: float, rows: int) -> None:
+        """Counts one finished statement
+
+        Args:
+            function - a string naming the function that ran the statement, like "utils.add_log"
+            seconds - a float representing how long the statement took, fetching included
+            rows - an int representing how many rows were fetched
+        """
+        with self._lock:
+            counters = self._functions.setdefault(function, [0, 0.0, 0.0, 0])
+            counters[0] += 1
+            counters[1] += seconds
+            counters[2] = max(counters[2], seconds)
+            counters[3] += rows
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Returns a copy of the counters, times are in milliseconds
+
+        Returns:
+            a dictionary of function : {queries, total_ms, max_ms, rows} dictionaries
+        """
+        with self._lock:
+            return {
+                function: {"queries": queries, "total_ms": total * 1000, "max_ms": slowest * 1000, "rows": rows}
+                for function, (queries, total, slowest, rows) in self._functions.items()
+            }
+
+    def reset(self) -> None:
+        """Zeroes every counter"""
+        with self._lock:
+            self._functions.clear()
+
+
+class SlowQueryLog:
+    """Keeps the most recent slow statements and writes them to the slow query log"""
+
+    def __init__(self, threshold_ms: float = SLOW_QUERY_MS, history: int = SLOW_QUERY_HISTORY):
+        self.threshold_ms = threshold_ms
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = collections.deque(maxlen=history)
+        self.count = 0
+
+    def is_slow(self, seconds: float) -> bool:
+        """Checks if a statement that took this long belongs in the log"""
+        return self.threshold_ms is not None and seconds * 1000 >= self.threshold_ms
+
+    def add(self, function: str, sql: str, params: Any, seconds: float, rows: int) -> None:
+        """Logs a slow statement
+
+        Args:
+            function - a string naming the function that ran the statement
+            sql - a string containing the statement
+            params - the statement's parameters, already redacted
+            seconds - a float representing how long the statement took
+            rows - an int representing how many rows were fetched
+        """
+        sql = re.sub(r"%s(, %s)+", "%s, ...", " ".join(sql.split()))
+        entry = {"function": function, "ms": seconds * 1000, "rows": rows, "sql": sql, "params": params}
+        with self._lock:
+            self._recent.append(entry)
+            self.count += 1
+        _logger().warning("%.1f ms in %s, %d rows: %s params=%s", entry["ms"], function, rows, entry["sql"], params)
+
+    def recent(self) -> List[Dict[str, Any]]:
+        """Returns the most recent slow statements, oldest first"""
+        with self._lock:
+            return list(self._recent)
+
+    def reset(self) -> None:
+        """Forgets every slow statement seen so far, the log file is left alone"""
+        with self._lock:
+            self._recent.clear()
+            self.count = 0
+
+
+# global counters shared by every instrumented connection
+STATS = QueryStats()
+SLOW_QUERIES = SlowQueryLog()
+
+
+def configure(threshold_ms: float = SLOW_QUERY_MS, log_path: str = None, dump_on_disconnect: bool = None) -> None:
+    """Sets up the slow query log
+
+    Args:
+        threshold_ms - a float representing how slow a statement has to be to get logged, None to log nothing
+        log_path - a string containing a file to append slow queries to, None to only keep them in memory
+        dump_on_disconnect - a bool representing if disconnect_database() prints report(), None leaves it as is
+    """
+    global DUMP_ON_DISCONNECT
+
+    SLOW_QUERIES.threshold_ms = threshold_ms
+    if log_path is not None or _LOGGER is not None:
+        import logging
+
+        logger = _logger()
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+            handler.close()
+        if log_path is not None:
+            handler = logging.FileHandler(log_path, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.WARNING)
+        else:
+            logger.addHandler(logging.NullHandler())
+    if dump_on_disconnect is not None:
+        DUMP_ON_DISCONNECT = dump_on_disconnect
+
+
+def _logger():
+    """Gets the slow query logger, setting it up the first time"""
+    global _LOGGER
+
+    if _LOGGER is None:
+        import logging
+
+        _LOGGER = logging.getLogger("betterboxd.slow_queries")
+        _LOGGER.propagate = False  # only goes to the log file, never into the CLI
+        _LOGGER.addHandler(logging.NullHandler())
+    return _LOGGER
+
+
+def reset() -> None:
+    """Zeroes the per-function counters and forgets the recent slow queries"""
+    STATS.reset()
+    SLOW_QUERIES.reset()
+
+
+def report() -> str:
+    """Formats the counters and recent slow queries for printing
+
+    Returns:
+        a string with one line per function, busiest first
+    """
+    stats = STATS.snapshot()
+    lines = [f"{'function':<36} {'queries':>8} {'total ms':>10} {'avg ms':>8} {'max ms':>8} {'rows':>8}"]
+    for function, s in sorted(stats.items(), key=lambda item: item[1]["total_ms"], reverse=True):
+        lines.append(
+            f"{function:<36} {s['queries']:>8} {s['total_ms']:>10.2f} {s['total_ms'] / s['queries']:>8.2f}"
+            f" {s['max_ms']:>8.2f} {s['rows']:>8}"
+        )
+    if not stats:
+        lines.append("no queries recorded")
+    threshold = SLOW_QUERIES.threshold_ms
+    if threshold is not None:
+        lines.append(f"\n{SLOW_QUERIES.count} queries over {threshold:g} ms")
+        for entry in SLOW_QUERIES.recent():
+            lines.append(f"  {entry['ms']:.1f} ms in {entry['function']}: {entry['sql']} params={entry['params']}")
+    return "\n".join(lines)
+
+
+def instrument(db) -> "_InstrumentedConnection":
+    """Wraps a connection so every statement run on its cursors is counted
+
+    Args:
+        db - an open database connection
+
+    Returns:
+        a connection that behaves like db
+    """
+    return _InstrumentedConnection(db)
+
+
+def _redact(params: Any) -> Any:
+    """Replaces parameter values with their type names"""
+    if isinstance(params, dict):
+        return {key: type(value).__name__ for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        types = [type(value).__name__ for value in params]
+        # long IN (...) lists are all the same type, no need to spell them out
+        return f"{len(types)} x {types[0]}" if len(types) > 3 and len(set(types)) == 1 else types
+    return type(params).__name__
+
+
+def _caller(depth: int) -> str:
+    """Names the function depth frames above the caller, as module.function.
+    Frames in _PASSTHROUGH_MODULES are skipped, a statement they run belongs to whoever called them
+    """
+    frame = sys._getframe(depth + 1)
+    while frame.f_globals.get("__name__") in _PASSTHROUGH_MODULES and frame.f_back is not None:
+        frame = frame.f_back
+    return f"{frame.f_globals.get('__name__', '?').rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+
+
+class _InstrumentedConnection:
+    """Wraps a connection so its cursors are instrumented"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._db, name)
+
+    def cursor(self, **kwargs) -> "_InstrumentedCursor":
+        return _InstrumentedCursor(self._db.cursor(**kwargs))
+
+
+class _InstrumentedCursor:
+    """Wraps a cursor, timing each statement from execute until its rows are read.
+    A statement is recorded once its rows are all read, the next one runs, or the cursor closes, so fetching counts towards it
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._pending = None  # [function, sql, params, many, seconds, rows] of the statement being read
+
+    def __enter__(self) -> "_InstrumentedCursor":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        while (row := self.fetchone()) is not None:
+            yield row
+
+    def execute(self, sql: str, params=()) -> None:
+        self._run(self._cursor.execute, sql, params, False)
+
+    def executemany(self, sql: str, seq_params) -> None:
+        self._run(self._cursor.executemany, sql, list(seq_params), True)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(start, row is not None)
+        return row
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(start, len(rows))
+        # nothing is left to read, record it now instead of waiting for a cursor that may be kept open
+        self._flush()
+        return rows
+
+    def close(self) -> None:
+        self._flush()
+        self._cursor.close()
+
+    def _run(self, method, sql: str, params, many: bool) -> None:
+        self._flush()
+        function = _caller(2)
+        start = time.perf_counter()
+        try:
+            method(sql, params)
+        finally:
+            self._pending = [function, sql, params, many, time.perf_counter() - start, 0]
+        # a statement with no result set, like an UPDATE, is already done
+        if self._cursor.description is None:
+            self._flush()
+
+    def _fetched(self, start: float, rows: int) -> None:
+        if self._pending is not None:
+            self._pending[4] += time.perf_counter() - start
+            self._pending[5] += rows
+
+    def _flush(self) -> None:
+        if self._pending is None:
+            return
+        function, sql, params, many, seconds, rows = self._pending
+        self._pending = None
+        STATS.record(function, seconds, rows)
+        if SLOW_QUERIES.is_slow(seconds):
+            redacted = f"{len(params)} rows of {_redact(params[0])}" if many and params else _redact(params)
+            SLOW_QUERIES.add(function, sql, redacted, seconds, rows)
@@ -0,0 +1,303 @@
+"""Versioned schema migrations for the Betterboxd database.
+
+Migrations are the numbered files in sql_files/migrations/, named <version>_<description>.sql.
+A backend whose SQL differs can ship <version>_<description>.<dialect>.sql, which it runs instead.
+They run in version order on top of the base schema from sql_files/0_tables.sql, and every applied
+version is recorded in the Schema_Version table so each one only ever runs once.
+Where schema changes can be rolled back (SQLite) a migration and its version row commit together. MySQL
+commits every schema change on the spot, so there each statement is recorded in Schema_Version_Step as
+it runs, and a migration that failed partway resumes after its last successful statement.
+
+Run from the root of the project to apply pending migrations and check the hot query plans:
+    python -m utilities.migrations
+"""
+
+import os
+import re
+import sys
+from typing import Dict, List, Set, Tuple
+
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql_files", "migrations"
+)
+
+TRANSACTIONAL_DDL = {"sqlite"}  # dialects that can roll back CREATE, ALTER, and DROP
+
+# sample parameters to EXPLAIN each of the prepared statements in utils.py with, checked by explain_hot_queries().
+# A list for statements that look up {ids}, more than one ID so the plan is read for a padded IN list
+EXPLAIN_PARAMS = {
+    "movies by id": [1, 2, 3],
+    "songs by score": [1, 2, 3],
+    "crew by movie": [1, 2, 3],
+    "histogram by movie": [1, 2, 3],
+    "rate movie": (0.0, 0, 0.0, 0, 1),
+    "account by name": ("welchchristina",),
+    "movie by title": ("harakiri",),
+    "crew by name": ("masaki kobayashi",),
+    "collaborators": (1, 1, 10),
+    "movies after id": (25,),
+    "top rated": (25,),
+    "watch history": ("welchchristina", 10),
+}
+
+
+def hot_queries() -> Dict[str, Tuple[str, tuple]]:
+    """Gets the queries utils.py runs most often, every statement in its prepared statement registry,
+    exactly as they're sent. The LIKE '%term%' search fallbacks are left out, no index can serve those
+
+    Returns:
+        a dictionary of name : (SQL, sample parameters) tuples
+
+    Raises:
+        KeyError - if a prepared statement has no sample parameters in EXPLAIN_PARAMS
+    """
+    # utils.py registers its statements when it's imported, and it imports this module
+    import utilities.prepared as prepared
+    import utilities.utils
+
+    queries = {}
+    for name, sql in prepared.statements().items():
+        if name not in EXPLAIN_PARAMS:
+            raise KeyError(f"Add sample parameters for the prepared statement {name!r} to EXPLAIN_PARAMS")
+        params = EXPLAIN_PARAMS[name]
+        queries[name] = prepared.bind(name, ids=params) if "{ids}" in sql else prepared.bind(name, params)
+    return queries
+
+
+# every table, the columns the app reads or writes, and the indexes it relies on, once all migrations
+# have run. Names are lowercase, checked by check_schema(). Add to it with every migration
+SCHEMA = {
+    "account": {
+        "columns": ("account_name", "favorite_movie", "watch_count", "passphrase"),
+        "indexes": (),
+    },
+    "crew": {"columns": ("crew_id", "crew_name"), "indexes": ("idx_crew_name",)},
+    "crew_job": {"columns": ("job", "crew_id"), "indexes": ("idx_crew_job_crew",)},
+    "crew_movie": {"columns": ("crew_id", "movie_id"), "indexes": ("idx_crew_movie_movie",)},
+    "movie": {
+        "columns": ("movie_id", "run_time", "num_ratings", "movie_title", "score_id", "rating_sum", "top_score"),
+        "indexes": ("idx_movie_title", "idx_movie_top_score"),
+    },
+    "score": {"columns": ("score_id", "crew_id"), "indexes": ()},
+    "score_songs": {"columns": ("song", "score_id", "track_number"), "indexes": ("idx_score_songs_score",)},
+    "rating_prior": {"columns": ("prior_id", "prior_mean", "prior_weight"), "indexes": ()},
+    "rating_histogram": {"columns": ("movie_id", "bucket", "num_ratings"), "indexes": ()},
+    "watch_log": {
+        "columns": ("log_id", "account_name", "movie_id", "rating", "logged_at"),
+        "indexes": ("idx_watch_log_account",),
+    },
+    "schema_version": {"columns": ("version", "name", "applied_at"), "indexes": ()},
+}
+
+
+def check_schema(schema: Dict[str, Dict[str, Set[str]]]) -> List[str]:
+    """Compares a database's schema against SCHEMA
+
+    Args:
+        schema - a dictionary from Backend.describe_schema()
+
+    Returns:
+        a list of strings describing every missing table, column, and index, empty if nothing is missing
+    """
+    problems = []
+    for table, expected in SCHEMA.items():
+        if table not in schema:
+            problems.append(f"table {table} not found")
+            continue
+        for kind, label in (("columns", "column"), ("indexes", "index")):
+            for name in expected[kind]:
+                if name not in schema[table][kind]:
+                    problems.append(f"{label} {table}.{name} not found")
+    return problems
+
+
+def list_migrations(dialect: str = "") -> List[Tuple[int, str, str]]:
+    """Finds every migration file, preferring the dialect-specific version of a migration if there is one
+
+    Args:
+        dialect - a string containing the backend's dialect, like "mysql" or "sqlite"
+
+    Returns:
+        a list of (version, name, path) tuples sorted by version
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.fullmatch(r"(\d+)_(\w+?)(?:\.(\w+))?\.sql", filename)
+        if match is None or match.group(3) not in (None, dialect):
+            continue
+        version = int(match.group(1))
+        if match.group(3) or version not in migrations:
+            migrations[version] = (version, match.group(2), os.path.join(MIGRATIONS_DIR, filename))
+    return sorted(migrations.values())
+
+
+def split_statements(sql: str) -> List[str]:
+    """Splits a SQL script into statements, dropping -- comments.
+    Assumes no semicolons inside string literals, which holds for everything in sql_files/
+
+    Args:
+        sql - a string containing the contents of a .sql file
+
+    Returns:
+        a list of statements without their trailing semicolons
+    """
+    lines = [line for line in sql.splitlines() if not line.strip().startswith("--")]
+    return [stmt.strip() for stmt in "\n".join(lines).split(";") if stmt.strip()]
+
+
+def current_version(db) -> int:
+    """Gets the newest migration applied to the database
+
+    Args:
+        db - an open database connection
+
+    Returns:
+        an int representing the schema version, 0 if no migrations have run
+    """
+    _ensure_version_table(db)
+    with db.cursor() as cursor:
+        cursor.execute("SELECT MAX(version) FROM Schema_Version;")
+        version = cursor.fetchone()[0]
+    return version or 0
+
+
+def apply_pending(db, dialect: str = "") -> List[str]:
+    """Applies every migration newer than the database's schema version, in order.
+    A failed migration leaves the database at the last one that succeeded, rerunning picks up from there
+
+    Args:
+        db - an open database connection
+        dialect - a string containing the backend's dialect, like "mysql" or "sqlite"
+
+    Returns:
+        a list of the names of the migrations that were applied
+    """
+    applied = []
+    version = current_version(db)
+    for migration_version, name, path in list_migrations(dialect):
+        if migration_version <= version:
+            continue
+        with open(path, encoding="utf-8") as f:
+            statements = split_statements(f.read())
+        if dialect in TRANSACTIONAL_DDL:
+            _apply_atomically(db, migration_version, name, statements)
+        else:
+            _apply_resumably(db, migration_version, name, statements)
+        applied.append(f"{migration_version:03d}_{name}")
+    return applied
+
+
+def _apply_atomically(db, version: int, name: str, statements: List[str]) -> None:
+    """Runs a migration and records its version in one transaction, all of it is rolled back if a statement fails"""
+    db.start_transaction()
+    try:
+        with db.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+            _record_version(cursor, version, name)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
+def _apply_resumably(db, version: int, name: str, statements: List[str]) -> None:
+    """Runs a migration one statement at a time, skipping the statements an earlier failed run already applied.
+    Each statement and its Schema_Version_Step row commit together, except for schema changes,
+    which MySQL commits on their own before the step is recorded
+    """
+    with db.cursor() as cursor:
+        cursor.execute(
+            """SELECT step
+               FROM Schema_Version_Step
+               WHERE version = %(version)s;""",
+            {"version": version},
+        )
+        done = {row[0] for row in cursor.fetchall()}
+    for step, statement in enumerate(statements):
+        if step in done:
+            continue
+        db.start_transaction()
+        try:
+            with db.cursor() as cursor:
+                cursor.execute(statement)
+                cursor.execute(
+                    """INSERT INTO Schema_Version_Step(version, step)
+                       VALUES (%(version)s, %(step)s);""",
+                    {"version": version, "step": step},
+                )
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+    db.start_transaction()
+    with db.cursor() as cursor:
+        _record_version(cursor, version, name)
+        cursor.execute(
+            """DELETE FROM Schema_Version_Step
+               WHERE version = %(version)s;""",
+            {"version": version},
+        )
+    db.commit()
+
+
+def _record_version(cursor, version: int, name: str) -> None:
+    """Marks a migration as applied"""
+    cursor.execute(
+        """INSERT INTO Schema_Version(version, name)
+           VALUES (%(version)s, %(name)s);""",
+        {"version": version, "name": name},
+    )
+
+
+def explain_hot_queries(db, backend) -> Dict[str, List[str]]:
+    """Reads the query plan of every hot query and finds tables that can only be read with a full scan.
+    A full scan is allowed when an index could have been used, the optimizer picks scans on tiny tables
+
+    Args:
+        db - an open database connection
+        backend - the Backend the connection came from, which knows how to read its query plans
+
+    Returns:
+        a dictionary of query name : [tables read without any usable index], empty lists mean the query is covered
+    """
+    return {name: backend.full_scans(db, sql, params) for name, (sql, params) in hot_queries().items()}
+
+
+def _ensure_version_table(db) -> None:
+    """Creates the Schema_Version and Schema_Version_Step tables if this database has never been migrated"""
+    with db.cursor() as cursor:
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS Schema_Version (
+                   version    INT,
+                   name       VARCHAR(128),
+                   applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                   PRIMARY KEY (version)
+               );"""
+        )
+        # the statements of an unfinished migration that already ran, cleared once it's applied
+        cursor.execute(
+            """CREATE TABLE IF NOT EXISTS Schema_Version_Step (
+                   version INT,
+                   step    INT,
+                   PRIMARY KEY (version, step)
+               );"""
+        )
+    db.commit()
+
+
+if __name__ == "__main__":
+    import utilities.utils as utils
+
+    utils.set_up_database()
+    failed = False
+    with utils.connection() as db:
+        print(f"Schema version: {current_version(db)}")
+        for name, tables in explain_hot_queries(db, utils.get_backend()).items():
+            if tables:
+                failed = True
+                print(f"FAIL {name}: full scan of {', '.join(tables)} with no usable index")
+            else:
+                print(f"ok   {name}")
+    utils.disconnect_database()
+    sys.exit(1 if failed else 0)
@@ -1,8 +1,15 @@
 from typing import Dict, List
 import utilities.utils as utils
+from utilities.histogram import RatingHistogram
+
+# stands in for crew, score, and histogram on summary movies until they're loaded from the database
+_NOT_LOADED = object()
 
 
 class Movie:
+    """A movie, either fully loaded or a summary whose crew, score, and histogram are loaded on first use"""
+
+    __slots__ = ("_id", "_title", "_runtime", "_avg_rating", "_num_ratings", "_crew", "_score", "_score_id", "_histogram")
 
     def __init__(
         self,
@@ -14,6 +21,7 @@ class Movie:
         score_id: int = -1,
         crew: Dict[str, List[str]] = None,
         score: List[str] = None,
+        histogram: RatingHistogram = None,
     ):
         self._id = id
         self._title = title
@@ -23,10 +31,35 @@ class Movie:
         self._crew = crew
         self._score = score
         self._score_id = score_id
+        self._histogram = histogram
+
+    @classmethod
+    def summary(cls, id: int, title: str, runtime: int, avg_rating: float, num_ratings: int, score_id: int) -> "Movie":
+        """Makes a movie without its crew, score, and histogram, for list views.
+        They're loaded from the database the first time anything asks for them
+
+        Args:
+            id - an int representing the ID of a movie in the database
+            title - a string containing the title
+            runtime - the run time
+            avg_rating - a float representing the average star rating
+            num_ratings - an int representing the number of ratings
+            score_id - an int representing the ID of the movie's score
+        """
+        return cls(id, title, runtime, avg_rating, num_ratings, score_id, _NOT_LOADED, _NOT_LOADED, _NOT_LOADED)
+
+    def is_loaded(self) -> bool:
+        """Checks if the crew, score, and histogram are in memory"""
+        return self._crew is not _NOT_LOADED
+
+    def _load(self) -> None:
+        """Loads the crew, score, and histogram of a summary movie"""
+        if self._crew is _NOT_LOADED:
+            utils.load_movie_details([self])
 
     def get_id(self) -> int:
         """Getter for id"""
-        return self._title
+        return self._id
 
     def get_title(self) -> str:
         """Getter for title"""
@@ -45,7 +78,8 @@ class Movie:
         return self._num_ratings
 
     def get_crew(self) -> Dict[str, List[str]]:
-        """Getter for crew"""
+        """Getter for crew, loads it first on summary movies"""
+        self._load()
         return self._crew
 
     def set_crew(self, crew: Dict[str, List[str]]) -> None:
@@ -63,10 +97,12 @@ class Movie:
             name - name of crew member (key)
             roles - list of roles (values)
         """
+        self._load()
         self._crew[name] = roles
 
     def get_score(self) -> List[str]:
-        """Getter for score"""
+        """Getter for score, loads it first on summary movies"""
+        self._load()
         return self._score
 
     def get_score_id(self) -> int:
@@ -83,6 +119,19 @@ class Movie:
         self._score_id = score_id
         self._score = score
 
+    def get_histogram(self) -> RatingHistogram:
+        """Getter for the rating histogram, loads it first on summary movies. None for movies not in the database"""
+        self._load()
+        return self._histogram
+
+    def set_histogram(self, histogram: RatingHistogram) -> None:
+        """Setter for the rating histogram
+
+        Args:
+            histogram - a RatingHistogram of the movie's ratings
+        """
+        self._histogram = histogram
+
     def add_rating(self, rating: float) -> None:
         """Adds a rating
 
@@ -93,6 +142,27 @@ class Movie:
         new_total_score = total_score + rating
         self._num_ratings += 1
         self._avg_rating = new_total_score / self._num_ratings
+        if self._histogram is not None and self._histogram is not _NOT_LOADED:
+            self._histogram.add(rating)
+
+    def to_dict(self, details: bool = True) -> Dict[str, object]:
+        """Converts the movie to plain types, ready to be sent as JSON
+
+        Args:
+            details - a bool representing if the crew, score, and histogram are included, loading them if needed
+        """
+        movie = {
+            "id": self._id,
+            "title": self._title,
+            "runtime": None if self._runtime is None else str(self._runtime),
+            "avg_rating": round(self._avg_rating, 2),
+            "num_ratings": self._num_ratings,
+        }
+        if details:
+            movie["crew"] = self.get_crew() or {}
+            movie["score"] = self.get_score() or []
+            movie["histogram"] = None if self.get_histogram() is None else self._histogram.to_dict()
+        return movie
 
     def display_movie(self) -> None:
         """Pretty print the movie class"""
@@ -100,10 +170,12 @@ class Movie:
         print(f"Title: {self._title}")
         print(f"Run time: {self._runtime}")
         print(f"Crew:")
-        for k, v in self._crew.items():
-            print(f"\t{k}: {v[0]}")
+        for k, v in self.get_crew().items():
+            print(f"\t{k}: {', '.join(v)}")
         print(f"Score:")
-        for i, s in enumerate(self._score):
+        for i, s in enumerate(self.get_score()):
             print(f"\t {i + 1}. {s}")
-        print(f"Star Rating: {self._avg_rating}")
+        print(f"Star Rating: {round(self._avg_rating, 2)} ({self._num_ratings} ratings)")
+        if self.get_histogram() is not None:
+            self._histogram.display()
         print()
@@ -0,0 +1,157 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no connection frees up before the checkout timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections.
+    Connections are opened lazily up to size and handed out one caller at a time through connection()
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 5, timeout: float = 30.0):
+        """
+        Args:
+            factory - a function that opens and returns a new database connection
+            size - an int representing the max number of open connections
+            timeout - a float representing how many seconds a checkout waits before giving up
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self._factory = factory
+        self._size = size
+        self._timeout = timeout
+        self._idle: List[Any] = []
+        self._num_open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        # stats
+        self._checkouts = 0
+        self._exhausted = 0
+        self._timeouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def get_size(self) -> int:
+        """Getter for size"""
+        return self._size
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Checks out a connection for the duration of a with block, then checks it back in.
+        Uncommitted work is rolled back if the block raises
+
+        Yields:
+            an open database connection owned by the caller until the block exits
+        """
+        conn = self._checkout()
+        try:
+            yield conn
+        except BaseException:
+            self._checkin(conn, healthy=self._rollback(conn))
+            raise
+        self._checkin(conn)
+
+    def stats(self) -> Dict[str, float]:
+        """Returns a snapshot of the pool counters, wait times are in seconds"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "open": self._num_open,
+                "in_use": self._num_open - len(self._idle),
+                "checkouts": self._checkouts,
+                "exhausted": self._exhausted,
+                "timeouts": self._timeouts,
+                "total_wait": self._total_wait,
+                "max_wait": self._max_wait,
+                "avg_wait": self._total_wait / self._checkouts if self._checkouts else 0.0,
+            }
+
+    def close(self) -> None:
+        """Closes every idle connection, connections still checked out are closed on checkin"""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._num_open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close(conn)
+
+    def _checkout(self) -> Any:
+        """Takes an idle connection, opens a new one if there is room, else waits for a checkin"""
+        start = time.monotonic()
+        waited = False
+        with self._cond:
+            while 1:
+                if self._closed:
+                    raise PoolExhaustedError("Connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._num_open < self._size:
+                    self._num_open += 1
+                    conn = None
+                    break
+
+                # pool exhausted, wait for someone to check a connection back in
+                waited = True
+                remaining = self._timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolExhaustedError(
+                        f"No database connection became available within {self._timeout} seconds"
+                    )
+                self._cond.wait(remaining)
+
+            wait = time.monotonic() - start
+            self._checkouts += 1
+            self._exhausted += waited
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+        if conn is None:
+            try:
+                conn = self._factory()
+            except BaseException:
+                with self._cond:
+                    self._num_open -= 1
+                    self._cond.notify()
+                raise
+        return conn
+
+    def _checkin(self, conn: Any, healthy: bool = True) -> None:
+        """Returns a connection to the pool, or closes it if it's broken or the pool is closed"""
+        with self._cond:
+            if healthy and not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._num_open -= 1
+            self._cond.notify()
+        self._close(conn)
+
+    @staticmethod
+    def _rollback(conn: Any) -> bool:
+        """Rolls back a connection after an error
+
+        Returns:
+            a bool representing if the connection is still usable
+        """
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn: Any) -> None:
+        """Closes a connection, ignoring errors from connections that are already dead"""
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,141 @@
+"""Registry of the named statements the data layer runs over and over, prepared once per connection.
+
+Sending SQL text makes the server parse and plan it every time, even when it's the same few statements
+thousands of times. A statement registered here gets its own cursor on each connection the first time
+it runs there, opened with cursor(prepared=True). On MySQL that's a server-side prepared statement,
+so later runs only send the parameters. SQLite has no such cursor, it reuses the compiled statement
+out of sqlite3's per-connection statement cache as long as the SQL text is identical.
+
+Statements that look rows up by a list of IDs write the list as {ids}. The list is padded out to the
+next of IN_LIST_SIZES by repeating its last ID, so a handful of prepared statements cover every size
+instead of one per length.
+"""
+
+import threading
+import weakref
+from typing import Any, Dict, List, Sequence, Tuple
+
+IN_LIST_SIZES = (1, 5, 25, 100, 500)  # lengths ID lists are padded to, longer lists are sent as they are
+
+_STATEMENTS: Dict[str, str] = {}
+
+# connection : {SQL text : its prepared cursor}, entries go away with their connection
+_CURSORS = weakref.WeakKeyDictionary()
+_CURSORS_LOCK = threading.Lock()
+
+
+def register(name: str, sql: str) -> None:
+    """Adds a statement to the registry
+
+    Args:
+        name - a string naming the statement, like "movies by id"
+        sql - a string containing the statement with %s parameters, and {ids} where a list of IDs goes
+    """
+    if name in _STATEMENTS and _STATEMENTS[name] != sql:
+        raise ValueError(f"A different statement is already registered as {name!r}")
+    _STATEMENTS[name] = sql
+
+
+def statements() -> Dict[str, str]:
+    """Gets every registered statement
+
+    Returns:
+        a dictionary of name : SQL pairs
+    """
+    return dict(_STATEMENTS)
+
+
+def in_list_size(n: int) -> int:
+    """Finds how long a list of n IDs is once it's padded
+
+    Returns:
+        an int, the smallest of IN_LIST_SIZES that fits n, or n itself if none does
+    """
+    for size in IN_LIST_SIZES:
+        if size >= n:
+            return size
+    return n
+
+
+def sql_for(name: str, num_ids: int = None) -> str:
+    """Gets the exact SQL text a registered statement runs as
+
+    Args:
+        name - a string naming a registered statement
+        num_ids - an int representing how many IDs are looked up, for statements with {ids}
+
+    Returns:
+        a string containing the statement with its ID list written out as placeholders
+    """
+    sql = _STATEMENTS[name]
+    if "{ids}" not in sql:
+        return sql
+    return sql.replace("{ids}", ", ".join(["%s"] * in_list_size(num_ids)))
+
+
+def bind(name: str, params: Sequence[Any] = (), ids: Sequence[Any] = None) -> Tuple[str, tuple]:
+    """Gets the exact SQL text and parameters a registered statement runs with
+
+    Args:
+        name - a string naming a registered statement
+        params - a sequence of the statement's parameters, for statements without {ids}
+        ids - a non-empty sequence of the IDs to look up, for statements with {ids}, used for every {ids}
+
+    Returns:
+        a (SQL, parameters) tuple, with the ID list padded to its prepared length
+    """
+    if ids is not None:
+        ids = list(ids)
+        padded = ids + ids[-1:] * (in_list_size(len(ids)) - len(ids))
+        params = tuple(padded) * _STATEMENTS[name].count("{ids}")
+    return sql_for(name, None if ids is None else len(ids)), tuple(params)
+
+
+def execute(db, name: str, params: Sequence[Any] = (), ids: Sequence[Any] = None) -> Any:
+    """Runs a registered statement on the connection's prepared cursor for it.
+    Read its rows right away, the cursor is reused the next time the statement runs on this connection
+
+    Args:
+        db - a database connection checked out of the pool
+        name - a string naming a registered statement
+        params - a sequence of the statement's parameters, for statements without {ids}
+        ids - a non-empty sequence of the IDs to look up, for statements with {ids}, used for every {ids}
+
+    Returns:
+        the cursor the statement ran on
+    """
+    sql, params = bind(name, params, ids)
+    cursor = _cursor(db, sql)
+    cursor.execute(sql, params)
+    return cursor
+
+
+def executemany(db, name: str, seq_params: Sequence[Sequence[Any]]) -> None:
+    """Runs a registered statement once per set of parameters, on the connection's prepared cursor for it
+
+    Args:
+        db - a database connection checked out of the pool
+        name - a string naming a registered statement without {ids}
+        seq_params - a sequence of parameter sequences
+    """
+    sql = sql_for(name)
+    _cursor(db, sql).executemany(sql, [tuple(params) for params in seq_params])
+
+
+def fetchall(db, name: str, params: Sequence[Any] = (), ids: Sequence[Any] = None) -> List[tuple]:
+    """Runs a registered statement and reads every row, see execute()
+
+    Returns:
+        a list of row tuples
+    """
+    return execute(db, name, params, ids).fetchall()
+
+
+def _cursor(db, sql: str) -> Any:
+    """Gets the connection's prepared cursor for a statement, opening it the first time"""
+    with _CURSORS_LOCK:
+        cursors = _CURSORS.setdefault(db, {})
+    cursor = cursors.get(sql)
+    if cursor is None:
+        cursor = cursors[sql] = db.cursor(prepared=True)
+    return cursor
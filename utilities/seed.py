@@ -0,0 +1,164 @@
+"""Reads the seed data in sql_files/ as Python rows instead of SQL text"""
+
+import glob
+import os
+import re
+from typing import Dict, Iterator, List, Tuple
+
+SQL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sql_files")
+SCHEMA_FILE = os.path.join(SQL_DIR, "0_tables.sql")
+MAX_USERNAME_LENGTH = 32  # matches Account.account_name
+
+# which ID space each ID column lives in, used to shift IDs when scaling
+_ID_COLUMNS = {
+    "crew_ID": "crew",
+    "score_ID": "score",
+    "movie_ID": "movie",
+    "favorite_movie": "movie",
+}
+
+# columns that must stay unique (or readable) across copies, and how each copy changes them
+_NAME_COLUMNS = {
+    "crew_name": lambda name, copy: f"{name} {copy}",
+    "movie_title": lambda title, copy: f"{title} ({copy})",
+    # seed account names never contain "_", so "<name>_<copy>" can't collide with another name or copy.
+    # Long names lose the end of the name, not the suffix
+    "account_name": lambda name, copy: f"{name[: MAX_USERNAME_LENGTH - len(f'_{copy}')]}_{copy}",
+}
+
+
+class SeedFile:
+    """The table, columns, and rows of one INSERT file"""
+
+    def __init__(self, path: str, table: str, columns: List[str], rows: List[tuple]):
+        self.path = path
+        self.table = table
+        self.columns = columns
+        self.rows = rows
+
+
+def seed_files() -> List[str]:
+    """Gets the paths of the seed data files, 1_crew_data.sql through 7_crew_movie.sql, in load order"""
+    return sorted(
+        (p for p in glob.glob(os.path.join(SQL_DIR, "*.sql")) if p != SCHEMA_FILE),
+        key=lambda p: int(os.path.basename(p).split("_")[0]),
+    )
+
+
+def read_seed_file(path: str) -> SeedFile:
+    """Parses a seed file made of one INSERT INTO table(columns) VALUES (...), (...); statement
+
+    Args:
+        path - a string containing the path of the .sql file
+
+    Returns:
+        a SeedFile holding the rows as tuples of str, int, float, or None
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    match = re.match(r"\s*INSERT INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES", text, re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"{path} doesn't start with an INSERT INTO ... VALUES statement")
+    columns = [c.strip() for c in match.group(2).split(",")]
+    return SeedFile(path, match.group(1), columns, list(_parse_values(text, match.end())))
+
+
+def _parse_values(text: str, i: int) -> Iterator[tuple]:
+    """Tokenizes the (...), (...) list of a VALUES clause starting at index i"""
+    row = None
+    while i < len(text):
+        ch = text[i]
+        if ch == "(":
+            row = []
+            i += 1
+        elif ch == ")":
+            yield tuple(row)
+            row = None
+            i += 1
+        elif ch in "'\"":
+            value, i = _parse_string(text, i)
+            row.append(value)
+        elif ch == ";" and row is None:
+            return
+        elif ch.isspace() or ch == ",":
+            i += 1
+        else:
+            end = i
+            while end < len(text) and text[end] not in ",)" and not text[end].isspace():
+                end += 1
+            row.append(_parse_literal(text[i:end]))
+            i = end
+
+
+def _parse_string(text: str, i: int) -> Tuple[str, int]:
+    """Reads a quoted MySQL string literal starting at index i, handling \\ escapes and doubled quotes"""
+    quote = text[i]
+    i += 1
+    chars = []
+    while 1:
+        ch = text[i]
+        if ch == "\\":
+            chars.append(text[i + 1])
+            i += 2
+        elif ch == quote and text[i + 1 : i + 2] == quote:
+            chars.append(quote)
+            i += 2
+        elif ch == quote:
+            return "".join(chars), i + 1
+        else:
+            chars.append(ch)
+            i += 1
+
+
+def _parse_literal(token: str):
+    """Turns an unquoted literal into an int, float, or None"""
+    if token.upper() == "NULL":
+        return None
+    try:
+        return int(token)
+    except ValueError:
+        return float(token)
+
+
+def load_seed_data(scale: int = 1) -> List[SeedFile]:
+    """Reads every seed file, replicated scale times
+
+    Args:
+        scale - an int representing how many copies of the shipped data to generate
+
+    Returns:
+        a list of SeedFiles in load order
+    """
+    seeds = [read_seed_file(path) for path in seed_files()]
+    for seed in seeds:
+        # Movie rows get their IDs from AUTO_INCREMENT, make them explicit so copies can reference them
+        if seed.table == "Movie" and "movie_ID" not in seed.columns:
+            seed.columns = ["movie_ID"] + seed.columns
+            seed.rows = [(i + 1,) + row for i, row in enumerate(seed.rows)]
+    if scale == 1:
+        return seeds
+
+    # the size of each ID space in one copy of the data
+    by_table = {seed.table: seed for seed in seeds}
+    offsets = {
+        "crew": max(row[0] for row in by_table["Crew"].rows),
+        "score": max(row[0] for row in by_table["Score"].rows),
+        "movie": max(row[0] for row in by_table["Movie"].rows),
+    }
+    for seed in seeds:
+        seed.rows = [_shift_row(seed, row, copy, offsets) for copy in range(scale) for row in seed.rows]
+    return seeds
+
+
+def _shift_row(seed: SeedFile, row: tuple, copy: int, offsets: Dict[str, int]) -> tuple:
+    """Makes copy number copy of a row, shifting IDs into that copy's range and suffixing names"""
+    if copy == 0:
+        return row
+    shifted = []
+    for column, value in zip(seed.columns, row):
+        if value is not None and column in _ID_COLUMNS:
+            value += copy * offsets[_ID_COLUMNS[column]]
+        elif value is not None and column in _NAME_COLUMNS:
+            value = _NAME_COLUMNS[column](value, copy)
+        shifted.append(value)
+    return tuple(shifted)
@@ -0,0 +1,329 @@
+"""Serves Betterboxd as a JSON API over HTTP, so many users can share one process.
+
+Requests are handled by a fixed pool of worker threads, which share the connection pool set up by
+utils.set_up_database(). Logging in hands out a session token instead of setting the CLI's global
+current user, send it back as "Authorization: Bearer <token>" on the endpoints that need one.
+    POST /login               {"username": ..., "password": ...}   -> {"token": ..., "username": ...}
+    POST /logout              (token)
+    GET  /profile             (token)                              -> the user, their favorite movie, and recent logs
+    GET  /movies/<id>                                              -> a movie
+    POST /movies/<id>/logs    (token) {"rating": 0.0-5.0}          -> 202 and the queued log
+    GET  /movies/<id>/similar?limit=5                              -> {"movies": [...]}, most shared crew first
+    GET  /crew/<id>/collaborators?limit=10                         -> {"collaborators": [{"id", "name", "movies"}, ...]}
+    GET  /crew/<id>/connection/<id>                                -> {"links": [{"from", "movie", "to"}, ...]}
+    GET  /search?kind=title|crew|score&term=...&after_id=0&page_size=10&summary=0
+                                                                   -> {"movies": [...], "next_after_id": ...}
+Searching with summary=1 leaves out every movie's crew and score, which saves two queries per page.
+Logs are written behind, see utils.add_log, so a movie's rating and the profile's recent logs include
+a new log within utils.WATCH_LOG_FLUSH_INTERVAL seconds of the 202.
+Errors come back as {"error": message} with a 4xx status.
+
+Run from the root of the project with `python3 main.py --serve 8000`, add --sqlite PATH to skip MySQL.
+"""
+
+import hashlib
+import json
+import re
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import utilities.utils as utils
+
+WORKERS = 16  # requests handled at once
+SESSION_TTL = 60 * 60  # seconds a session lasts without being used
+MAX_PAGE_SIZE = 100  # most search results, similar movies, or collaborators per request
+IDLE_TIMEOUT = 5  # seconds a keep-alive connection may sit idle before its worker moves on
+
+
+class ServiceError(Exception):
+    """Raised by an endpoint to send an error response"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SessionStore:
+    """Thread-safe map of session tokens to usernames, sessions expire after SESSION_TTL idle seconds"""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, Tuple[str, float]] = {}
+        self._ttl = ttl
+
+    def create(self, username: str) -> str:
+        """Starts a session
+
+        Args:
+            username - a string representing a user who just logged in
+
+        Returns:
+            a string containing the new session token
+        """
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._sessions[token] = (username, time.monotonic())
+            self._expire()
+        return token
+
+    def get(self, token: str) -> str:
+        """Looks a session up and keeps it alive
+
+        Returns:
+            the username of the session, or None if the token is unknown or expired
+        """
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None or time.monotonic() - session[1] > self._ttl:
+                self._sessions.pop(token, None)
+                return None
+            self._sessions[token] = (session[0], time.monotonic())
+            return session[0]
+
+    def end(self, token: str) -> None:
+        """Ends a session, does nothing if it doesn't exist"""
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def _expire(self) -> None:
+        """Drops expired sessions, caller must hold the lock"""
+        now = time.monotonic()
+        for token in [t for t, (_, seen) in self._sessions.items() if now - seen > self._ttl]:
+            del self._sessions[token]
+
+
+class BetterboxdServer(HTTPServer):
+    """HTTP server that hands requests to a fixed pool of worker threads instead of a thread per request"""
+
+    def __init__(self, address: Tuple[str, int], workers: int = WORKERS, verbose: bool = False):
+        """
+        Args:
+            address - a (host, port) tuple to listen on, port 0 picks a free one
+            workers - an int representing how many requests are handled at once
+            verbose - a bool representing if every request is printed
+        """
+        super().__init__(address, _Handler)
+        self.sessions = SessionStore()
+        self.verbose = verbose
+        self._workers = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="betterboxd-http")
+
+    def process_request(self, request, client_address) -> None:
+        self._workers.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self._workers.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes one connection's requests to the endpoint functions"""
+
+    protocol_version = "HTTP/1.1"
+    timeout = IDLE_TIMEOUT
+    # headers and body go out as separate writes, without this every response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    _ROUTES = [
+        ("POST", re.compile(r"/login"), "_login"),
+        ("POST", re.compile(r"/logout"), "_logout"),
+        ("GET", re.compile(r"/profile"), "_profile"),
+        ("GET", re.compile(r"/movies/(\d+)"), "_movie"),
+        ("POST", re.compile(r"/movies/(\d+)/logs"), "_log"),
+        ("GET", re.compile(r"/movies/(\d+)/similar"), "_similar"),
+        ("GET", re.compile(r"/crew/(\d+)/collaborators"), "_collaborators"),
+        ("GET", re.compile(r"/crew/(\d+)/connection/(\d+)"), "_connection"),
+        ("GET", re.compile(r"/search"), "_search"),
+    ]
+
+    def do_GET(self) -> None:
+        self._dispatch("GET")
+
+    def do_POST(self) -> None:
+        self._dispatch("POST")
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _dispatch(self, method: str) -> None:
+        """Finds the endpoint for the request, runs it, and sends its result as JSON"""
+        url = urlparse(self.path)
+        try:
+            # the body has to be read even when it's not used, or it's mistaken for the next request
+            body = self._read_body()
+            for route_method, pattern, name in self._ROUTES:
+                match = pattern.fullmatch(url.path)
+                if match is None:
+                    continue
+                if route_method != method:
+                    raise ServiceError(405, f"{url.path} only accepts {route_method}")
+                status, payload = getattr(self, name)(*match.groups(), query=parse_qs(url.query), body=body)
+                break
+            else:
+                raise ServiceError(404, f"no endpoint at {url.path}")
+        except ServiceError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            self.log_error("%s failed: %r", self.path, e)
+            status, payload = 500, {"error": "internal error"}
+        self._send(status, payload)
+
+    def _read_body(self) -> Dict[str, Any]:
+        """Reads the request body as a JSON object, empty if there is no body"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length == 0:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ServiceError(400, "the request body isn't valid JSON")
+        if not isinstance(body, dict):
+            raise ServiceError(400, "the request body must be a JSON object")
+        return body
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _token(self) -> str:
+        """Gets the bearer token sent with the request, or None"""
+        header = self.headers.get("Authorization", "")
+        return header[len("Bearer ") :] if header.startswith("Bearer ") else None
+
+    def _username(self) -> str:
+        """Gets the user the request's session belongs to
+
+        Raises:
+            ServiceError - 401 if there is no valid session
+        """
+        username = self.server.sessions.get(self._token() or "")
+        if username is None:
+            raise ServiceError(401, "log in first and send the token as 'Authorization: Bearer <token>'")
+        return username
+
+    # endpoints, each returns a (status, JSON-able dictionary) tuple
+
+    def _login(self, query, body) -> Tuple[int, Dict[str, Any]]:
+        password = str(body.get("password", ""))
+        hashed_password = hashlib.sha256(password.encode()).hexdigest()
+        user = utils.authenticate(str(body.get("username", "")), hashed_password)
+        if user is None:
+            raise ServiceError(401, "wrong username or password")
+        return 200, {"token": self.server.sessions.create(user.get_username()), "username": user.get_username()}
+
+    def _logout(self, query, body) -> Tuple[int, Dict[str, Any]]:
+        self._username()
+        self.server.sessions.end(self._token())
+        return 200, {}
+
+    def _profile(self, query, body) -> Tuple[int, Dict[str, Any]]:
+        user = utils.get_user(self._username())
+        if user is None:
+            raise ServiceError(401, "this account no longer exists")
+        favorite = None
+        if user.get_fav_movie_id() is not None:
+            mov = utils.summarize_movies([user.get_fav_movie_id()])[0]
+            favorite = None if mov is None else {"id": user.get_fav_movie_id(), "title": mov.get_title()}
+        logs = [
+            {"movie": {"id": mov.get_id(), "title": mov.get_title()}, "rating": rating, "logged_at": logged_at}
+            for mov, rating, logged_at in utils.get_watch_history(user.get_username())
+        ]
+        return 200, {"username": user.get_username(), "favorite_movie": favorite, "recent_logs": logs}
+
+    def _movie(self, movie_id: str, query, body) -> Tuple[int, Dict[str, Any]]:
+        mov = utils.search_for_movie_by_id(int(movie_id))
+        if mov is None:
+            raise ServiceError(404, f"no movie with ID {movie_id}")
+        return 200, mov.to_dict()
+
+    def _log(self, movie_id: str, query, body) -> Tuple[int, Dict[str, Any]]:
+        username = self._username()
+        try:
+            rating = float(body["rating"])
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError(400, 'send the rating as {"rating": 0.0-5.0}')
+        if not 0.0 <= rating <= 5.0:
+            raise ServiceError(400, "ratings go from 0.0 to 5.0")
+        if utils.summarize_movies([int(movie_id)])[0] is None:
+            raise ServiceError(404, f"no movie with ID {movie_id}")
+        utils.add_log(int(movie_id), rating, username)
+        return 202, {"movie_id": int(movie_id), "rating": rating, "username": username}
+
+    def _similar(self, movie_id: str, query, body) -> Tuple[int, Dict[str, Any]]:
+        try:
+            limit = min(int(query.get("limit", [str(utils.SIMILAR_SIZE)])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ServiceError(400, "limit must be a number")
+        if utils.summarize_movies([int(movie_id)])[0] is None:
+            raise ServiceError(404, f"no movie with ID {movie_id}")
+        similar = utils.similar_movies(int(movie_id), limit)
+        return 200, {"movies": [dict(mov.to_dict(details=False), similarity=round(score, 4)) for mov, score in similar]}
+
+    def _collaborators(self, crew_id: str, query, body) -> Tuple[int, Dict[str, Any]]:
+        try:
+            limit = min(int(query.get("limit", [str(utils.COLLABORATORS_SIZE)])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ServiceError(400, "limit must be a number")
+        ranking = utils.top_collaborators(int(crew_id), limit)
+        return 200, {"collaborators": [{"id": other, "name": name, "movies": together} for other, name, together in ranking]}
+
+    def _connection(self, from_crew: str, to_crew: str, query, body) -> Tuple[int, Dict[str, Any]]:
+        links = utils.crew_connection(int(from_crew), int(to_crew))
+        if links is None:
+            raise ServiceError(404, f"crew {from_crew} and {to_crew} aren't connected")
+        return 200, {
+            "links": [
+                {"from": name, "movie": {"id": mov.get_id(), "title": mov.get_title()}, "to": next_name}
+                for name, mov, next_name in links
+            ]
+        }
+
+    def _search(self, query, body) -> Tuple[int, Dict[str, Any]]:
+        kind = query.get("kind", ["title"])[0]
+        term = query.get("term", [""])[0]
+        if kind not in ("title", "crew", "score"):
+            raise ServiceError(400, "kind must be title, crew, or score")
+        try:
+            after_id = int(query.get("after_id", ["0"])[0])
+            page_size = min(int(query.get("page_size", [str(utils.PAGE_SIZE)])[0]), MAX_PAGE_SIZE)
+        except ValueError:
+            raise ServiceError(400, "after_id and page_size must be numbers")
+        if page_size < 1:
+            raise ServiceError(400, "page_size must be at least 1")
+        summary = query.get("summary", ["0"])[0].lower() in ("1", "true")
+        movies, next_after_id = utils.search_page(kind, term, after_id, page_size, summary)
+        return 200, {"movies": [m.to_dict(details=not summary) for m in movies], "next_after_id": next_after_id}
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, workers: int = WORKERS, verbose: bool = False) -> None:
+    """Serves the API until interrupted, the database must already be set up
+
+    Args:
+        host - a string containing the address to listen on
+        port - an int representing the port to listen on
+        workers - an int representing how many requests are handled at once
+        verbose - a bool representing if every request is printed
+    """
+    server = BetterboxdServer((host, port), workers, verbose)
+    print(f"Serving Betterboxd on http://{host}:{server.server_address[1]} with {workers} workers, Ctrl+C to stop")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
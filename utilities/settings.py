@@ -0,0 +1,94 @@
+"""Connection settings, so starting the app doesn't have to ask for them every time.
+
+Settings come from, in order of precedence:
+    environment variables   BETTERBOXD_DB_HOST, BETTERBOXD_DB_USER, BETTERBOXD_DB_PASSWORD,
+                            BETTERBOXD_DB_NAME, and BETTERBOXD_SQLITE
+    a config file           betterboxd.ini in the folder the app runs from, or the file given with
+                            `python3 main.py --config PATH` or BETTERBOXD_CONFIG, in this format:
+                                [database]
+                                host = localhost
+                                user = root
+                                password = ...
+                                database = Betterboxd
+                                ; or use an embedded SQLite database instead of MySQL
+                                sqlite = betterboxd.db
+Setting sqlite picks SQLiteBackend. Otherwise it's MySQL, and the app only asks for the host, user,
+or password when none of the above sets them, so the password can stay out of the file.
+"""
+
+import os
+from typing import Callable, Dict
+
+from utilities.backends import Backend, MySQLBackend, SQLiteBackend
+
+CONFIG_FILE = "betterboxd.ini"  # looked for in the working directory when no config file is given
+CONFIG_SECTION = "database"
+
+# setting : environment variable
+ENVIRONMENT = {
+    "host": "BETTERBOXD_DB_HOST",
+    "user": "BETTERBOXD_DB_USER",
+    "password": "BETTERBOXD_DB_PASSWORD",
+    "database": "BETTERBOXD_DB_NAME",
+    "sqlite": "BETTERBOXD_SQLITE",
+}
+
+# config file given on the command line, None to use BETTERBOXD_CONFIG or CONFIG_FILE
+_CONFIG_PATH = None
+
+
+def configure(config_path: str = None) -> None:
+    """Sets the config file to read settings from
+
+    Args:
+        config_path - a string containing the path of an INI file, None to go back to the default
+    """
+    global _CONFIG_PATH
+
+    _CONFIG_PATH = config_path
+
+
+def load() -> Dict[str, str]:
+    """Reads the settings from the config file and the environment, the environment wins
+
+    Returns:
+        a dictionary of the settings that are set, keys from ENVIRONMENT
+
+    Raises:
+        FileNotFoundError - if a config file was given but doesn't exist
+    """
+    settings = {}
+    path = _CONFIG_PATH or os.environ.get("BETTERBOXD_CONFIG")
+    if path is not None and not os.path.isfile(path):
+        raise FileNotFoundError(f"Config file {path} doesn't exist")
+    path = path or (CONFIG_FILE if os.path.isfile(CONFIG_FILE) else None)
+    if path is not None:
+        # only needed when there is a file to read
+        import configparser
+
+        parser = configparser.ConfigParser()
+        parser.read(path, encoding="utf-8")
+        if parser.has_section(CONFIG_SECTION):
+            settings.update({key: value for key, value in parser.items(CONFIG_SECTION) if key in ENVIRONMENT})
+    for key, variable in ENVIRONMENT.items():
+        if variable in os.environ:
+            settings[key] = os.environ[variable]
+    return settings
+
+
+def make_backend(settings: Dict[str, str], ask: Callable[[str], str] = input) -> Backend:
+    """Builds the backend the settings describe, asking for whichever MySQL setting they leave out
+
+    Args:
+        settings - a dictionary from load()
+        ask - a function that prompts for a value and returns what was typed
+
+    Returns:
+        a SQLiteBackend if sqlite is set, else a MySQLBackend
+    """
+    if settings.get("sqlite"):
+        return SQLiteBackend(settings["sqlite"])
+    host = settings["host"] if "host" in settings else ask("Enter the host, default is localhost, press enter to accept default: ")
+    user = settings["user"] if "user" in settings else ask("Enter the current user, default is root, press enter to accept default: ")
+    password = settings["password"] if "password" in settings else ask("Enter the password for the current user: ")
+    return MySQLBackend(host or "localhost", user or "root", password, settings.get("database") or "Betterboxd")
@@ -0,0 +1,207 @@
+import bisect
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Set, Tuple
+
+# length of the n-grams stored in the index
+N = 3
+
+# sorted results of the most recent searches CatalogIndex keeps, so paging through one costs a binary search per page
+CACHED_SEARCHES = 64
+
+
+def ngrams(text: str) -> Set[str]:
+    """Splits a string into its set of overlapping trigrams
+
+    Args:
+        text - a lowercased string
+
+    Returns:
+        a set of every substring of length N in text, empty if text is shorter than N
+    """
+    return {text[i : i + N] for i in range(len(text) - N + 1)}
+
+
+class TrigramIndex:
+    """Inverted index from trigrams to the keys whose text contains them.
+    Answers case-insensitive substring queries by intersecting posting lists instead of scanning every string
+    """
+
+    def __init__(self):
+        self._texts: Dict[int, str] = {}
+        self._postings: Dict[str, Set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._texts)
+
+    def add(self, key: int, text: str) -> None:
+        """Indexes a string under a key, replacing whatever the key held before
+
+        Args:
+            key - an int representing the row the text belongs to
+            text - the string to index
+        """
+        self.remove(key)
+        text = text.lower()
+        self._texts[key] = text
+        for gram in ngrams(text):
+            self._postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: int) -> None:
+        """Drops a key from the index, does nothing if it isn't indexed
+
+        Args:
+            key - an int representing the row to drop
+        """
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in ngrams(text):
+            posting = self._postings[gram]
+            posting.discard(key)
+            if not posting:
+                del self._postings[gram]
+
+    def search(self, term: str) -> Set[int]:
+        """Finds every key whose text contains the term
+
+        Args:
+            term - a string to look for, matched case-insensitively
+
+        Returns:
+            a set of matching keys
+        """
+        term = term.lower()
+        if len(term) < N:
+            # too short to have a trigram, the texts are in memory so scan them
+            return {key for key, text in self._texts.items() if term in text}
+
+        # intersect smallest posting lists first so the candidate set shrinks fast
+        postings = sorted((self._postings.get(gram, set()) for gram in ngrams(term)), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= posting
+
+        # trigrams can all be present without being contiguous, so verify each candidate
+        return {key for key in candidates if term in self._texts[key]}
+
+
+class CatalogIndex:
+    """Substring search over movie titles, crew names, and score songs, all resolved to movie IDs in memory.
+    The sorted results of recent searches are cached until anything is added
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._results: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+        self._titles = TrigramIndex()
+        self._crew = TrigramIndex()
+        self._songs = TrigramIndex()
+        self._score_songs: Dict[int, List[str]] = {}
+        self._crew_movies: Dict[int, Set[int]] = {}
+        self._score_movies: Dict[int, Set[int]] = {}
+
+    def add_movie(self, movie_id: int, title: str, score_id: int = None) -> None:
+        """Indexes a movie title and links the movie to its score
+
+        Args:
+            movie_id - an int representing the ID of the movie
+            title - a string containing the movie title
+            score_id - an int representing the ID of the movie's score, may be None
+        """
+        with self._lock:
+            self._results.clear()
+            self._titles.add(movie_id, title)
+            if score_id is not None:
+                self._score_movies.setdefault(score_id, set()).add(movie_id)
+
+    def add_crew(self, crew_id: int, name: str) -> None:
+        """Indexes a crew member's name
+
+        Args:
+            crew_id - an int representing the ID of the crew member
+            name - a string containing the crew member's name
+        """
+        with self._lock:
+            self._results.clear()
+            self._crew.add(crew_id, name)
+
+    def add_credits(self, movie_id: int, crew_ids: Iterable[int]) -> None:
+        """Links crew members to a movie they worked on
+
+        Args:
+            movie_id - an int representing the ID of the movie
+            crew_ids - the IDs of crew members credited on the movie
+        """
+        with self._lock:
+            self._results.clear()
+            for crew_id in crew_ids:
+                self._crew_movies.setdefault(crew_id, set()).add(movie_id)
+
+    def add_songs(self, score_id: int, songs: Iterable[str]) -> None:
+        """Indexes every song of a score, replacing the songs already indexed for it
+
+        Args:
+            score_id - an int representing the ID of the score
+            songs - song titles on the score
+        """
+        with self._lock:
+            self._results.clear()
+            tracks = self._score_songs[score_id] = list(songs)
+            # newlines never appear in a search term, so one entry per score can't match across songs
+            self._songs.add(score_id, "\n".join(tracks))
+
+    def clear_cache(self) -> None:
+        """Forgets the cached results of recent searches, so the next search of each term runs cold"""
+        with self._lock:
+            self._results.clear()
+
+    def search_titles(self, term: str) -> List[int]:
+        """Gets the IDs of movies with the term in the title, in ascending order"""
+        return self.search_page("title", term, 0, None)
+
+    def search_crew(self, term: str) -> List[int]:
+        """Gets the IDs of movies with the term in a crew member's name, in ascending order"""
+        return self.search_page("crew", term, 0, None)
+
+    def search_songs(self, term: str) -> List[int]:
+        """Gets the IDs of movies with the term in a song of their score, in ascending order"""
+        return self.search_page("score", term, 0, None)
+
+    def search_page(self, kind: str, term: str, after_id: int, limit: int = None) -> List[int]:
+        """Gets one page of a search. The full result is only searched and sorted the first time, the pages
+        after it are cut out of the cached result with a binary search
+
+        Args:
+            kind - a string, one of "title", "crew", or "score"
+            term - a string to look for, matched case-insensitively
+            after_id - an int representing the last movie ID of the previous page, 0 for the first page
+            limit - an int representing the max number of IDs to return, None for all of them
+
+        Returns:
+            a list of unique movie IDs greater than after_id, in ascending order
+        """
+        key = (kind, term.lower())
+        with self._lock:
+            ids = self._results.get(key)
+            if ids is None:
+                ids = sorted(self._search(kind, term))
+                self._results[key] = ids
+                if len(self._results) > CACHED_SEARCHES:
+                    self._results.popitem(last=False)
+            else:
+                self._results.move_to_end(key)
+            start = bisect.bisect_right(ids, after_id)
+            return ids[start:] if limit is None else ids[start : start + limit]
+
+    def _search(self, kind: str, term: str) -> Set[int]:
+        """Finds the IDs of every movie matching a search, unordered. Only called while holding the lock"""
+        if kind == "title":
+            return self._titles.search(term)
+        links, index = (self._crew_movies, self._crew) if kind == "crew" else (self._score_movies, self._songs)
+        movie_ids = set()
+        for key in index.search(term):
+            movie_ids |= links.get(key, set())
+        return movie_ids
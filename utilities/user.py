@@ -7,14 +7,16 @@ _DEFAULT_FAV_MOVIE = 25
 class User:
     _user_id_counter = 0
 
+    __slots__ = ("_id", "_username", "_password", "_fav_movie_id")
+
     def __init__(
         self,
         username: str,
         password: str,
         fav_movie_id: int = None,
     ):
-        self._user_id_counter += 1
-        self._id = self._user_id_counter
+        User._user_id_counter += 1
+        self._id = User._user_id_counter
         self._username = username
         self._password = password
         self._fav_movie_id = fav_movie_id
@@ -61,4 +63,4 @@ class User:
         """Pretty print the user class"""
         print(f"ID: {self._id}")
         print(f"Username: {self._username}")
-        print(f"Favorite Movie: {self._fav_movie}\n")
+        print(f"Favorite Movie: {self._fav_movie_id}\n")
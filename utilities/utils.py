@@ -1,14 +1,32 @@
+import hmac
 import os
 import sys
-from typing import Dict, List
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from typing import ContextManager, Dict, Iterator, List, Tuple, Union
 from utilities.user import User
 from utilities.movie import Movie
-import mysql.connector
-
-# global database object
-_DB = None
-
-# list of all the tables in properly configured database
+from utilities.backends import Backend
+from utilities.pool import ConnectionPool
+import utilities.instrumentation as instrumentation
+import utilities.migrations as migrations
+import utilities.prepared as prepared
+import utilities.settings as settings
+from utilities.trigram import CatalogIndex
+from utilities.histogram import BUCKETS, RatingHistogram, backfill_counts, bucket_of
+from utilities.write_behind import WriteBehindBuffer
+
+# global storage backend, and the pool of its connections every query checks a connection out of
+_BACKEND = None
+_POOL = None
+
+# write-behind buffer add_log queues logs in, created by set_up_database()
+_WATCH_LOG = None
+
+# the base tables from 0_tables.sql, every other table comes from a migration (see migrations.SCHEMA)
 _TABLES = [
     "account",
     "crew",
@@ -19,6 +37,162 @@ _TABLES = [
     "score_songs",
 ]
 
+# ratings are stored as a running sum and count, this derives the average when reading a movie
+_AVERAGE_RATING = "COALESCE(rating_sum / NULLIF(num_ratings, 0), 0)"
+
+# Bayesian-weighted score behind the Top-Rated ranking, a movie's ratings blended with the prior in
+# Rating_Prior. Filled in with the SQL for the rating sum and count being scored
+TOP_SCORE = """COALESCE(
+    (SELECT (p.prior_weight * p.prior_mean + {rating_sum}) / NULLIF(p.prior_weight + {num_ratings}, 0)
+     FROM Rating_Prior p
+     WHERE p.prior_ID = 1), 0)"""
+
+# statements run the most, prepared once per connection (see utilities/prepared.py)
+prepared.register(
+    "movies by id",
+    f"""SELECT movie_ID, run_time, {_AVERAGE_RATING}, num_ratings, movie_title, score_ID
+        FROM Movie
+        WHERE movie_ID IN ({{ids}});""",
+)
+# track_number is stored as a string so sort it numerically
+prepared.register(
+    "songs by score",
+    """SELECT score_ID, song
+       FROM Score_Songs
+       WHERE score_ID IN ({ids})
+       ORDER BY score_ID, CAST(track_number AS UNSIGNED);""",
+)
+# crew (including composers) with every job they have
+prepared.register(
+    "crew by movie",
+    """SELECT mc.movie_ID, c.crew_name, j.job
+       FROM (
+           SELECT movie_ID, crew_ID
+           FROM Crew_Movie
+           WHERE movie_ID IN ({ids})
+           UNION
+           SELECT m.movie_ID, s.crew_ID
+           FROM Movie m
+           JOIN Score s ON s.score_ID = m.score_ID
+           WHERE m.movie_ID IN ({ids})) AS mc
+       JOIN Crew c ON c.crew_ID = mc.crew_ID
+       LEFT JOIN Crew_Job j ON j.crew_ID = c.crew_ID
+       ORDER BY mc.movie_ID, c.crew_ID;""",
+)
+prepared.register(
+    "histogram by movie",
+    """SELECT movie_ID, bucket, num_ratings
+       FROM Rating_Histogram
+       WHERE movie_ID IN ({ids});""",
+)
+# adds to a movie's running sum and count, the new top_score is set first since MySQL evaluates SET left
+# to right and it has to see the old sum and count. Takes rating_sum, num_ratings, rating_sum, num_ratings, movie_ID
+prepared.register(
+    "rate movie",
+    f"""UPDATE Movie
+        SET top_score = {TOP_SCORE.format(rating_sum="Movie.rating_sum + %s", num_ratings="Movie.num_ratings + %s")},
+            rating_sum = rating_sum + %s, num_ratings = num_ratings + %s
+        WHERE movie_ID = %s;""",
+)
+prepared.register(
+    "account by name",
+    """SELECT account_name, favorite_movie, watch_count, passphrase
+       FROM Account
+       WHERE account_name = %s;""",
+)
+prepared.register(
+    "movie by title",
+    """SELECT movie_ID
+       FROM Movie
+       WHERE movie_title = %s;""",
+)
+prepared.register(
+    "crew by name",
+    """SELECT crew_ID
+       FROM Crew
+       WHERE crew_name = %s
+       ORDER BY crew_ID;""",
+)
+# the people who share the most movies with someone, a walk of their Crew_Movie rows and then of each of
+# those movies' crew through idx_crew_movie_movie. Only the top few get their name looked up.
+# Takes crew_ID, crew_ID, limit
+prepared.register(
+    "collaborators",
+    """SELECT t.crew_ID, c.crew_name, t.together
+       FROM (
+           SELECT b.crew_ID, COUNT(*) AS together
+           FROM Crew_Movie a
+           JOIN Crew_Movie b ON b.movie_ID = a.movie_ID
+           WHERE a.crew_ID = %s AND b.crew_ID <> %s
+           GROUP BY b.crew_ID
+           ORDER BY together DESC, b.crew_ID
+           LIMIT %s) AS t
+       JOIN Crew c ON c.crew_ID = t.crew_ID
+       ORDER BY t.together DESC, t.crew_ID;""",
+)
+# movies added since the search index last read Movie, almost always none
+prepared.register(
+    "movies after id",
+    """SELECT movie_ID, movie_title, score_ID
+       FROM Movie
+       WHERE movie_ID > %s
+       ORDER BY movie_ID;""",
+)
+prepared.register(
+    "top rated",
+    """SELECT movie_ID, top_score
+       FROM Movie
+       ORDER BY top_score DESC, movie_ID
+       LIMIT %s;""",
+)
+prepared.register(
+    "watch history",
+    """SELECT movie_ID, rating, logged_at
+       FROM Watch_Log
+       WHERE account_name = %s
+       ORDER BY logged_at DESC, log_ID DESC
+       LIMIT %s;""",
+)
+
+# in-memory trigram index over titles, crew names, and songs, None until build_search_index() runs
+_SEARCH_INDEX = None
+# highest movie_ID the search index has read from Movie, newer movies are indexed before the next search
+_SEARCH_INDEX_SYNCED_ID = 0
+
+# movie x crew graph behind similar_movies() and crew_connection(),
+# None until it's first asked for since it needs numpy
+_CREW_GRAPH = None
+_CREW_GRAPH_LOCK = threading.Lock()
+
+# full-scan fallbacks for the inexact searches, only used when the search index isn't built.
+# Each returns one page of matching movie IDs in ID order, starting after the last ID of the previous page
+LIKE_SEARCHES = {
+    "title": """SELECT movie_ID
+                FROM Movie
+                WHERE movie_title LIKE %(term)s
+                AND movie_ID > %(after_id)s
+                ORDER BY movie_ID
+                LIMIT %(limit)s;""",
+    "crew": """SELECT DISTINCT movie_ID
+               FROM Crew_Movie
+               WHERE crew_ID IN (
+                   SELECT crew_ID
+                   FROM Crew
+                   WHERE crew_name LIKE %(term)s)
+               AND movie_ID > %(after_id)s
+               ORDER BY movie_ID
+               LIMIT %(limit)s;""",
+    "score": """SELECT movie_ID
+                FROM Movie
+                WHERE score_ID IN (
+                    SELECT score_ID
+                    FROM Score_Songs
+                    WHERE LOWER(song) LIKE %(term)s)
+                AND movie_ID > %(after_id)s
+                ORDER BY movie_ID
+                LIMIT %(limit)s;""",
+}
+
 # global representing who is logged in
 _CURRENT_USER = None
 
@@ -31,6 +205,17 @@ MAX_CREW_NAME_LENGTH = 128
 MAX_SONG_NAME_LENGTH = 128
 MAX_MOVIE_TITLE_LENGTH = 128
 MAX_PASSPHRASE_LENGTH = 64
+POOL_SIZE = 5  # default max number of open database connections
+HYDRATE_CHUNK_SIZE = 500  # max number of movie IDs sent in a single IN (...) list
+MOVIE_CACHE_SIZE = 1024  # max number of hydrated movies kept in memory
+MOVIE_CACHE_TTL = 300  # seconds a cached movie stays valid, None to never expire
+PAGE_SIZE = 10  # movies per page of search results
+TOP_RATED_SIZE = 25  # movies shown on the Top movies page
+SIMILAR_SIZE = 5  # movies shown under More like this
+COLLABORATORS_SIZE = 10  # people shown as someone's frequent collaborators
+WATCH_LOG_FLUSH_INTERVAL = 0.5  # most seconds a log waits in the write-behind buffer
+WATCH_LOG_BATCH_SIZE = 500  # queued logs that trigger a flush before the interval is up
+WATCH_LOG_MAX_QUEUED = 10000  # max logs waiting to be written, add_log blocks past this
 
 
 class GoBackException(Exception):
@@ -42,29 +227,130 @@ class GoBackException(Exception):
         super().__init__()
 
 
-def set_up_database() -> None:
-    """Sets up the database. Asks for host, username, and password for who is running the SQL database"""
-    global _DB
-    tables_in_db = []
-    host = user = password = ""
+class _MovieCache:
+    """Bounded LRU cache of hydrated Movie objects keyed by movie ID, with an optional TTL.
+    Every write to a movie in the database must invalidate or replace its entry
+    """
 
-    print("Let's make sure the database is set up correctly!")
-    host = input("Enter the host, default is localhost, press enter to accept default: ")
-    user = input("Enter the current user, default is root, press enter to accept default: ")
-    password = input("Enter the password for the current user: ")
+    def __init__(self, max_size: int, ttl: float = None):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._max_size = max_size
+        self._ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+
+    def configure(self, max_size: int, ttl: float = None) -> None:
+        """Resizes the cache, evicting the least recently used entries if it shrank
+
+        Args:
+            max_size - an int representing the max number of movies to keep, 0 disables caching
+            ttl - a float representing how many seconds an entry stays valid, None to never expire
+        """
+        with self._lock:
+            self._max_size = max_size
+            self._ttl = ttl
+            self._evict()
+
+    def get(self, movie_id: int) -> Movie:
+        """Gets a cached movie, marking it as most recently used
+
+        Args:
+            movie_id - an int representing the ID of a movie
+
+        Returns:
+            the cached Movie object, or None if it isn't cached or has expired
+        """
+        with self._lock:
+            entry = self._entries.get(movie_id)
+            if entry is not None and self._ttl is not None and time.monotonic() - entry[0] > self._ttl:
+                del self._entries[movie_id]
+                self.evictions += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(movie_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, movie_id: int, mov: Movie) -> None:
+        """Adds or replaces a movie in the cache
+
+        Args:
+            movie_id - an int representing the ID of the movie
+            mov - a fully hydrated Movie object
+        """
+        with self._lock:
+            if self._max_size <= 0:
+                return
+            self._entries[movie_id] = (time.monotonic(), mov)
+            self._entries.move_to_end(movie_id)
+            self._evict()
+
+    def invalidate(self, movie_id: int) -> None:
+        """Drops a movie from the cache, does nothing if it isn't cached
+
+        Args:
+            movie_id - an int representing the ID of a movie
+        """
+        with self._lock:
+            self._entries.pop(movie_id, None)
+
+    def clear(self) -> None:
+        """Drops every movie from the cache and resets the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Returns a snapshot of the cache counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self._max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _evict(self) -> None:
+        """Drops least recently used entries until the cache fits, caller must hold the lock"""
+        while len(self._entries) > max(self._max_size, 0):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+
+# global cache of hydrated movies
+_MOVIE_CACHE = _MovieCache(MOVIE_CACHE_SIZE, MOVIE_CACHE_TTL)
+
+
+def set_up_database(pool_size: int = POOL_SIZE, backend: Backend = None) -> None:
+    """Sets up the database. Unless a backend is passed in it's built from utilities/settings.py, which
+    only asks for the host, username, and password of the MySQL server if they aren't configured
 
-    host = "localhost" if host == "" else host
-    user = "root" if user == "" else user
+    Args:
+        pool_size - an int representing the max number of connections the app keeps open at once
+        backend - the Backend to store everything in, defaults to the configured one
+    """
+    global _POOL
+    global _BACKEND
+    global _WATCH_LOG
 
+    print("Let's make sure the database is set up correctly!")
+    # the first checkout opens a connection, so this also checks the credentials
     try:
-        _DB = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database="Betterboxd",
-        )
-
-    except mysql.connector.errors.Error as e:
+        if backend is None:
+            backend = settings.make_backend(settings.load())
+        if backend.max_connections is not None:
+            pool_size = min(pool_size, backend.max_connections)
+        backend.set_up()
+        _BACKEND = backend
+        # every pooled connection reports what it runs to the query counters
+        _POOL = ConnectionPool(lambda: instrumentation.instrument(backend.connect()), pool_size)
+        with connection() as db:
+            schema = backend.describe_schema(db)
+
+    except Exception as e:
         print(f"Ran into an error: {e}.")
         print(
             "Make sure you set the database up according to the README, and make sure you entered the correct host, username, and password for the database"
@@ -72,48 +358,144 @@ def set_up_database() -> None:
         print("Exiting.")
         sys.exit(1)
 
-    # simple sanity check if all tables are there
-    with _DB.cursor() as cursor:
-        cursor.execute("SHOW TABLES")
-        for x in cursor:
-            tables_in_db.append(x[0])
-
-    if tables_in_db != _TABLES:
-        for table in _TABLES:
-            if table not in tables_in_db:
-                print(
-                    f"Error: table {table} not found in the database. Are you sure you configured it correctly?"
-                )
-                print("Exiting")
-                sys.exit(1)
+    # the migrations build on the base tables, so those have to be there first
+    for table in _TABLES:
+        if table not in schema:
+            print(f"Error: table {table} not found in the database. Are you sure you configured it correctly?")
+            print("Exiting")
+            sys.exit(1)
+
+    # bring the schema up to date before anything queries it
+    with connection() as db:
+        applied = migrations.apply_pending(db, backend.dialect)
+        for name in applied:
+            print(f"Applied database migration {name}")
+        if applied:
+            schema = backend.describe_schema(db)
+    if problems := migrations.check_schema(schema):
+        for problem in problems:
+            print(f"Error: {problem} in the database. Are you sure you configured it correctly?")
+        print("Exiting")
+        sys.exit(1)
+
+    # movies from before the histogram migration, or loaded by a backend's own set up, have none yet
+    if backfilled := backfill_rating_histograms():
+        print(f"Backfilled rating histograms for {backfilled} movies")
+
+    _WATCH_LOG = WriteBehindBuffer(
+        _write_watch_logs,
+        WATCH_LOG_MAX_QUEUED,
+        WATCH_LOG_FLUSH_INTERVAL,
+        WATCH_LOG_BATCH_SIZE,
+        is_permanent=_is_bad_watch_log,
+    )
+
+    build_search_index()
 
 
 def disconnect_database() -> None:
     """Safely disconnects from database and clears globals"""
-    global _DB
+    global _POOL
+    global _BACKEND
     global _CURRENT_USER
+    global _SEARCH_INDEX
+    global _CREW_GRAPH
+    global _WATCH_LOG
 
     print("\nLogging out...")
-    if _DB is None:
+    # let running asyncio calls finish, and size the next worker pool to the next connection pool.
+    # Only if something used aio, importing it here would pull in asyncio
+    if (aio := sys.modules.get("utilities.aio")) is not None:
+        aio.close()
+    # write the logs still waiting in the buffer before the pool goes away
+    if _WATCH_LOG is not None:
+        try:
+            _WATCH_LOG.close()
+        except Exception as e:
+            print(f"Couldn't save {_WATCH_LOG.stats()['queued']} recent logs: {e}")
+        _WATCH_LOG = None
+    if instrumentation.DUMP_ON_DISCONNECT:
+        print(query_report())
+    if _POOL is None:
         print("\nThank you for visiting Betterbox! We hope you'll come back soon!")
         return
-    _DB.close()
-    _DB = None
+    _POOL.close()
+    _POOL = None
+    _BACKEND.close()
+    _BACKEND = None
     _CURRENT_USER = None
+    _SEARCH_INDEX = None
+    with _CREW_GRAPH_LOCK:
+        _CREW_GRAPH = None
+    _MOVIE_CACHE.clear()
     print("\nThank you for visiting Betterbox! We hope you'll come back soon!")
 
 
+def connection() -> ContextManager:
+    """Checks a connection out of the pool for the duration of a with block
+
+    Returns:
+        a context manager yielding a database connection
+    """
+    if _POOL is None:
+        raise RuntimeError("The database has not been set up, call set_up_database() first")
+    return _POOL.connection()
+
+
+def get_backend() -> Backend:
+    """Gets the storage backend the app is connected to, None before set_up_database()"""
+    return _BACKEND
+
+
+def pool_stats() -> Dict[str, float]:
+    """Gets the connection pool counters, including time spent waiting and how often it ran dry
+
+    Returns:
+        a dictionary of stats, or an empty dictionary if the database isn't set up
+    """
+    return {} if _POOL is None else _POOL.stats()
+
+
+def watch_log_stats() -> Dict[str, float]:
+    """Gets the write-behind buffer counters, like how many logs are waiting and how big the batches get
+
+    Returns:
+        a dictionary of stats, or an empty dictionary if the database isn't set up
+    """
+    return {} if _WATCH_LOG is None else _WATCH_LOG.stats()
+
+
+def query_stats() -> Dict[str, Dict[str, float]]:
+    """Gets the query counters of every function that has talked to the database
+
+    Returns:
+        a dictionary of function : {queries, total_ms, max_ms, rows} dictionaries
+    """
+    return instrumentation.STATS.snapshot()
+
+
+def query_report() -> str:
+    """Formats the query counters and the most recent slow queries for printing"""
+    return instrumentation.report()
+
+
+def reset_query_stats() -> None:
+    """Zeroes the query counters and forgets the recent slow queries"""
+    instrumentation.reset()
+
+
 def clear_terminal() -> None:
     """Convienience function, clears the terminal on Windows & Linux"""
     os.system("cls" if os.name == "nt" else "clear")
 
 
-def take_cli_input_with_options(options: List[Dict[str, callable]]) -> callable:
+def take_cli_input_with_options(options: List[Dict[str, callable]], hidden: Dict[str, callable] = None) -> callable:
     """Displays a list of otions then handles CLI input.
     Uses a standard system where options are stored as a list of dictionaries
 
     Args:
         options - a list containing dictionaries, where each key-value pair is a string and a function
+        hidden - a dictionary of typed command : function pairs that work but aren't listed
 
     Returns:
         the chosen function from the options list
@@ -122,7 +504,10 @@ def take_cli_input_with_options(options: List[Dict[str, callable]]) -> callable:
         for i, e in enumerate(options):
             print(f"{i + 1}. {list(e.keys())[0]}")
         try:
-            choice = int(input(f"Enter a number 1-{i + 1}: ")) - 1
+            choice = input(f"Enter a number 1-{i + 1}: ")
+            if hidden and choice.strip().lower() in hidden:
+                return hidden[choice.strip().lower()]
+            choice = int(choice) - 1
             if choice < 0:
                 raise ValueError
             else:
@@ -131,23 +516,32 @@ def take_cli_input_with_options(options: List[Dict[str, callable]]) -> callable:
             print("Unrecognized input, please try again")
 
 
-def set_current_user(username: str) -> None:
+def set_current_user(user: Union[User, str]) -> None:
     """Sets global current user, acts as a token for the session
 
     Args:
-        username - a str representing the username of the currently logged-in user
+        user - the User returned by authenticate() or add_to_users(), or a str username to load the account of
     """
     global _CURRENT_USER
 
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT * 
-               FROM Account 
-               WHERE account_name = %(username)s;""",
-            {"username": username.lower()},
-        )
-        db_username, fav, watch_count, password = cursor.fetchone()
-        _CURRENT_USER = User(db_username, password, fav)
+    _CURRENT_USER = user if isinstance(user, User) else get_user(user)
+
+
+def get_user(username: str) -> User:
+    """Loads any user's account, without logging them in
+
+    Args:
+        username - a str representing the username
+
+    Returns:
+        a User object, or None if there is no such user
+    """
+    with connection() as db:
+        rows = prepared.fetchall(db, "account by name", (username.lower(),))
+    if not rows:
+        return None
+    db_username, fav, watch_count, password = rows[0]
+    return User(db_username, password, fav)
 
 
 def get_current_user() -> User:
@@ -161,40 +555,83 @@ def delete_current_user() -> None:
     """
     global _CURRENT_USER
 
-    with _DB.cursor() as cursor:
+    # the user's queued logs have to land before their history can be deleted
+    flush_watch_log()
+    with connection() as db, db.cursor() as cursor:
         try:
+            db.start_transaction()
+            cursor.execute(
+                """DELETE FROM Watch_Log
+                   WHERE account_name = %(username)s;""",
+                {"username": _CURRENT_USER.get_username().lower()},
+            )
             cursor.execute(
                 """DELETE FROM Account 
                    WHERE account_name = %(username)s;""",
                 {"username": _CURRENT_USER.get_username().lower()},
             )
 
-            _DB.commit()
+            db.commit()
             _CURRENT_USER = None  # Clear current user
 
         except Exception as e:
-            _DB.rollback()
+            db.rollback()
             raise Exception(f"Account deletion failed: {str(e)}")
 
 
-def add_to_users(username: str, password: str) -> None:
-    """Add a user to the database
+def add_to_users(username: str, password: str) -> User:
+    """Add a user to the database.
+    There's no existence check first, the primary key rejects a taken username, so two people signing up
+    with the same name at once can't both get it
 
     Args:
         username - a str representing the queried username
         password - a str representing the entered password
+
+    Returns:
+        the new User, or None if the username is taken
     """
 
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """INSERT INTO Account(account_name, favorite_movie, watch_count, passphrase)
-            VALUES (%(username)s, 1, 0, %(password)s);""",
-            {
-                "username": username.lower(),
-                "password": password.lower(),
-            },
-        )
-        _DB.commit()
+    with connection() as db, db.cursor() as cursor:
+        try:
+            cursor.execute(
+                """INSERT INTO Account(account_name, favorite_movie, watch_count, passphrase)
+                VALUES (%(username)s, 1, 0, %(password)s);""",
+                {
+                    "username": username.lower(),
+                    "password": password.lower(),
+                },
+            )
+            db.commit()
+        except Exception as e:
+            if _BACKEND.is_integrity_error(e):
+                return None
+            raise
+    return User(username.lower(), password.lower(), 1)
+
+
+def authenticate(username: str, password: str) -> User:
+    """Checks a username and password and loads the account in one query, instead of
+    user_exists(), password_correct(), and get_user() one after another
+
+    Args:
+        username - a string representing the entered username
+        password - a HASHED string containing the entered password
+
+    Returns:
+        the User, or None if there is no such user or the password is wrong
+    """
+    if len(username) > MAX_USERNAME_LENGTH:
+        return None
+    with connection() as db:
+        rows = prepared.fetchall(db, "account by name", (username.lower(),))
+    if not rows:
+        return None
+    db_username, fav, watch_count, passphrase = rows[0]
+    # compare_digest takes as long for a wrong password as a right one
+    if passphrase is None or not hmac.compare_digest(passphrase.encode(), password.encode()):
+        return None
+    return User(db_username, passphrase, fav)
 
 
 def user_exists(username: str) -> bool:
@@ -206,15 +643,8 @@ def user_exists(username: str) -> bool:
     Returns:
         a bool representing if the user exists in the database
     """
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT COUNT(*) 
-               FROM Account 
-               WHERE account_name = %(username)s;""",
-            {"username": username.lower()},
-        )
-        result = cursor.fetchone()[0]
-        return result == 1
+    with connection() as db:
+        return len(prepared.fetchall(db, "account by name", (username.lower(),))) == 1
 
 
 def password_correct(username: str, password: str) -> bool:
@@ -228,15 +658,9 @@ def password_correct(username: str, password: str) -> bool:
     Returns:
         a bool representing if the password is correct
     """
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT passphrase 
-               FROM Account 
-               WHERE account_name = %(username)s;""",
-            {"username": username.lower()},
-        )
-        result = cursor.fetchone()[0]
-        return result == password
+    with connection() as db:
+        rows = prepared.fetchall(db, "account by name", (username.lower(),))
+    return bool(rows) and rows[0][3] == password
 
 
 def update_password(password):
@@ -246,7 +670,7 @@ def update_password(password):
     Args:
         password - a  HASHED string containing the new password.
     """
-    with _DB.cursor() as cursor:
+    with connection() as db, db.cursor() as cursor:
         try:
             cursor.execute(
                 """UPDATE Account 
@@ -258,10 +682,10 @@ def update_password(password):
                 },
             )
 
-            _DB.commit()
+            db.commit()
             _CURRENT_USER.set_password(password=password)
         except Exception as e:
-            _DB.rollback()
+            db.rollback()
             raise Exception(f"Password update failed: {str(e)}")
 
 
@@ -271,7 +695,7 @@ def update_favorite_movie(movie_id: int):
     Args:
         movie_id - the Integer ID for the Movie being set as Favorite Movie
     """
-    with _DB.cursor() as cursor:
+    with connection() as db, db.cursor() as cursor:
         try:
             cursor.execute(
                 """UPDATE Account 
@@ -283,10 +707,10 @@ def update_favorite_movie(movie_id: int):
                 },
             )
 
-            _DB.commit()
+            db.commit()
             _CURRENT_USER.set_fav_movie_id(movie_id)
         except Exception as e:
-            _DB.rollback()
+            db.rollback()
             raise Exception(f"Movie update failed: {str(e)}")
 
 
@@ -299,19 +723,46 @@ def search_for_movie_by_title_exact(title: str) -> int:
     Returns:
         an int indicating the movie ID if a matching title was found, else None
     """
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT movie_ID 
-               FROM Movie 
-               WHERE movie_title = %(title)s;""",
-            {"title": title.lower()},
-        )
-        result = cursor.fetchall()
+    with connection() as db:
+        result = prepared.fetchall(db, "movie by title", (title.lower(),))
     if result == []:
         return []
     return result[0][0]
 
 
+def configure_movie_cache(max_size: int, ttl: float = None) -> None:
+    """Sets the size and TTL of the movie cache
+
+    Args:
+        max_size - an int representing the max number of movies to keep, 0 disables caching
+        ttl - a float representing how many seconds an entry stays valid, None to never expire
+    """
+    _MOVIE_CACHE.configure(max_size, ttl)
+
+
+def movie_cache_stats() -> Dict[str, int]:
+    """Gets the hit, miss and eviction counters of the movie cache
+
+    Returns:
+        a dictionary with size, max_size, hits, misses and evictions
+    """
+    return _MOVIE_CACHE.stats()
+
+
+def invalidate_movie(movie_id: int) -> None:
+    """Drops a movie from the movie cache so the next lookup reloads it from the database
+
+    Args:
+        movie_id - an int representing the ID of a movie
+    """
+    _MOVIE_CACHE.invalidate(movie_id)
+
+
+def clear_movie_cache() -> None:
+    """Empties the movie cache and resets its counters"""
+    _MOVIE_CACHE.clear()
+
+
 def search_for_movie_by_id(id: int) -> Movie:
     """Return a movie given its id
 
@@ -321,164 +772,393 @@ def search_for_movie_by_id(id: int) -> Movie:
     Returns:
         a Movie object if the movie was found, else None
     """
-    result = None
-    songs = []
-    crew_ids = []
-    crew = {}
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT * 
-               FROM Movie 
-               WHERE movie_ID = %(id)s;""",
-            {"id": id},
-        )
-        result = cursor.fetchone()
-        if result is None:
-            return None
+    return hydrate_movies([id])[0]
 
-    # there was a result
-    movie_id, runtime, rating, num_ratings, title, score_id = result
-    mov = Movie(movie_id, title, runtime, rating, num_ratings)
 
-    # search for score
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT song 
-               FROM Score_Songs
-               WHERE score_ID = %(score_id)s;""",
-            {"score_id": score_id},
-        )
-        result = cursor.fetchall()
-    for tup in result:
-        songs.append(tup[0])
-    mov.set_score(score_id, songs)
+def hydrate_movies(ids: List[int]) -> List[Movie]:
+    """Loads any number of movies with a constant number of queries per chunk of ids
+    Movies in the movie cache are served from memory. Builds the full Movie (score in track order, crew with all of their jobs, composer)
 
-    # search for crew ids
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT crew_ID
-               FROM Crew_Movie
-               WHERE movie_ID = %(id)s;""",
-            {"id": id},
-        )
-        result = cursor.fetchall()
-    for tup in result:
-        crew_ids.append(tup[0])
+    Args:
+        ids - a list of ints representing the ids of movies in the database
 
-    # append composers to crew ids
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT crew_ID
-            FROM Score
-            WHERE score_ID = %(score_id)s;""",
-            {"score_id": score_id},
-        )
-        result = cursor.fetchall()
-        for id in result:
-            crew_ids.append(id[0])
-
-    # search for crew names
-    tmp_crew = {}
-    for crew_id in crew_ids:
-        with _DB.cursor() as cursor:
+    Returns:
+        a list of Movie objects in the same order as ids, with None where a movie wasn't found
+    """
+    movies = {}
+    misses = []
+    for id in dict.fromkeys(ids):
+        if (mov := _MOVIE_CACHE.get(id)) is not None:
+            movies[id] = mov
+        else:
+            misses.append(id)
+
+    if misses:
+        with connection() as db:
+            for i in range(0, len(misses), HYDRATE_CHUNK_SIZE):
+                for id, mov in _hydrate_chunk(db, misses[i : i + HYDRATE_CHUNK_SIZE]).items():
+                    _MOVIE_CACHE.put(id, mov)
+                    movies[id] = mov
+    return [movies.get(id) for id in ids]
+
+
+def _hydrate_chunk(db, ids: List[int]) -> Dict[int, Movie]:
+    """Hydrates one chunk of movies using four set-based queries
+
+    Args:
+        db - a database connection checked out of the pool
+        ids - a list of ints representing the ids of movies in the database
+
+    Returns:
+        a dictionary of movie_ID : Movie pairs for every id that was found
+    """
+    movies = {}
+    result = prepared.fetchall(db, "movies by id", ids=ids)
+    if result == []:
+        return movies
+
+    for movie_id, runtime, rating, num_ratings, title, score_id in result:
+        movies[movie_id] = Movie(movie_id, title, runtime, rating, num_ratings, score_id)
+    _fill_details(db, movies)
+    return movies
+
+
+def _fill_details(db, movies: Dict[int, Movie]) -> None:
+    """Loads the score, crew, and rating histogram of a chunk of movies using three set-based queries
+
+    Args:
+        db - a database connection checked out of the pool
+        movies - a dictionary of movie_ID : Movie pairs, their score, crew, and histogram are overwritten
+    """
+    songs = {}
+    crews = {}
+    histograms = {}
+    ids = list(movies)
+    score_ids = {mov.get_score_id() for mov in movies.values() if mov.get_score_id() is not None}
+
+    # search for every score, songs come back in track order
+    if score_ids:
+        for score_id, song in prepared.fetchall(db, "songs by score", ids=sorted(score_ids)):
+            songs.setdefault(score_id, []).append(song)
+
+    # search for crew (including composers) with every job they have in one query
+    for movie_id, crew_name, job in prepared.fetchall(db, "crew by movie", ids=ids):
+        jobs = crews.setdefault(movie_id, {}).setdefault(crew_name, [])
+        if job is not None and job not in jobs:
+            jobs.append(job)
+
+    for movie_id, bucket, count in prepared.fetchall(db, "histogram by movie", ids=ids):
+        histograms.setdefault(movie_id, [0] * BUCKETS)[bucket] = count
+
+    for movie_id, mov in movies.items():
+        mov.set_score(mov.get_score_id(), songs.get(mov.get_score_id(), []))
+        mov.set_histogram(RatingHistogram(histograms.get(movie_id)))
+        mov.set_crew(crews.get(movie_id, {}))
+
+
+def summarize_movies(ids: List[int]) -> List[Movie]:
+    """Loads movies without their crew and score, for list views, in one query per chunk of ids.
+    Movies in the movie cache are served from memory fully loaded, the rest load their crew and score on first use
+
+    Args:
+        ids - a list of ints representing the ids of movies in the database
+
+    Returns:
+        a list of Movie objects in the same order as ids, with None where a movie wasn't found
+    """
+    movies = {}
+    misses = []
+    for id in dict.fromkeys(ids):
+        if (mov := _MOVIE_CACHE.get(id)) is not None:
+            movies[id] = mov
+        else:
+            misses.append(id)
+
+    if misses:
+        with connection() as db:
+            for i in range(0, len(misses), HYDRATE_CHUNK_SIZE):
+                chunk = misses[i : i + HYDRATE_CHUNK_SIZE]
+                for movie_id, runtime, rating, num_ratings, title, score_id in prepared.fetchall(
+                    db, "movies by id", ids=chunk
+                ):
+                    movies[movie_id] = Movie.summary(movie_id, title, runtime, rating, num_ratings, score_id)
+    return [movies.get(id) for id in ids]
+
+
+def load_movie_details(movies: List[Movie]) -> None:
+    """Loads the crew, score, and histogram of every summary movie given, three queries per chunk no matter how many there are.
+    Movies that are already loaded are skipped, loaded movies go into the movie cache
+
+    Args:
+        movies - a list of Movie objects, usually from summarize_movies
+    """
+    pending = {mov.get_id(): mov for mov in movies if mov is not None and not mov.is_loaded()}
+    if not pending:
+        return
+    ids = list(pending)
+    with connection() as db:
+        for i in range(0, len(ids), HYDRATE_CHUNK_SIZE):
+            chunk = {id: pending[id] for id in ids[i : i + HYDRATE_CHUNK_SIZE]}
+            _fill_details(db, chunk)
+            for id, mov in chunk.items():
+                _MOVIE_CACHE.put(id, mov)
+
+
+def _unique_ids(rows: List[tuple]) -> List[int]:
+    """Flattens query rows into a list of movie IDs, dropping duplicates but keeping order
+
+    Args:
+        rows - a list of tuples whose first element is a movie ID
+
+    Returns:
+        a list of unique movie IDs in the order they first appeared
+    """
+    return list(dict.fromkeys(row[0] for row in rows))
+
+
+def build_search_index() -> None:
+    """Loads every title, crew name, and song into the in-memory trigram index used by the inexact searches.
+    Called at startup, add_movie_to_database keeps it in sync afterwards
+    """
+    global _SEARCH_INDEX
+    global _SEARCH_INDEX_SYNCED_ID
+    index = CatalogIndex()
+    synced_id = 0
+
+    with connection() as db:
+        with db.cursor() as cursor:
+            cursor.execute("SELECT movie_ID, movie_title, score_ID FROM Movie;")
+            for movie_id, title, score_id in cursor.fetchall():
+                index.add_movie(movie_id, title or "", score_id)
+                synced_id = max(synced_id, movie_id)
+
+        with db.cursor() as cursor:
+            cursor.execute("SELECT crew_ID, crew_name FROM Crew;")
+            for crew_id, name in cursor.fetchall():
+                index.add_crew(crew_id, name or "")
+
+        with db.cursor() as cursor:
+            cursor.execute("SELECT movie_ID, crew_ID FROM Crew_Movie ORDER BY movie_ID;")
+            credits = {}
+            for movie_id, crew_id in cursor.fetchall():
+                credits.setdefault(movie_id, []).append(crew_id)
+        for movie_id, crew_ids in credits.items():
+            index.add_credits(movie_id, crew_ids)
+
+        with db.cursor() as cursor:
             cursor.execute(
-                """SELECT crew_name
-                FROM Crew
-                WHERE crew_ID = %(crew_id)s;""",
-                {"crew_id": crew_id},
+                """SELECT score_ID, song
+                   FROM Score_Songs
+                   ORDER BY score_ID, CAST(track_number AS UNSIGNED);"""
+            )
+            songs = {}
+            for score_id, song in cursor.fetchall():
+                songs.setdefault(score_id, []).append(song or "")
+        for score_id, tracks in songs.items():
+            index.add_songs(score_id, tracks)
+
+    _SEARCH_INDEX = index
+    _SEARCH_INDEX_SYNCED_ID = synced_id
+
+
+@contextmanager
+def search_index_disabled() -> Iterator[None]:
+    """Switches the search index off for the duration of a with block, so the inexact searches take the
+    LIKE_SEARCHES fallback. For measuring the fallback, the index is back once the block exits
+    """
+    global _SEARCH_INDEX
+    index, _SEARCH_INDEX = _SEARCH_INDEX, None
+    try:
+        yield
+    finally:
+        _SEARCH_INDEX = index
+
+
+def index_movie(
+    movie_id: int,
+    title: str,
+    score_id: int,
+    new_crew: Dict[int, str],
+    crew_ids: List[int],
+    songs: List[str],
+) -> None:
+    """Adds a freshly written movie to the search index and the crew graph, skipping either if it isn't built
+
+    Args:
+        movie_id - an int representing the ID of the new movie
+        title - a string containing the movie title
+        score_id - an int representing the ID of the movie's score
+        new_crew - a dictionary of crew_ID : crew_name pairs for crew members that didn't exist before
+        crew_ids - the IDs of every crew member credited on the movie
+        songs - a list of song titles on the score
+    """
+    # waits out a build in progress, which may have read Crew_Movie before this movie was committed
+    with _CREW_GRAPH_LOCK:
+        if _CREW_GRAPH is not None:
+            _CREW_GRAPH.add_movie(movie_id, crew_ids)
+    if _SEARCH_INDEX is None:
+        return
+    _SEARCH_INDEX.add_movie(movie_id, title, score_id)
+    for crew_id, crew_name in new_crew.items():
+        _SEARCH_INDEX.add_crew(crew_id, crew_name)
+    _SEARCH_INDEX.add_credits(movie_id, crew_ids)
+    _SEARCH_INDEX.add_songs(score_id, songs)
+
+
+def _sync_search_index() -> None:
+    """Indexes the movies added since the search index last read Movie. index_movie only sees movies this
+    process adds, this picks up the ones other processes add (another CLI, the service, an import).
+    Costs one range query on Movie's primary key when there are none.
+    AUTO_INCREMENT IDs aren't committed in order, so a movie committed after one with a higher ID was already
+    indexed is missed until the index is rebuilt
+    """
+    global _SEARCH_INDEX_SYNCED_ID
+    index = _SEARCH_INDEX
+    synced_id = _SEARCH_INDEX_SYNCED_ID
+    with connection() as db:
+        movies = prepared.fetchall(db, "movies after id", (synced_id,))
+        if not movies:
+            return
+        last_id = movies[-1][0]
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT cm.movie_ID, c.crew_ID, c.crew_name
+                   FROM Crew_Movie cm
+                   JOIN Crew c ON c.crew_ID = cm.crew_ID
+                   WHERE cm.movie_ID > %s AND cm.movie_ID <= %s;""",
+                (synced_id, last_id),
             )
-            result = cursor.fetchall()[0][0]
-            tmp_crew[result] = crew_id
+            credits = cursor.fetchall()
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT score_ID, song
+                   FROM Score_Songs
+                   WHERE score_ID IN (
+                       SELECT score_ID
+                       FROM Movie
+                       WHERE movie_ID > %s AND movie_ID <= %s)
+                   ORDER BY score_ID, CAST(track_number AS UNSIGNED);""",
+                (synced_id, last_id),
+            )
+            songs = {}
+            for score_id, song in cursor.fetchall():
+                songs.setdefault(score_id, []).append(song or "")
+
+    crew_ids = {}
+    for movie_id, crew_id, crew_name in credits:
+        index.add_crew(crew_id, crew_name or "")
+        crew_ids.setdefault(movie_id, []).append(crew_id)
+    # every write replaces what was indexed before, so a movie index_movie already added is indexed again harmlessly
+    for movie_id, title, score_id in movies:
+        index.add_movie(movie_id, title or "", score_id)
+        index.add_credits(movie_id, crew_ids.get(movie_id, []))
+    for score_id, tracks in songs.items():
+        index.add_songs(score_id, tracks)
+    _SEARCH_INDEX_SYNCED_ID = max(_SEARCH_INDEX_SYNCED_ID, last_id)
+
+
+def _search_ids_page(kind: str, term: str, after_id: int, limit: int) -> List[int]:
+    """Finds one page of matching movie IDs, from the search index if it's built, else with a LIKE '%term%' scan
+
+    Args:
+        kind - a string, one of "title", "crew", or "score"
+        term - a string we are filtering by
+        after_id - an int representing the last movie ID of the previous page, 0 for the first page
+        limit - an int representing the max number of IDs to return
 
-    # get crew jobs
-    for crew_name, crew_id in tmp_crew.items():
-        with _DB.cursor() as cursor:
+    Returns:
+        a list of unique movie IDs greater than after_id, in ascending order
+    """
+    if _SEARCH_INDEX is None:
+        with connection() as db, db.cursor() as cursor:
             cursor.execute(
-                """SELECT job
-                FROM Crew_Job
-                WHERE crew_ID = %(crew_id)s;""",
-                {"crew_id": crew_id},
+                LIKE_SEARCHES[kind],
+                {"term": f"%{term.lower()}%", "after_id": after_id, "limit": limit},
             )
-            result = cursor.fetchall()[0]
-            tmp = []
-            for job in result:
-                tmp.append(job)
-            crew[crew_name] = tmp
+            return _unique_ids(cursor.fetchall())
 
-    mov.set_crew(crew)
-    return mov
+    _sync_search_index()
+    return _SEARCH_INDEX.search_page(kind, term, after_id, limit)
 
 
-def search_by_title_inexact(term: str) -> List[Movie]:
-    """Returns search results that include the term in the move title (inexact match)
+def search_ids_page(kind: str, term: str, after_id: int = 0, page_size: int = PAGE_SIZE) -> Tuple[List[int], int]:
+    """Returns one page of search results as movie IDs, for callers that load the movies themselves
+
     Args:
+        kind - a string, one of "title", "crew", or "score"
         term - a string we are filtering by
+        after_id - an int representing the last movie ID of the previous page, 0 for the first page
+        page_size - an int representing the max number of IDs on the page
 
     Returns:
-        a list of Movie objects that have the search term in the title, may be None
+        a tuple of (list of movie IDs in ascending order, after_id of the next page or None if this is the last page)
     """
-    results = []
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT movie_ID 
-               FROM Movie 
-               WHERE movie_title LIKE %(term)s;""",
-            {"term": f"%{term.lower()}%"},
-        )
-        results = cursor.fetchall()
-    if results == []:
-        return []
+    # one extra ID tells us if there is a next page without hydrating it
+    ids = _search_ids_page(kind, term, after_id, page_size + 1)
+    return ids[:page_size], ids[page_size - 1] if len(ids) > page_size else None
 
-    # flatten into list of IDs
-    tmp = []
-    for tup in results:
-        tmp.append(tup[0])
-    results = tmp
 
-    # turn list of IDs into list of movies
-    tmp = []
-    for id in results:
-        tmp.append(search_for_movie_by_id(id))
+def search_page(
+    kind: str, term: str, after_id: int = 0, page_size: int = PAGE_SIZE, summary: bool = False
+) -> Tuple[List[Movie], int]:
+    """Returns one page of search results, only the movies on that page are hydrated.
+    Pages are keyed by the last movie ID seen, so a page costs the same no matter how deep it is
+
+    Args:
+        kind - a string, one of "title", "crew", or "score"
+        term - a string we are filtering by
+        after_id - an int representing the last movie ID of the previous page, 0 for the first page
+        page_size - an int representing the max number of movies on the page
+        summary - a bool representing if the movies are summaries, see summarize_movies
 
-    return tmp
+    Returns:
+        a tuple of (list of Movie objects in ID order, after_id of the next page or None if this is the last page)
+    """
+    ids, next_after_id = search_ids_page(kind, term, after_id, page_size)
+    load = summarize_movies if summary else hydrate_movies
+    return [m for m in load(ids) if m is not None], next_after_id
 
 
-def search_by_crew_inexact(term: str) -> List[Movie]:
-    """Returns search results that include the term in the crew field
+def iter_search(kind: str, term: str, page_size: int = PAGE_SIZE, summary: bool = False) -> Iterator[List[Movie]]:
+    """Lazily pages through every search result, fetching the next page only when it's asked for
 
+    Args:
+        kind - a string, one of "title", "crew", or "score"
+        term - a string we are filtering by
+        page_size - an int representing the max number of movies per page
+        summary - a bool representing if the movies are summaries, see summarize_movies
+
+    Yields:
+        lists of Movie objects in ID order, one page at a time
+    """
+    after_id = 0
+    while after_id is not None:
+        movies, after_id = search_page(kind, term, after_id, page_size, summary)
+        if movies:
+            yield movies
+
+
+def search_by_title_inexact(term: str) -> List[Movie]:
+    """Returns search results that include the term in the move title (inexact match)
     Args:
         term - a string we are filtering by
 
     Returns:
-        a list of Movie objects that have the search term in the crew field, may be None
+        a list of Movie objects that have the search term in the title, may be None
     """
-    results = []
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT movie_ID
-               FROM Crew_Movie
-               WHERE crew_ID IN (
-	            SELECT crew_ID
-	            FROM Crew
-	            WHERE crew_name LIKE %(term)s);""",
-            {"term": f"%{term.lower()}%"},
-        )
-        results = cursor.fetchall()
-    if results == []:
-        return []
+    return [m for page in iter_search("title", term, HYDRATE_CHUNK_SIZE) for m in page]
 
-    # flatten into list of IDs
-    tmp = []
-    for tup in results:
-        tmp.append(tup[0])
-    results = tmp
 
-    # turn list of IDs into list of movies
-    tmp = []
-    for id in results:
-        tmp.append(search_for_movie_by_id(id))
+def search_by_crew_inexact(term: str) -> List[Movie]:
+    """Returns search results that include the term in the crew field
 
-    return tmp
+    Args:
+        term - a string we are filtering by
+
+    Returns:
+        a list of Movie objects that have the search term in the crew field, may be None
+    """
+    return [m for page in iter_search("crew", term, HYDRATE_CHUNK_SIZE) for m in page]
 
 
 def search_by_score_inexact(term: str) -> List[Movie]:
@@ -490,70 +1170,352 @@ def search_by_score_inexact(term: str) -> List[Movie]:
     Returns:
         a list of Movie objects that have the search term in a song in the score field, may be None
     """
-    results = []
-    with _DB.cursor() as cursor:
+    return [m for page in iter_search("score", term, HYDRATE_CHUNK_SIZE) for m in page]
+
+
+def add_log(movie_id: int, rating: float, username: str = None) -> None:
+    """Logs a movie for a user
+    Does not do any error checking. The log is queued in a write-behind buffer and add_log returns right away,
+    a background thread writes everything queued in one transaction every WATCH_LOG_FLUSH_INTERVAL seconds.
+    The movie's rating includes the log once it's flushed, call flush_watch_log() to write it sooner
+
+    Args:
+        movie_id - an int representing the id of the movie we want
+        rating - a float representing the rating given
+        username - a string representing who logged it, defaults to the current user, None if nobody is logged in
+    """
+    if username is None and _CURRENT_USER is not None:
+        username = _CURRENT_USER.get_username()
+    logged_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")
+    _WATCH_LOG.add((username.lower() if username else None, movie_id, rating, logged_at))
+
+
+def flush_watch_log() -> int:
+    """Writes every log waiting in the write-behind buffer now instead of at the next interval
+
+    Returns:
+        an int representing how many logs were written
+    """
+    return 0 if _WATCH_LOG is None else _WATCH_LOG.flush()
+
+
+def _write_watch_logs(entries: List[Tuple[str, int, float, str]]) -> None:
+    """Writes a batch of logs from the write-behind buffer as one transaction with a fixed number of statements.
+    Appends them to Watch_Log, then per movie bumps the running sum and count in one atomic UPDATE (so
+    concurrent writers never overwrite each other) along with its Top-Rated score, bumps the histogram
+    buckets, and adds to each account's watch count
+
+    Args:
+        entries - a list of (username, movie_ID, rating, logged_at) tuples, username may be None
+    """
+    totals = {}
+    buckets = Counter()
+    watched = Counter()
+    for username, movie_id, rating, _ in entries:
+        total = totals.setdefault(movie_id, [0.0, 0])
+        total[0] += rating
+        total[1] += 1
+        buckets[(movie_id, bucket_of(rating))] += 1
+        if username is not None:
+            watched[username] += 1
+
+    with connection() as db:
+        db.start_transaction()
+        with db.cursor() as cursor:
+            cursor.executemany(
+                """INSERT INTO Watch_Log(account_name, movie_ID, rating, logged_at)
+                   VALUES (%s, %s, %s, %s);""",
+                entries,
+            )
+            # rows are updated in key order, so concurrent writers always lock them in the same order
+            prepared.executemany(
+                db,
+                "rate movie",
+                [
+                    (rating_sum, count, rating_sum, count, movie_id)
+                    for movie_id, (rating_sum, count) in sorted(totals.items())
+                ],
+            )
+            cursor.executemany(
+                """UPDATE Rating_Histogram
+                   SET num_ratings = num_ratings + %(count)s
+                   WHERE movie_ID = %(movie_id)s AND bucket = %(bucket)s;""",
+                [
+                    {"count": count, "movie_id": movie_id, "bucket": bucket}
+                    for (movie_id, bucket), count in sorted(buckets.items())
+                ],
+            )
+            if watched:
+                cursor.executemany(
+                    """UPDATE Account
+                       SET watch_count = watch_count + %(count)s
+                       WHERE account_name = %(username)s;""",
+                    [{"count": count, "username": username} for username, count in sorted(watched.items())],
+                )
+        db.commit()
+    for movie_id in totals:
+        _MOVIE_CACHE.invalidate(movie_id)
+
+
+def _is_bad_watch_log(error: BaseException) -> bool:
+    """Checks if a failed watch log flush was caused by a log itself, like a deleted movie or account, or a
+    rating that isn't a number. Those are split out of the batch instead of retried forever
+
+    Args:
+        error - the exception _write_watch_logs raised
+
+    Returns:
+        a bool, False for anything that may go away on a retry
+    """
+    return isinstance(error, (TypeError, ValueError)) or _BACKEND.is_data_error(error)
+
+
+def get_watch_history(username: str, limit: int = PAGE_SIZE) -> List[Tuple[Movie, float, str]]:
+    """Gets a user's most recent logs. Logs still in the write-behind buffer show up once they're flushed
+
+    Args:
+        username - a string representing the user
+        limit - an int representing the max number of logs to return
+
+    Returns:
+        a list of (summary Movie, rating, when it was logged) tuples, newest first
+    """
+    with connection() as db:
+        logs = prepared.fetchall(db, "watch history", (username.lower(), limit))
+    movies = summarize_movies([movie_id for movie_id, _, _ in logs])
+    return [(mov, rating, str(logged_at)) for mov, (_, rating, logged_at) in zip(movies, logs) if mov is not None]
+
+
+def top_rated_movies(limit: int = TOP_RATED_SIZE) -> List[Tuple[Movie, float]]:
+    """Returns the best movies by their Bayesian-weighted score, read straight off the top_score index
+    so it costs the same no matter how many movies there are. Movies with few ratings are pulled
+    towards the mean of every rating, so one 5 star log doesn't put a movie on top
+
+    Args:
+        limit - an int representing the max number of movies to return
+
+    Returns:
+        a list of (summary Movie, weighted score) tuples, best first
+    """
+    with connection() as db:
+        ranking = prepared.fetchall(db, "top rated", (limit,))
+    movies = summarize_movies([movie_id for movie_id, _ in ranking])
+    return [(mov, score) for mov, (_, score) in zip(movies, ranking) if mov is not None]
+
+
+def _crew_graph():
+    """Gets the movie x crew graph, loading every credit into it the first time
+
+    Returns:
+        a CrewGraph, or None if numpy isn't installed
+    """
+    global _CREW_GRAPH
+
+    with _CREW_GRAPH_LOCK:
+        if _CREW_GRAPH is None:
+            try:
+                # numpy takes longer to import than the rest of the app, so only pay for it once it's used
+                from utilities.crew_graph import CrewGraph
+            except ImportError:
+                return None
+            with connection() as db, db.cursor() as cursor:
+                cursor.execute("SELECT movie_ID, crew_ID FROM Crew_Movie;")
+                _CREW_GRAPH = CrewGraph(cursor.fetchall())
+        return _CREW_GRAPH
+
+
+def similar_movies(movie_id: int, limit: int = SIMILAR_SIZE) -> List[Tuple[Movie, float]]:
+    """Returns the movies sharing the most crew with a movie. Every shared crew member is weighted by
+    how few movies they worked on, so a shared director counts for more than a shared extra.
+    The first call loads every credit into memory, add_movie_to_database keeps it up to date afterwards
+
+    Args:
+        movie_id - an int representing the ID of the movie
+        limit - an int representing the max number of movies to return
+
+    Returns:
+        a list of (summary Movie, similarity score) tuples, most similar first,
+        empty if the movie has no credits or numpy isn't installed
+    """
+    graph = _crew_graph()
+    if graph is None:
+        return []
+    ranking = graph.similar_movies(movie_id, limit)
+    movies = summarize_movies([similar_id for similar_id, _ in ranking])
+    return [(mov, score) for mov, (_, score) in zip(movies, ranking) if mov is not None]
+
+
+def search_for_crew_by_name_exact(name: str) -> int:
+    """Returns the ID of the crew member with the exact name, matched case-insensitively
+
+    Args:
+        name - a string representing the name of a crew member
+
+    Returns:
+        an int indicating the crew ID if a matching name was found, else None
+    """
+    with connection() as db:
+        result = prepared.fetchall(db, "crew by name", (name,))
+    return result[0][0] if result else None
+
+
+def _crew_names(ids: List[int]) -> Dict[int, str]:
+    """Looks up the names of crew members
+
+    Args:
+        ids - a list of crew IDs
+
+    Returns:
+        a dictionary of crew_ID : crew_name pairs, leaving out IDs that don't exist
+    """
+    if not ids:
+        return {}
+    with connection() as db, db.cursor() as cursor:
         cursor.execute(
-            """SELECT movie_ID
-                FROM Movie
-                WHERE score_ID IN (
-                    SELECT score_ID
-                    FROM Score_Songs
-                    WHERE LOWER(song) LIKE %(term)s
-                )""",
-            {"term": f"%{term.lower()}%"},
+            f"""SELECT crew_ID, crew_name
+                FROM Crew
+                WHERE crew_ID IN ({", ".join(["%s"] * len(ids))});""",
+            tuple(ids),
         )
-        results = cursor.fetchall()
+        return dict(cursor.fetchall())
 
-    if not results:
-        return []
 
-    # Convert list of tuples to list of IDs
-    movie_ids = [row[0] for row in results]
+def top_collaborators(crew_id: int, limit: int = COLLABORATORS_SIZE) -> List[Tuple[int, str, int]]:
+    """Returns the people who worked on the most movies with a crew member.
+    Joins Crew_Movie with itself rather than asking the crew graph, so it needs neither numpy nor the graph's
+    build. benchmarks/crew_connections.py has the self-join as fast as the graph for most people up to a
+    million credits, only people in hundreds of movies are faster on the graph, about 4x at a million credits
 
-    # Fetch full movie objects
-    return [search_for_movie_by_id(mid) for mid in movie_ids]
+    Args:
+        crew_id - an int representing the ID of the crew member
+        limit - an int representing the max number of people to return
 
+    Returns:
+        a list of (crew ID, crew name, movies together) tuples, most movies first and ties in ID order,
+        empty if they have no credits
+    """
+    if limit < 1:
+        return []
+    with connection() as db:
+        return [
+            (other, name, int(together))
+            for other, name, together in prepared.fetchall(db, "collaborators", (crew_id, crew_id, limit))
+        ]
 
-def add_log(movie_id: int, rating: float) -> None:
-    """Adds a log to a movie in the database
-    Does not do any error checking
+
+def crew_connection(from_crew: int, to_crew: int) -> List[Tuple[str, Movie, str]]:
+    """Finds how two crew members are connected through the fewest movies, like Six Degrees.
+    Each link is a movie both people on either side of it worked on
 
     Args:
-        movie_id - an int representing the id of the movie we want
-        rating - a float representing the rating given
+        from_crew - an int representing the ID of the crew member to start from
+        to_crew - an int representing the ID of the crew member to end at
+
+    Returns:
+        a list of (crew name, summary Movie, crew name) links from from_crew to to_crew, empty if they're
+        the same person, None if they aren't connected within crew_graph.MAX_HOPS movies or numpy isn't installed
+    """
+    graph = _crew_graph()
+    if graph is None:
+        return None
+    path = graph.shortest_path(from_crew, to_crew)
+    if not path:
+        return None
+    names = _crew_names(path[::2])
+    movies = summarize_movies(path[1::2])
+    return [(names.get(path[i]), movies[i // 2], names.get(path[i + 2])) for i in range(0, len(path) - 1, 2)]
+
+
+def rebuild_top_rated() -> Dict[str, float]:
+    """Recomputes the prior of the Top-Rated ranking from every rating so far, then rescores every movie.
+    add_log keeps the ranking up to date on its own, this is only needed once the mean rating has drifted,
+    like after a big import. It rewrites every movie, so don't call it per request
+
+    Returns:
+        a dictionary with the new prior_mean and prior_weight
     """
-    current_rating = num_ratings = 0
+    with connection() as db:
+        db.start_transaction()
+        with db.cursor() as cursor:
+            cursor.execute(
+                """SELECT COALESCE(SUM(rating_sum) / NULLIF(SUM(num_ratings), 0), 0), COALESCE(AVG(num_ratings), 0)
+                   FROM Movie;"""
+            )
+            prior_mean, prior_weight = cursor.fetchone()
+            cursor.execute(
+                """UPDATE Rating_Prior
+                   SET prior_mean = %(prior_mean)s, prior_weight = %(prior_weight)s
+                   WHERE prior_ID = 1;""",
+                {"prior_mean": float(prior_mean), "prior_weight": float(prior_weight)},
+            )
+            cursor.execute(
+                f"""UPDATE Movie
+                   SET top_score = {TOP_SCORE.format(rating_sum="Movie.rating_sum", num_ratings="Movie.num_ratings")};"""
+            )
+        db.commit()
+    return {"prior_mean": float(prior_mean), "prior_weight": float(prior_weight)}
+
+
+def get_rating_histogram(movie_id: int) -> RatingHistogram:
+    """Reads the rating distribution of a movie, 11 rows off the primary key no matter how many ratings it has
 
-    with _DB.cursor() as cursor:
+    Args:
+        movie_id - an int representing the ID of a movie in the database
+
+    Returns:
+        a RatingHistogram, with every bucket empty if the movie has no ratings or doesn't exist
+    """
+    with connection() as db, db.cursor() as cursor:
         cursor.execute(
-            """SELECT average_rating, num_ratings
-            FROM movie
-            WHERE movie_ID = %(movie_id)s""",
+            """SELECT bucket, num_ratings
+               FROM Rating_Histogram
+               WHERE movie_ID = %(movie_id)s;""",
             {"movie_id": movie_id},
         )
-        current_rating, num_ratings = cursor.fetchall()[0]
+        counts = [0] * BUCKETS
+        for bucket, count in cursor.fetchall():
+            counts[bucket] = count
+    return RatingHistogram(counts)
 
-    total_score = current_rating * num_ratings
-    new_total_score = total_score + rating
-    num_ratings += 1
-    new_average_rating = round(new_total_score / num_ratings, 2)
 
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """UPDATE Movie
-            SET average_rating = %(new_average_rating)s, num_ratings = %(num_ratings)s 
-            WHERE movie_ID = %(movie_id)s""",
-            {
-                "new_average_rating": new_average_rating,
-                "num_ratings": num_ratings,
-                "movie_id": movie_id,
-            },
-        )
-        _DB.commit()
+def backfill_rating_histograms() -> int:
+    """Gives every movie without a rating histogram one built from its average and number of ratings.
+    The individual ratings were never stored, so each movie's ratings go in the two half-star buckets
+    either side of its average, which keeps the count and the average. Safe to run again, movies that
+    already have a histogram are left alone
+
+    Returns:
+        an int representing how many movies were backfilled
+    """
+    with connection() as db:
+        db.start_transaction()
+        with db.cursor() as cursor:
+            cursor.execute(
+                f"""SELECT m.movie_ID, {_AVERAGE_RATING}, m.num_ratings
+                   FROM Movie m
+                   WHERE NOT EXISTS (SELECT 1 FROM Rating_Histogram h WHERE h.movie_ID = m.movie_ID);"""
+            )
+            movies = cursor.fetchall()
+            rows = [
+                (movie_id, bucket, count)
+                for movie_id, avg_rating, num_ratings in movies
+                for bucket, count in enumerate(backfill_counts(avg_rating, num_ratings or 0))
+            ]
+            for i in range(0, len(rows), HYDRATE_CHUNK_SIZE):
+                cursor.executemany(
+                    """INSERT INTO Rating_Histogram(movie_ID, bucket, num_ratings)
+                       VALUES (%s, %s, %s);""",
+                    rows[i : i + HYDRATE_CHUNK_SIZE],
+                )
+        db.commit()
+    _MOVIE_CACHE.clear()
+    return len(movies)
 
 
 def add_movie_to_database(mov: Movie) -> Movie:
     """Adds a movie to the database & returns the properly formatted movie
+    Everything is written in one transaction with a fixed number of round trips, no matter the crew
+    or score size, so a failure never leaves a half-written movie behind
 
     Args:
         mov - a movie object to be added to database
@@ -565,192 +1527,170 @@ def add_movie_to_database(mov: Movie) -> Movie:
     avg_rating = mov.get_avg_rating()
     num_ratings = mov.get_num_rating()
     movie_title = mov.get_title()
-    movie_id = -1
-
-    # add the movie
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """INSERT INTO Movie(run_time, average_rating, num_ratings, movie_title)
-            VALUES (%(run_time)s, %(avg_rating)s, %(num_ratings)s, %(movie_title)s);""",
-            {
-                "run_time": run_time,
-                "avg_rating": avg_rating,
-                "num_ratings": num_ratings,
-                "movie_title": movie_title,
-            },
-        )
-
-    # get the id - no error checking since we just added it
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT movie_ID 
-               FROM Movie 
-               WHERE movie_title = %(movie_title)s AND run_time = %(run_time)s;""",
-            {
-                "movie_title": movie_title.lower(),
-                "run_time": run_time,
-            },
-        )
-        movie_id = cursor.fetchall()[0][0]
+    songs = mov.get_score() or []
+    if mov.get_crew() is None:
+        mov.set_crew({})
 
     # check for composer
-    composer_name = ""
-    for crew_name, roles in mov.get_crew().items():
-        if roles[0].lower() == "composer":
-            composer_name = crew_name
-            break
-    if composer_name == "":
+    if not any(job.lower() == "composer" for jobs in mov.get_crew().values() for job in jobs):
         mov.add_crew_member("Unknown Composer", ["Composer"])
 
-    # find the existing crew members
-    tmp_crew = mov.get_crew()
-    results = []
-    for crew_name, roles in tmp_crew.items():
-        with _DB.cursor() as cursor:
+    # crew names are matched case-insensitively, like the database collation does
+    crew = {}
+    for crew_name, jobs in mov.get_crew().items():
+        crew.setdefault(crew_name.lower(), (crew_name, []))[1].extend(jobs)
+
+    crew_ids = {}
+    crew_jobs = {}
+    stale_movies = []
+    with connection() as db:
+        db.start_transaction()
+        with db.cursor() as cursor:
+            # add the movie, score_ID is set once the score exists
+            top_score = TOP_SCORE.format(rating_sum="%(rating_sum)s", num_ratings="%(num_ratings)s")
             cursor.execute(
-                """SELECT *
-                FROM Crew
-                WHERE crew_name = %(crew_name)s;""",
-                {"crew_name": crew_name.lower()},
+                f"""INSERT INTO Movie(run_time, rating_sum, num_ratings, movie_title, top_score)
+                   VALUES (%(run_time)s, %(rating_sum)s, %(num_ratings)s, %(movie_title)s, {top_score});""",
+                {
+                    "run_time": run_time,
+                    "rating_sum": avg_rating * num_ratings,
+                    "num_ratings": num_ratings,
+                    "movie_title": movie_title,
+                },
             )
-            results.append(cursor.fetchall())
+            movie_id = cursor.lastrowid
 
-    # prune existing crew from tmp_crew
-    for result in results:
-        try:
-            cur_crew_id, name = result[0]
-            tmp_crew.pop(name)
-
-            # insert new movie for existing crew
-            with _DB.cursor() as cursor:
+            # find the existing crew members and the jobs they already have in one query
+            names = [crew_name for crew_name, _ in crew.values()]
+            cursor.execute(
+                f"""SELECT c.crew_ID, c.crew_name, j.job
+                    FROM Crew c
+                    LEFT JOIN Crew_Job j ON j.crew_ID = c.crew_ID
+                    WHERE c.crew_name IN ({", ".join(["%s"] * len(names))})
+                    ORDER BY c.crew_ID;""",
+                tuple(names),
+            )
+            for crew_id, crew_name, job in cursor.fetchall():
+                key = crew_name.lower()
+                # an accent-insensitive collation also matches names that only differ by an accent, which are
+                # someone else, so only take the names we asked for
+                if key not in crew:
+                    continue
+                if crew_ids.setdefault(key, crew_id) == crew_id and job is not None:
+                    crew_jobs.setdefault(crew_id, set()).add(job.lower())
+            existing = set(crew_ids.values())
+
+            # add the remaining crew members in one batch
+            new_names = [crew_name for key, (crew_name, _) in crew.items() if key not in crew_ids]
+            if new_names:
+                cursor.executemany(
+                    """INSERT INTO Crew(crew_name)
+                       VALUES (%s);""",
+                    [(crew_name,) for crew_name in new_names],
+                )
+                # IDs of a multi-row insert aren't guaranteed to be consecutive, so read them back. The collation
+                # can match existing crew whose names only differ by an accent too, none of these names existed
+                # when this transaction looked, so the ones that match ours exactly are the rows we just added
                 cursor.execute(
-                    """INSERT INTO Crew_Movie(crew_ID, movie_ID)
-                    VALUES (%(cur_crew_id)s, %(movie_id)s);""",
-                    {
-                        "cur_crew_id": cur_crew_id,
-                        "movie_id": movie_id,
-                    },
+                    f"""SELECT crew_ID, crew_name
+                        FROM Crew
+                        WHERE crew_name IN ({", ".join(["%s"] * len(new_names))})
+                        ORDER BY crew_ID;""",
+                    tuple(new_names),
+                )
+                for crew_id, crew_name in cursor.fetchall():
+                    key = crew_name.lower()
+                    if key in crew and key not in crew_ids:
+                        crew_ids[key] = crew_id
+
+            # set every job each crew member doesn't have yet
+            new_jobs = []
+            for key, (crew_name, jobs) in crew.items():
+                have = crew_jobs.setdefault(crew_ids[key], set())
+                for job in jobs:
+                    if job.lower() not in have:
+                        have.add(job.lower())
+                        new_jobs.append((job, crew_ids[key]))
+            if new_jobs:
+                cursor.executemany(
+                    """INSERT INTO Crew_Job(job, crew_ID)
+                       VALUES (%s, %s);""",
+                    new_jobs,
                 )
-                _DB.commit()
-        except:
-            continue
 
-    # add remaining crew members
-    for crew_name, roles in tmp_crew.items():
-        with _DB.cursor() as cursor:
-            cursor.execute(
-                """INSERT INTO Crew(crew_name)
-                VALUES (%(crew_name)s);""",
-                {"crew_name": crew_name},
+            # set crew movie cross tables
+            cursor.executemany(
+                """INSERT INTO Crew_Movie(crew_ID, movie_ID)
+                   VALUES (%s, %s);""",
+                [(crew_id, movie_id) for crew_id in dict.fromkeys(crew_ids[key] for key in crew)],
             )
-            _DB.commit()
 
-    # get new crew IDs, put them after the job in tmp_crew
-    for crew_name, roles in tmp_crew.items():
-        with _DB.cursor() as cursor:
-            cursor.execute(
-                """SELECT crew_ID
-                FROM Crew
-                WHERE crew_name = %(crew_name)s;""",
-                {"crew_name": crew_name.lower()},
+            # put composer id into Score table
+            composer_id = next(
+                crew_ids[key]
+                for key, (_, jobs) in crew.items()
+                if any(job.lower() == "composer" for job in jobs)
             )
-            roles.append(cursor.fetchall()[0])
-
-    # set new crew jobs
-    for crew_name, roles in tmp_crew.items():
-        job = roles[0]
-        id_solo = roles[1][0]
-        with _DB.cursor() as cursor:
             cursor.execute(
-                """INSERT INTO Crew_Job(job, crew_ID)
-                VALUES (%(job)s, %(id_solo)s)""",
+                """INSERT INTO Score(score_ID, crew_ID)
+                   VALUES (%(score_id)s, %(composer_id)s);""",
                 {
-                    "job": job,
-                    "id_solo": id_solo,
+                    "score_id": movie_id,
+                    "composer_id": composer_id,
                 },
             )
-            _DB.commit()
 
-    # set new crew movie cross tables
-    for crew_name, roles in tmp_crew.items():
-        with _DB.cursor() as cursor:
+            # link songs to Score
+            if songs:
+                cursor.executemany(
+                    """INSERT INTO Score_Songs(song, score_ID, track_number)
+                       VALUES (%s, %s, %s);""",
+                    [(song, movie_id, i + 1) for i, song in enumerate(songs)],
+                )
+
+            # update to add score_id via movie_id
             cursor.execute(
-                """INSERT INTO Crew_Movie(crew_ID, movie_ID)
-                VALUES (%(crew_ID)s, %(movie_id)s);""",
+                """UPDATE Movie
+                   SET score_ID = %(score_id)s
+                   WHERE movie_ID = %(movie_id)s;""",
                 {
-                    "crew_ID": roles[1][0],
+                    "score_id": movie_id,
                     "movie_id": movie_id,
                 },
             )
-            _DB.commit()
-
-    # get composer id
-    composer_id = -1
-    composers = []
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT crew_ID
-                FROM Crew_Job
-                WHERE job = 'composer';""",
-        )
-        for tup in cursor.fetchall():
-            composers.append(tup[0])
-
-    this_movie_ids = []
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """SELECT crew_ID
-                FROM Crew_Movie
-                WHERE movie_ID = %(movie_id)s;""",
-            {"movie_id": movie_id},
-        )
-        for tup in cursor.fetchall():
-            this_movie_ids.append(tup[0])
 
-    for composer in composers:
-        if composer in this_movie_ids:
-            composer_id = composer
-
-    # put composer id into Score table
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """INSERT INTO Score(score_ID, crew_ID)
-            VALUES (%(score_ID)s, %(composer_id)s);""",
-            {
-                "score_ID": movie_id,
-                "composer_id": composer_id,
-            },
-        )
-        _DB.commit()
+            # every movie has a row per histogram bucket, so add_log only has to update one
+            cursor.executemany(
+                """INSERT INTO Rating_Histogram(movie_ID, bucket, num_ratings)
+                   VALUES (%s, %s, %s);""",
+                [(movie_id, bucket, count) for bucket, count in enumerate(backfill_counts(avg_rating, num_ratings))],
+            )
 
-    # link songs to Score if it exists
-    if mov.get_score() != None:
-        i = 1
-        for song in mov.get_score():
-            with _DB.cursor() as cursor:
+            # movies of existing crew members who picked up a new job now show stale crew when cached
+            changed = {crew_id for _, crew_id in new_jobs if crew_id in existing}
+            if changed:
+                placeholders = ", ".join(["%s"] * len(changed))
                 cursor.execute(
-                    """INSERT INTO Score_Songs(song, score_ID, track_number)
-                    VALUES (%(song)s, %(score_id)s, %(track_number)s);""",
-                    {
-                        "song": song,
-                        "score_id": movie_id,
-                        "track_number": i,
-                    },
+                    f"""SELECT movie_ID
+                        FROM Crew_Movie
+                        WHERE crew_ID IN ({placeholders})
+                        UNION
+                        SELECT m.movie_ID
+                        FROM Movie m
+                        JOIN Score s ON s.score_ID = m.score_ID
+                        WHERE s.crew_ID IN ({placeholders});""",
+                    tuple(changed) + tuple(changed),
                 )
-                _DB.commit()
-                i += 1
+                stale_movies = [row[0] for row in cursor.fetchall()]
+        db.commit()
 
-    # update to add score_id via movie_id
-    with _DB.cursor() as cursor:
-        cursor.execute(
-            """UPDATE Movie
-            SET score_ID = %(score_id)s
-            WHERE movie_ID = %(movie_id)s""",
-            {
-                "score_id": movie_id,
-                "movie_id": movie_id,
-            },
-        )
-        _DB.commit()
+    for stale_id in stale_movies:
+        _MOVIE_CACHE.invalidate(stale_id)
+
+    # keep the search index in sync with what we just wrote
+    new_crew = {crew_ids[key]: crew_name for key, (crew_name, _) in crew.items() if crew_ids[key] not in existing}
+    index_movie(movie_id, movie_title, movie_id, new_crew, [crew_ids[key] for key in crew], songs)
 
+    # write-through, replace anything cached under this ID with the fresh movie
+    _MOVIE_CACHE.invalidate(movie_id)
     return search_for_movie_by_id(movie_id)
@@ -0,0 +1,213 @@
+import collections
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class WriteBehindBuffer:
+    """Thread-safe write-behind buffer with group commit.
+    Callers queue entries and return right away, a background thread hands everything queued to the
+    flush function every interval seconds, or sooner once batch_size entries are waiting, so many
+    writes share one transaction. The queue is bounded, once it's full add() blocks until a flush
+    makes room. If a flush fails its entries are kept and retried on their own before anything newer,
+    unless is_permanent says retrying can't help (a constraint violation, bad data). Then the batch is split
+    and its entries are written one at a time, the ones that still fail are set aside as dead letters
+    """
+
+    DEAD_LETTERS_KEPT = 1000  # the most recent dead letters dead_letters() returns, older ones are only counted
+
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], None],
+        max_queued: int = 10000,
+        interval: float = 0.5,
+        batch_size: int = 500,
+        timeout: float = 30.0,
+        is_permanent: Callable[[BaseException], bool] = None,
+    ):
+        """
+        Args:
+            flush - a function that durably writes a list of entries, in the order they were added
+            max_queued - an int representing the max number of entries waiting to be flushed
+            interval - a float representing the most seconds an entry waits before it's flushed
+            batch_size - an int representing how many waiting entries trigger an early flush
+            timeout - a float representing how many seconds add() waits for room before giving up
+            is_permanent - a function that checks if an exception from the flush function would happen again
+                           on every retry, by default every failure is treated as transient
+        """
+        if max_queued < 1:
+            raise ValueError("The buffer has to hold at least 1 entry")
+        self._flush = flush
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._interval = interval
+        self._batch_size = batch_size
+        self._timeout = timeout
+        self._is_permanent = is_permanent or (lambda error: False)
+        self._failed: List[Any] = []  # entries of a failed flush, written before anything newer
+        self._dead_letters = collections.deque(maxlen=self.DEAD_LETTERS_KEPT)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        # stats
+        self._flushes = 0
+        self._flushed = 0
+        self._failures = 0
+        self._full = 0
+        self._max_batch = 0
+        self._dead_lettered = 0
+
+        self._thread = threading.Thread(target=self._run, name="betterboxd-write-behind", daemon=True)
+        self._thread.start()
+
+    def add(self, entry: Any) -> None:
+        """Queues an entry to be written with the next flush
+
+        Args:
+            entry - anything the flush function accepts
+
+        Raises:
+            queue.Full - if the buffer stays full for timeout seconds, like when the database is down
+            RuntimeError - if the buffer was closed
+        """
+        if self._closed:
+            raise RuntimeError("The write-behind buffer is closed")
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._full += 1
+            self._wake.set()
+            self._queue.put(entry, timeout=self._timeout)
+        if self._queue.qsize() >= self._batch_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """Writes everything queued so far in one call to the flush function, without waiting for the interval
+
+        Returns:
+            an int representing how many entries were written
+
+        Raises:
+            whatever the flush function raised on a transient failure, the entries not written yet stay queued
+        """
+        with self._flush_lock:
+            # a failed batch is retried on its own, so the queue stays full and add() can't outrun a dead database
+            batch = self._failed
+            self._failed = []
+            if not batch:
+                try:
+                    while True:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    pass
+            if not batch:
+                return 0
+            try:
+                self._flush(batch)
+            except BaseException as e:
+                self._failures += 1
+                if not self._is_permanent(e):
+                    self._failed = batch
+                    raise
+                # one bad entry fails the whole batch, so find it and let everything else through
+                return self._flush_one_at_a_time(batch)
+            self._flushes += 1
+            self._flushed += len(batch)
+            self._max_batch = max(self._max_batch, len(batch))
+            return len(batch)
+
+    def _flush_one_at_a_time(self, batch: List[Any]) -> int:
+        """Writes a batch that failed for good entry by entry, setting aside the ones that fail on their own.
+        Only called while holding the flush lock
+
+        Args:
+            batch - a list of entries
+
+        Returns:
+            an int representing how many entries were written
+
+        Raises:
+            whatever the flush function raised on a transient failure, the entries not written yet stay queued
+        """
+        written = 0
+        for i, entry in enumerate(batch):
+            try:
+                self._flush([entry])
+            except BaseException as e:
+                if not self._is_permanent(e):
+                    self._failures += 1
+                    self._failed = batch[i:]
+                    raise
+                self._dead_letter(entry, e)
+                continue
+            self._flushes += 1
+            written += 1
+        self._flushed += written
+        if written:
+            self._max_batch = max(self._max_batch, 1)
+        return written
+
+    def _dead_letter(self, entry: Any, error: BaseException) -> None:
+        """Sets aside an entry that can never be written"""
+        import logging
+
+        self._dead_lettered += 1
+        self._dead_letters.append((entry, error))
+        logging.getLogger("betterboxd.write_behind").error(
+            "Dropped an entry that can't be written: %r (%s)", entry, error
+        )
+
+    def dead_letters(self) -> List[Any]:
+        """Gets the most recent entries that failed on their own and were dropped, with why
+
+        Returns:
+            a list of (entry, exception) tuples, oldest first, at most DEAD_LETTERS_KEPT
+        """
+        return list(self._dead_letters)
+
+    def close(self) -> None:
+        """Stops the background thread and flushes whatever is left. Safe to call more than once
+
+        Raises:
+            whatever the last flush raised, those entries are lost
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, float]:
+        """Gets buffer counters, useful for tuning the interval and batch size
+
+        Returns:
+            a dictionary with queued, flushes, flushed, failures, full, max_batch, and dead_lettered
+        """
+        return {
+            "queued": self._queue.qsize() + len(self._failed),
+            "flushes": self._flushes,
+            "flushed": self._flushed,
+            "failures": self._failures,
+            "full": self._full,
+            "max_batch": self._max_batch,
+            "dead_lettered": self._dead_lettered,
+        }
+
+    def _run(self) -> None:
+        """Flushes every interval seconds, or sooner when woken, until the buffer closes"""
+        while not self._closed:
+            self._wake.wait(self._interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                # only imported once something has gone wrong, it's slow to import
+                import logging
+
+                logging.getLogger("betterboxd.write_behind").exception(
+                    "Write-behind flush failed, retrying in %s seconds", self._interval
+                )
+                # don't spin on a database that's down even if add() keeps waking us up
+                time.sleep(self._interval)